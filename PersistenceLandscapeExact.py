@@ -2,14 +2,16 @@
 Define Persistence Landscape Exact class.
 """
 from __future__ import annotations
-import itertools
+import heapq
 import numpy as np
-from operator import itemgetter
-from auxiliary import union_crit_pairs
+from auxiliary import unique_bars
 from PersistenceLandscape import PersistenceLandscape
-from PersistenceLandscapeGrid import PersLandscapeApprox
+from PersistenceLandscapeGrid import Grid, PersLandscapeApprox
+from landscape_cache import get_cache, landscape_key
+from profiling import stage, count
+from landscape_expr import _lazy_operand
 
-__all__ = ['PersLandscapeExact', 'vectorize']
+__all__ = ['PersLandscapeExact', 'vectorize', 'lc_exact', 'average_exact']
 
 
 class PersLandscapeExact(PersistenceLandscape):
@@ -42,6 +44,20 @@ class PersLandscapeExact(PersistenceLandscape):
     compute : bool, optional
         A flag determining whether landscape functions are computed upon instantiation.
 
+    max_depth : int, optional
+        If given, the sweep stops after the first `max_depth` landscape
+        functions. Stored as the attribute `depth_limit`, since the property
+        `max_depth` is the number of functions actually computed.
+
+    Notes
+    -----
+    The critical pairs are stored in a compressed layout: one float array `xs`
+    of x-values, one float array `ys` of function values, and an int array
+    `offsets` such that the function of depth k is given by
+    `xs[offsets[k]:offsets[k+1]]` and `ys[offsets[k]:offsets[k+1]]`. The
+    nested list `critical_pairs` is built from these arrays the first time it
+    is accessed.
+
 
     Methods
     -------
@@ -59,17 +75,65 @@ class PersLandscapeExact(PersistenceLandscape):
     
     def __init__(
         self, dgms: list = [], hom_deg: int = 0,
-        critical_pairs: list = [], compute: bool = True) -> None:
+        critical_pairs: list = [], compute: bool = True,
+        max_depth: int = None) -> None:
         super().__init__(dgms=dgms, hom_deg=hom_deg)
+        if max_depth is not None and max_depth < 1:
+            raise ValueError(f"max_depth must be positive, but {max_depth} was passed")
+        self.depth_limit = max_depth
         self.critical_pairs = critical_pairs
         if dgms:
             self.dgms = dgms[self.hom_deg] 
         else: # critical pairs are passed. Is this the best check for this?
             self.dgms = dgms
-        self.max_depth = len(self.critical_pairs)
         if compute:
             self.compute_landscape()
 
+    @classmethod
+    def _from_arrays(cls, xs: np.ndarray, ys: np.ndarray, offsets: np.ndarray,
+                     hom_deg: int = 0) -> PersLandscapeExact:
+        """ Create a landscape directly from the compressed layout. """
+        result = cls(hom_deg=hom_deg, compute=False)
+        result.xs, result.ys, result.offsets = xs, ys, offsets
+        return result
+
+    @property
+    def critical_pairs(self) -> list:
+        """ The critical pairs of each landscape function as nested lists. """
+        if self._critical_pairs is None:
+            if self.offsets is None:
+                return []
+            self._critical_pairs = [
+                np.column_stack((self.xs[a:b], self.ys[a:b])).tolist()
+                for a, b in zip(self.offsets, self.offsets[1:])]
+        return self._critical_pairs
+
+    @critical_pairs.setter
+    def critical_pairs(self, critical_pairs: list) -> None:
+        self._critical_pairs = None
+        if len(critical_pairs) == 0:
+            # nothing has been computed yet
+            self.xs = self.ys = self.offsets = None
+            return
+        self.xs, self.ys, self.offsets = _pairs_to_arrays(critical_pairs)
+
+    @property
+    def max_depth(self) -> int:
+        """ The number of landscape functions. """
+        return 0 if self.offsets is None else len(self.offsets) - 1
+
+    def __setstate__(self, state: dict) -> None:
+        # landscapes pickled before the compressed layout store the nested
+        # critical pairs and their depth instead of the flat arrays
+        if 'critical_pairs' in state:
+            state.pop('max_depth', None)
+            critical_pairs = state.pop('critical_pairs')
+            self.__dict__.update(state)
+            self.critical_pairs = critical_pairs
+        else:
+            self.__dict__.update(state)
+        self.__dict__.setdefault('depth_limit', None)
+
     def __repr__(self):
         return (
             "The persistence landscape of diagrams in homological "
@@ -88,10 +152,12 @@ class PersLandscapeExact(PersistenceLandscape):
         -----
         (-P).critical_pairs returns the sum
         """        
+        expr = _lazy_operand(self)
+        if expr is not None:
+            return -expr
         self.compute_landscape()
-        return PersLandscapeExact(hom_deg=self.hom_deg,
-                                    critical_pairs=[ [[a,-b] for a, b in depth_list]
-                                                    for depth_list in self.critical_pairs])
+        return PersLandscapeExact._from_arrays(self.xs, -self.ys, self.offsets,
+                                               hom_deg=self.hom_deg)
 
     def __add__(self, other):
         """
@@ -109,13 +175,12 @@ class PersLandscapeExact(PersistenceLandscape):
         -----
         (P+Q).critical_pairs returns the sum
         """
-        
+        expr = _lazy_operand(self, other)
+        if expr is not None:
+            return expr + other
         if self.hom_deg != other.hom_deg:
             raise ValueError("homological degrees must match")
-        return PersLandscapeExact(
-            critical_pairs=union_crit_pairs(self, other),
-            hom_deg=self.hom_deg
-            )
+        return lc_exact([self, other], [1, 1])
     
     def __sub__(self, other):    
         """
@@ -152,11 +217,12 @@ class PersLandscapeExact(PersistenceLandscape):
         -----
         (3*P).critical_pairs returns the product
         """
+        expr = _lazy_operand(self)
+        if expr is not None:
+            return expr*other
         self.compute_landscape()
-        return PersLandscapeExact(
-            hom_deg=self.hom_deg,
-            critical_pairs=[[(a, other*b) for a, b in depth_list] 
-                            for depth_list in self.critical_pairs])
+        return PersLandscapeExact._from_arrays(self.xs, other*self.ys,
+                                               self.offsets, hom_deg=self.hom_deg)
 
     def __rmul__(self,other: float):
         """
@@ -219,9 +285,9 @@ class PersLandscapeExact(PersistenceLandscape):
         self.compute_landscape()
         return self.critical_pairs[key]
 
-    def compute_landscape(self, verbose: bool = False) -> list:
+    def compute_landscape(self, verbose: bool = False) -> None:
         """
-        Stores the persistence landscape in `self.critical_pairs` as a list
+        Stores the persistence landscape in the arrays `xs`, `ys` and `offsets`
         
         Parameters
         ----------
@@ -237,124 +303,28 @@ class PersLandscapeExact(PersistenceLandscape):
         verboseprint = print if verbose else lambda *a, **k: None
 
         # check if landscapes were already computed
-        if self.critical_pairs:
+        if self.offsets is not None:
             verboseprint('self.critical_pairs was not empty and stored value was returned')
-            return self.critical_pairs
-
-        A = self.dgms   
-        # change A into a list
-        A = list(A)
-        # change inner nparrays into lists
-        for i in range(len(A)):
-            A[i] = list(A[i])
-        # store infitiy values 
-        infty_bar = False
-        if A[-1][1] == np.inf:
-            A. pop(-1)
-            infty_bar = True
-            # TODO: Do we need this infty_bar variable?
-     
-        landscape_idx = 0
-        L = []
-
-        # Sort A: read from right to left inside ()
-        A = sorted(A, key = lambda x: [x[0], -x[1]])
-    
-
-        while A:
-            verboseprint(f'computing landscape index {landscape_idx+1}...')
-
-            # add a 0 element to begin count of lamda_k
-            #size_landscapes = np.append(size_landscapes, [0])
-
-            # pop first term
-            b, d = A.pop(0)
-            verboseprint(f'(b,d) is ({b},{d})')
-
-            # outer brackets for start of L_k
-            L.append([ [-np.inf, 0], [b, 0], [(b+d)/2, (d-b)/2] ] ) 
-            
-            # check for duplicates of (b,d)
-            duplicate = 0
-            
-            for j, itemj in enumerate(A):
-                if itemj == [b,d]:
-                    duplicate += 1
-                    A.pop(j)
-                else:
-                    break
-           
-            while L[landscape_idx][-1] != [np.inf, 0]: 
-                
-                # if d is > = all remaining pairs, then end lambda
-                # includes edge case with (b,d) pairs with the same death time
-                if all(d >= _[1] for _ in A):
-                    # add to end of L_k
-                    L[landscape_idx].extend([ [d,0], [np.inf, 0] ])
-                    # for duplicates, add another copy of the last computed lambda
-                    for _ in range(duplicate):
-                        L.append(L[-1])
-                        landscape_idx += 1
-
-                else:
-                    # set (b', d')  to be the first term so that d' > d
-                    for i, item in enumerate(A):
-                        if item[1] > d:
-                            b_prime, d_prime = A.pop(i)
-                            verboseprint(f'(bp,dp) is ({b_prime},{d_prime})')
-                            break
-
-
-                    # Case I
-                    if b_prime > d:
-                        L[landscape_idx].extend([ [d, 0] ])
-
-
-                    # Case II
-                    if b_prime >= d:
-                        L[landscape_idx].extend([ [b_prime, 0] ])
-
-
-                    # Case III
-                    else:
-                        L[landscape_idx].extend([ [(b_prime + d)/2, (d-b_prime)/2] ])
-                        # push (b', d) into A in order
-                        # find the first b_i in A so that b'<= b_i
-                        
-                        # push (b', d) to end of list if b' not <= any bi
-                        ind = len(A) 
-                        for i in range(len(A)):
-                            if b_prime <= A[i][0]:
-                                ind = i # index to push (b', d) if b' != b_i
-                                break
-                        # if b' not < = any bi, put at the end of list
-                        if ind == len(A):
-                            pass
-                        # if b' = b_i
-                        elif b_prime == A[ind][0]:
-                            # pick out (bk,dk) such that b' = bk
-                            A_i = [item for item in A if item[0] == b_prime ]
-                        
-                            # move index to the right one for every d_i such that d < d_i
-                            for j in range(len(A_i)):
-                                if d < A_i[j][1]:
-                                    ind += 1 
-                                
-                                # d > dk for all k 
-
-                        A.insert(ind ,[b_prime, d])
-            
-                    L[landscape_idx].extend([ [(b_prime + d_prime)/2, (d_prime-b_prime)/2] ])
-                    #size_landscapes[landscape_idx] += 1
-
-                    b,d = b_prime, d_prime # Set (b',d')= (b, d)
-                    
-
-            landscape_idx += 1
-            
+            return
+
+        bd_pairs = self._finite_pairs()
+        cache = get_cache()
+        if cache is not None:
+            key = landscape_key(bd_pairs, 'exact', hom_deg=self.hom_deg,
+                                max_depth=self.depth_limit)
+            cached = cache.get(key)
+            if cached is not None:
+                verboseprint('self.critical_pairs was found in the cache')
+                self.xs, self.ys, self.offsets = cached
+                self._critical_pairs = None
+                return
+        self.xs, self.ys, self.offsets = _sweep_landscape(
+            bd_pairs, max_depth=self.depth_limit)
+        if cache is not None:
+            self.xs, self.ys, self.offsets = cache.put(
+                key, (self.xs, self.ys, self.offsets))
+        self._critical_pairs = None
         verboseprint('self.critical_pairs was empty and algorthim was executed')
-        self.max_depth = len(L)
-        self.critical_pairs = [item[1:-1] for item in L]
 
     def compute_landscape_by_depth(self, depth: int) -> list:
         """
@@ -366,10 +336,19 @@ class PersLandscapeExact(PersistenceLandscape):
             the depth of the desired landscape function
         """
         
-        if self.critical_pairs:
-            return self.critical_pairs[depth]
+        if self.offsets is None:
+            # only sweep as far as the requested depth
+            xs, ys, offsets = _sweep_landscape(self._finite_pairs(),
+                                               max_depth=depth + 1)
         else:
-            return self.compute_landscape()[depth]
+            xs, ys, offsets = self.xs, self.ys, self.offsets
+        a, b = offsets[depth], offsets[depth + 1]
+        return np.column_stack((xs[a:b], ys[a:b])).tolist()
+
+    def _finite_pairs(self) -> np.ndarray:
+        """ The birth-death pairs of `self.dgms` with finite death time. """
+        A = np.asarray(self.dgms, dtype=float).reshape(-1, 2)
+        return A[~np.any(A == np.inf, axis=1)]
 
     def p_norm(self, p: int = 2) -> float:
         """
@@ -378,36 +357,14 @@ class PersLandscapeExact(PersistenceLandscape):
         Parameters
         ----------
         p: float, default 2
-            value p of the L_{`p`} norm 
+            value p of the L_{`p`} norm. np.inf (or -1) gives the sup norm.
         """
-        if p == -1:
-            return self.infinity_norm()
-        if p < -1 or -1 < p < 0:
+        if p == -1 or p == np.inf:
+            return self.sup_norm()
+        if p < 0:
             raise ValueError(f"p can't be negative, but {p} was passed")
         self.compute_landscape()
-        result = 0.
-        for l in self.critical_pairs:
-            for [[x0,y0], [x1,y1]] in zip(l,l[1:]):
-                if y0 == y1:
-                    # horizontal line segment
-                    result += (np.abs(y0)**p)*(x1-x0)
-                    continue
-                # slope is well-defined
-                slope = (y1 - y0)/(x1-x0)
-                b = y0 - slope*x0
-                # segment crosses the x-axis
-                if (y0 < 0 and y1 > 0) or (y0 > 0 and y1 < 0):
-                    z = -b/slope
-                    ev_x1 = (slope*x1+b)**(p+1)/(slope*(p+1))
-                    ev_x0 = (slope*x0+b)**(p+1)/(slope*(p+1))
-                    ev_z = (slope*z++b)**(p+1)/(slope*(p+1))
-                    result += np.abs(ev_x1 + ev_x0 -2*ev_z)
-                # segment does not cross the x-axis
-                else: 
-                    ev_x1 = (slope*x1+b)**(p+1)/(slope*(p+1))
-                    ev_x0 = (slope*x0+b)**(p+1)/(slope*(p+1))
-                    result += np.abs(ev_x1 - ev_x0)
-        return (result)**(1.0/p)
+        return _integrate_abs_power(self.xs, self.ys, self.offsets, p)**(1.0/p)
                 
     def sup_norm(self) -> float:
         """
@@ -415,14 +372,248 @@ class PersLandscapeExact(PersistenceLandscape):
         """
 
         self.compute_landscape()
-        cvals = list(itertools.chain.from_iterable(self.critical_pairs))
-        return max(np.abs(cvals), key=itemgetter(1))[1]
+        return np.max(np.abs(self.ys), initial=0.)
     
 
 ###########################################
 # End PersLandscapeExact class definition #
 ###########################################
 
+def _integrate_abs_power(xs: np.ndarray, ys: np.ndarray, offsets: np.ndarray,
+                         p: float) -> float:
+    """ Integrate |f|^p over every linear segment of every depth.
+
+    Intended for internal use. On a segment of width dx between heights a =
+    |y0| and b = |y1| that does not cross the x-axis, the integral is
+    dx (b^q - a^q)/(q (b - a)) with q = p + 1. This is evaluated as
+    dx hi^p expm1(q log1p(r))/(q r), with hi = max(a, b) and r = (lo - hi)/hi,
+    which stays accurate for nearly horizontal segments. A segment crossing
+    the x-axis is split at the crossing, giving dx (a^q + b^q)/(q (a + b)).
+    """
+    # segments join consecutive critical pairs within the same depth
+    valid = np.ones(max(len(xs) - 1, 0), dtype=bool)
+    valid[offsets[1:-1] - 1] = False
+    dx = (xs[1:] - xs[:-1])[valid]
+    y0, y1 = ys[:-1][valid], ys[1:][valid]
+    a, b = np.abs(y0), np.abs(y1)
+    q = p + 1
+    cross = ((y0 < 0) & (y1 > 0)) | ((y0 > 0) & (y1 < 0))
+    hi, lo = np.maximum(a, b), np.minimum(a, b)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.where(hi > 0, (lo - hi)/hi, 0.)
+        ratio = np.where(r == 0, q, np.expm1(q*np.log1p(r))/r)
+        same_sign = dx*hi**p*ratio/q
+        crossing = dx*(a**q + b**q)/(q*(a + b))
+    return np.sum(np.where(cross, crossing, same_sign))
+
+
+def _pairs_to_arrays(critical_pairs: list) -> tuple:
+    """ Convert nested lists of critical pairs to the compressed layout
+    (xs, ys, offsets) used by `PersLandscapeExact`. Intended for internal use.
+    """
+    offsets = np.zeros(len(critical_pairs) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(depth) for depth in critical_pairs])
+    if not offsets[-1]:
+        return np.empty(0), np.empty(0), offsets
+    pairs = np.array([pair for depth in critical_pairs for pair in depth],
+                     dtype=float).reshape(-1, 2)
+    return pairs[:, 0].copy(), pairs[:, 1].copy(), offsets
+
+
+class _PendingBars:
+    """ The pending birth-death pairs of the Bubenik-Dlotko sweep.
+
+    Intended for internal use. Pairs are kept in the order (birth ascending,
+    death descending). Every birth time that is ever pushed is the birth of
+    an input bar, so pairs are bucketed by the rank of their birth, each
+    bucket is a max-heap of deaths, and a segment tree over the buckets
+    stores the largest pending death. Finding the first pair (in order) whose
+    death exceeds a threshold is then a single O(log n) descent of the tree.
+    Repeated pairs are stored once, with their multiplicity in `counts`.
+    """
+
+    def __init__(self, bars: np.ndarray, counts: np.ndarray) -> None:
+        self.births = np.unique(bars[:, 0])
+        self.rank = {b: r for r, b in enumerate(self.births.tolist())}
+        self.size = 1
+        while self.size < len(self.births):
+            self.size *= 2
+        self.buckets = [[] for _ in range(len(self.births))]
+        self.counts = {}
+        ranks = np.searchsorted(self.births, bars[:, 0])
+        for r, d, c in zip(ranks.tolist(), bars[:, 1].tolist(),
+                           counts.tolist()):
+            self.buckets[r].append(-d)
+            self.counts[r, d] = c
+        self.tree = [-np.inf]*(2*self.size)
+        for r, bucket in enumerate(self.buckets):
+            heapq.heapify(bucket)
+            self.tree[self.size + r] = -bucket[0]
+        for i in range(self.size - 1, 0, -1):
+            self.tree[i] = max(self.tree[2*i], self.tree[2*i + 1])
+        self.count = int(counts.sum())
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _update(self, r: int) -> None:
+        bucket = self.buckets[r]
+        i = self.size + r
+        self.tree[i] = -bucket[0] if bucket else -np.inf
+        i //= 2
+        while i:
+            self.tree[i] = max(self.tree[2*i], self.tree[2*i + 1])
+            i //= 2
+
+    def push(self, b: float, d: float) -> None:
+        r = self.rank[b]
+        self.count += 1
+        if (r, d) in self.counts:
+            self.counts[r, d] += 1
+            return
+        self.counts[r, d] = 1
+        heapq.heappush(self.buckets[r], -d)
+        self._update(r)
+
+    def pop_first_above(self, d: float):
+        """ Pop the first pair (in order) whose death is greater than `d`.
+
+        Returns None if there is no such pair.
+        """
+        if self.tree[1] <= d:
+            return None
+        i = 1
+        while i < self.size:
+            i = 2*i if self.tree[2*i] > d else 2*i + 1
+        r = i - self.size
+        d_prime = -self.buckets[r][0]
+        self.count -= 1
+        self.counts[r, d_prime] -= 1
+        if not self.counts[r, d_prime]:
+            del self.counts[r, d_prime]
+            heapq.heappop(self.buckets[r])
+            self._update(r)
+        return self.births[r].item(), d_prime
+
+    def pop_duplicates(self, b: float, d: float) -> int:
+        """ Pop every remaining copy of the pair (b, d) and return how many
+        were popped.
+        """
+        r = self.rank[b]
+        duplicate = self.counts.pop((r, d), 0)
+        if duplicate:
+            # (b, d) was just popped as the first pair, so it is the top of
+            # its bucket
+            heapq.heappop(self.buckets[r])
+            self.count -= duplicate
+            self._update(r)
+        return duplicate
+
+
+def _nested_landscape(bd_pairs: np.ndarray, max_depth: int = None) -> tuple:
+    """ Compute the critical pairs of the landscape of bars with a common
+    birth time, such as degree 0 bars of a Vietoris-Rips filtration.
+
+    Intended for internal use. The tents of such bars are nested, so the
+    function of depth k is the tent of the bar with the k-th largest death,
+    and the landscape only needs a sort of the deaths. The result is the
+    same as that of `_sweep_landscape`.
+    """
+    b = bd_pairs[0, 0]
+    with stage('sort'):
+        # unique deaths in increasing order
+        bars, counts = unique_bars(bd_pairs)
+    count('duplicates', bars=len(bd_pairs), unique_bars=len(bars))
+    deaths = np.repeat(bars[::-1, 1], counts[::-1])[:max_depth]
+    xs = np.column_stack([np.full(len(deaths), b), (b + deaths)/2, deaths])
+    ys = np.column_stack([np.zeros(len(deaths)), (deaths - b)/2,
+                          np.zeros(len(deaths))])
+    offsets = np.arange(0, 3*len(deaths) + 1, 3, dtype=np.int64)
+    return xs.ravel(), ys.ravel(), offsets
+
+
+def _sweep_landscape(bd_pairs: np.ndarray, max_depth: int = None) -> tuple:
+    """ Compute the critical pairs of the landscape of `bd_pairs`.
+
+    This is the algorithm of Bubenik and Dlotko, with the pending pairs kept
+    in a `_PendingBars` structure instead of a sorted list, so it runs in
+    O(n log n + output) time. Bars with a common birth time are passed to
+    `_nested_landscape`. Intended for internal use.
+
+    Parameters
+    ----------
+    bd_pairs : numpy array
+        An (n, 2) array of finite birth-death pairs.
+
+    max_depth : int, optional
+        Stop once this many landscape functions are finished.
+
+    Returns
+    -------
+    tuple
+        The arrays (xs, ys, offsets) of the compressed layout used by
+        `PersLandscapeExact`.
+    """
+    if len(bd_pairs) and np.all(bd_pairs[:, 0] == bd_pairs[0, 0]):
+        with stage('nested'):
+            result = _nested_landscape(bd_pairs, max_depth)
+        count('nested', critical_points=len(result[0]))
+        return result
+    xs, ys, offsets = [], [], [0]
+    if max_depth is None:
+        max_depth = np.inf
+    with stage('sort'):
+        bars, counts = unique_bars(bd_pairs)
+        A = _PendingBars(bars, counts) if len(bd_pairs) else []
+    count('duplicates', bars=len(bd_pairs), unique_bars=len(bars))
+    with stage('sweep'):
+        while A and len(offsets) <= max_depth:
+            # the first pair in order is the first pair with death > -inf
+            b, d = A.pop_first_above(-np.inf)
+            xs += [b, (b+d)/2]
+            ys += [0, (d-b)/2]
+            # check for duplicates of (b,d)
+            duplicate = A.pop_duplicates(b, d)
+            while True:
+                # set (b', d') to be the first term so that d' > d
+                found = A.pop_first_above(d)
+                # if d is >= all remaining pairs, then end lambda
+                if found is None:
+                    xs.append(d)
+                    ys.append(0)
+                    break
+                b_prime, d_prime = found
+                # Case I
+                if b_prime > d:
+                    xs.append(d)
+                    ys.append(0)
+                # Case II
+                if b_prime >= d:
+                    xs.append(b_prime)
+                    ys.append(0)
+                # Case III
+                else:
+                    xs.append((b_prime + d)/2)
+                    ys.append((d-b_prime)/2)
+                    A.push(b_prime, d)
+                xs.append((b_prime + d_prime)/2)
+                ys.append((d_prime-b_prime)/2)
+                b, d = b_prime, d_prime
+            offsets.append(len(xs))
+            if duplicate:
+                with stage('duplicates'):
+                    # for duplicates, add another copy of the last computed
+                    # lambda
+                    for _ in range(min(duplicate, max_depth - len(offsets) + 1)):
+                        xs += xs[offsets[-2]:offsets[-1]]
+                        ys += ys[offsets[-2]:offsets[-1]]
+                        offsets.append(len(xs))
+        result = (np.array(xs, dtype=float), np.array(ys, dtype=float),
+                  np.array(offsets, dtype=np.int64))
+    count('sweep', critical_points=len(xs), depth=len(offsets) - 1)
+    return result
+
+
 def vectorize(l: PersLandscapeExact, start: float = None, stop: float = None, num_dims: int = 500) -> PersLandscapeApprox:
     """ Converts a `PersLandscapeExact` type to a `PersLandscapeApprox` type.
 
@@ -442,15 +633,114 @@ def vectorize(l: PersLandscapeExact, start: float = None, stop: float = None, nu
     """
    
     l.compute_landscape()
+    first, last = l.offsets[:-1], l.offsets[1:]
     if start is None:
-        start = min(l.critical_pairs,key=itemgetter(0))[0]
+        start = np.min(l.xs[first])
     if stop is None:
-        stop = max(l.critical_pairs, key=itemgetter(0))[0]
-    grid = np.linspace(start, stop, num_dims)
+        stop = np.max(l.xs[last - 1])
+    grid = Grid(start, stop, num_dims)
     result = []
-    # creates sequential pairs of points for each lambda in critical_pairs
-    for depth in l.critical_pairs:
-        xs, ys = zip(*depth)
-        result.append(np.interp(grid, xs, ys))
-    return PersLandscapeApprox(start = start, stop = stop, num_dims = num_dims,
-                                    hom_deg = l.hom_deg, values = np.array(result))
+    # interpolate each lambda in critical_pairs
+    for a, b in zip(first, last):
+        result.append(np.interp(grid.coords, l.xs[a:b], l.ys[a:b]))
+    return PersLandscapeApprox(grid = grid, hom_deg = l.hom_deg,
+                               values = np.array(result))
+
+
+def _slope_changes(xs: np.ndarray, ys: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """ Return the change of slope at each critical pair.
+
+    Intended for internal use. Each landscape function is zero to the left of
+    its first and to the right of its last critical pair, so the slope before
+    the first and after the last critical pair of a depth is zero. This is the
+    slope representation of `auxiliary.pos_to_slope_interp` in differenced
+    form, which can be merged across landscapes by adding.
+    """
+    slopes = np.zeros(len(xs) + 1)
+    if len(xs) > 1:
+        dx = np.diff(xs)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slopes[1:-1] = np.where(dx == 0, 0., np.diff(ys)/dx)
+        # no segment joins the last pair of a depth to the first of the next
+        slopes[offsets[1:-1]] = 0.
+    return np.diff(slopes)
+
+
+def lc_exact(landscapes: list, coeffs: list) -> PersLandscapeExact:
+    """ Compute the linear combination of a list of PersLandscapeExact objects.
+
+    The critical pairs of all landscapes are merged depth by depth in one
+    pass, rather than by repeated pairwise sums. Each function is written in
+    terms of its changes of slope; after a stable sort of the merged
+    x-values, in which the x-values of each landscape form an already sorted
+    run, the changes of slope at equal x-values are added and integrated back
+    into critical pairs.
+
+    Parameters
+    -------
+    landscapes: list
+        a list of PersLandscapeExact objects
+
+    coeffs: list
+        a list of the coefficients defining the linear combination
+
+    Returns
+    -------
+    PersLandscapeExact:
+        The specified linear combination of PersLandscapeExact objects
+        in `landscapes`
+    """
+    if len(landscapes) != len(coeffs):
+        raise ValueError("landscapes and coeffs must have the same length")
+    if len({l.hom_deg for l in landscapes}) > 1:
+        raise ValueError("homological degrees must match")
+    hom_deg = landscapes[0].hom_deg if landscapes else 0
+    depths, xs, changes = [], [], []
+    for l, c in zip(landscapes, coeffs):
+        l.compute_landscape()
+        depths.append(np.repeat(np.arange(l.max_depth), np.diff(l.offsets)))
+        xs.append(l.xs)
+        changes.append(c*_slope_changes(l.xs, l.ys, l.offsets))
+    if not xs or sum(len(x) for x in xs) == 0:
+        return PersLandscapeExact._from_arrays(
+            np.array([]), np.array([]), np.zeros(1, dtype=np.int64),
+            hom_deg=hom_deg)
+    depths, xs, changes = (np.concatenate(depths), np.concatenate(xs),
+                           np.concatenate(changes))
+    # stable sort by depth, then x-value
+    order = np.lexsort((xs, depths))
+    depths, xs, changes = depths[order], xs[order], changes[order]
+
+    # merge critical pairs with equal depth and x-value
+    new = np.ones(len(xs), dtype=bool)
+    new[1:] = (np.diff(depths) != 0) | (np.diff(xs) != 0)
+    starts = np.flatnonzero(new)
+    depths, xs = depths[starts], xs[starts]
+    changes = np.add.reduceat(changes, starts)
+    offsets = np.searchsorted(depths, np.arange(depths[-1] + 2))
+
+    # integrate the slopes back into function values within each depth
+    first = np.repeat(offsets[:-1], np.diff(offsets))
+    slopes = np.cumsum(changes)
+    slopes -= np.concatenate([[0.], slopes])[first]
+    rise = np.concatenate([[0.], slopes[:-1]*np.diff(xs)])
+    ys = np.cumsum(rise)
+    ys -= ys[first]
+    return PersLandscapeExact._from_arrays(xs, ys, offsets.astype(np.int64),
+                                           hom_deg=hom_deg)
+
+
+def average_exact(landscapes: list) -> PersLandscapeExact:
+    """ Compute the average of a list of PersLandscapeExact objects.
+
+    Parameters
+    -------
+    landscapes: list
+        a list of PersLandscapeExact objects
+
+    Returns
+    -------
+    PersLandscapeExact:
+        The average of the PersLandscapeExact objects in `landscapes`
+    """
+    return lc_exact(landscapes, [1.0/len(landscapes) for _ in landscapes])
@@ -2,12 +2,143 @@
 Define Approximate Persistence Landscape class.
 """
 from __future__ import annotations
+import weakref
+import operator
+import functools
 import numpy as np
-from auxiliary import union_vals, ndsnap_regular
+from auxiliary import (union_vals, unique_bars, _snap_axis, _interp_operator,
+                       _resample)
 from operator import itemgetter, attrgetter
 from PersistenceLandscape import PersistenceLandscape
+from landscape_cache import get_cache, landscape_key
+from profiling import stage, count
+from landscape_expr import _lazy_operand, _check_grids
 
-__all__ = ['PersLandscapeApprox', 'snap_PL', 'lc_approx', 'average_approx']
+__all__ = ['Grid', 'PersLandscapeApprox', 'snap_PL', 'lc_approx', 'average_approx',
+           'batch_approx', 'stack_approx', 'RunningLandscapeMean',
+           'LandscapeArray']
+
+# number of integers held at once while the tent heights of
+# `compute_landscape` and `batch_approx` are sorted
+_CHUNK_SIZE = 2**22
+
+# number of values scaled at once by `PersLandscapeApprox.axpy`
+_AXPY_CHUNK = 2**15
+
+
+class Grid:
+    """
+    An immutable grid of `num_steps` evenly spaced points from `start` to
+    `stop`, as given by `np.linspace(start, stop, num_steps)`.
+
+    Grids are interned: constructing a grid with the parameters of an
+    existing one returns that object, so landscapes on the same grid share
+    it and comparing two grids is an identity check. The coordinates and the
+    step are computed once, when first needed, and the coordinates are
+    read-only.
+
+    Parameters
+    ----------
+    start : float
+        The first grid point.
+
+    stop : float
+        The last grid point.
+
+    num_steps : int, default 500
+        The number of grid points.
+
+    Examples
+    --------
+    >>> grid = Grid(0, 2, 500)
+    >>> grid is Grid(0.0, 2.0, 500)
+    True
+    >>> P = PersLandscapeApprox(grid=grid, dgms=dgms)
+    """
+
+    __slots__ = ('start', 'stop', 'num_steps', '_key', '_coords', '_step',
+                 '_regular', '__weakref__')
+
+    # the grids in use, by their parameters
+    _instances = weakref.WeakValueDictionary()
+
+    def __new__(cls, start: float, stop: float, num_steps: int = 500) -> Grid:
+        key = (float(start), float(stop), operator.index(num_steps))
+        if key[2] < 1:
+            raise ValueError(f"num_steps must be positive, but {num_steps} was passed")
+        grid = cls._instances.get(key)
+        if grid is None:
+            grid = super().__new__(cls)
+            for name, value in zip(('start', 'stop', 'num_steps', '_key'),
+                                   key + (key,)):
+                object.__setattr__(grid, name, value)
+            object.__setattr__(grid, '_coords', None)
+            cls._instances[key] = grid
+        return grid
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Grid objects are immutable")
+
+    def __reduce__(self):
+        # unpickling goes through __new__, so the grid is interned again
+        return Grid, self._key
+
+    def __eq__(self, other) -> bool:
+        return self is other or (isinstance(other, Grid)
+                                 and self._key == other._key)
+
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    def __len__(self) -> int:
+        return self.num_steps
+
+    def __repr__(self) -> str:
+        return f'Grid({self.start}, {self.stop}, {self.num_steps})'
+
+    def _compute(self) -> None:
+        coords, step = np.linspace(self.start, self.stop, self.num_steps,
+                                   retstep=True)
+        coords.setflags(write=False)
+        object.__setattr__(self, '_step', step)
+        object.__setattr__(self, '_regular', bool(coords[-1] > coords[0]))
+        object.__setattr__(self, '_coords', coords)
+
+    @property
+    def coords(self) -> np.ndarray:
+        """ The grid points, as a read-only array. """
+        if self._coords is None:
+            self._compute()
+        return self._coords
+
+    @property
+    def step(self) -> float:
+        """ The distance between consecutive grid points. """
+        if self._coords is None:
+            self._compute()
+        return self._step
+
+    def snap(self, x) -> np.ndarray:
+        """ Indices of the grid points nearest to the values in `x`, of the
+        shape of `x`. Ties go to the lower index, as with
+        `ndsnap_indices`. """
+        x = np.asarray(x, dtype=float)
+        coords = self.coords
+        return _snap_axis(x.ravel(), coords, self._regular).reshape(x.shape)
+
+
+@functools.lru_cache(maxsize=256)
+def _grid_operator(source: Grid, target: Grid) -> tuple:
+    """ The interpolation operator from the grid `source` to the grid
+    `target`.
+
+    Intended for internal use. Operators are cached, so landscapes sharing a
+    grid share one operator, whose arrays are read-only.
+    """
+    result = _interp_operator(source.coords, target.coords)
+    for a in result:
+        a.setflags(write=False)
+    return result
 
 
 class PersLandscapeApprox(PersistenceLandscape):
@@ -43,6 +174,14 @@ class PersLandscapeApprox(PersistenceLandscape):
         represents the homology degree of the persistence diagram.
         
     vales 
+
+    max_depth : int, optional
+        If given, only the first `max_depth` landscape functions are
+        computed. Stored as the attribute `depth_limit`.
+
+    grid : Grid, optional
+        The grid, which replaces `start`, `stop` and `num_steps`. Passing
+        the `Grid` of another landscape shares it.
     
     Methods
     -------
@@ -56,9 +195,15 @@ class PersLandscapeApprox(PersistenceLandscape):
     def __init__(
         self, start: float = None, stop: float = None, num_steps: int = 500, 
         dgms: list = [], hom_deg: int = 0, 
-        values = np.array([]), compute: bool = False) -> None:
+        values = np.array([]), compute: bool = False,
+        max_depth: int = None, grid: Grid = None) -> None:
         
         super().__init__(dgms=dgms, hom_deg=hom_deg)
+        if max_depth is not None and max_depth < 1:
+            raise ValueError(f"max_depth must be positive, but {max_depth} was passed")
+        self.depth_limit = max_depth
+        if grid is not None:
+            start, stop, num_steps = grid.start, grid.stop, grid.num_steps
         if dgms: # diagrams are passed
             self.dgms = dgms[self.hom_deg] 
             # remove infity values    
@@ -79,10 +224,12 @@ class PersLandscapeApprox(PersistenceLandscape):
             if stop is None:
                 raise ValueError('stop parameter must be passed if values are passed.')
                 # stop = np.amax(values)
-        self.start = start
-        self.stop = stop
+        if grid is None and start is not None and stop is not None:
+            grid = Grid(start, stop, num_steps)
+        self.grid = grid
         self.values = values
-        self.num_steps = num_steps
+        # the array that values is a view of once it is updated in place
+        self._buffer = None
         if compute:
             self.compute_landscape()
     
@@ -90,6 +237,21 @@ class PersLandscapeApprox(PersistenceLandscape):
         return ('The persistence landscape in homological '
         f'degree {self.hom_deg} on grid from {self.start} to {self.stop}'
         f' with {self.num_steps} steps')
+
+    @property
+    def start(self) -> float:
+        """ The start parameter of the grid. """
+        return None if self.grid is None else self.grid.start
+
+    @property
+    def stop(self) -> float:
+        """ The stop parameter of the grid. """
+        return None if self.grid is None else self.grid.stop
+
+    @property
+    def num_steps(self) -> int:
+        """ The number of steps in the grid. """
+        return None if self.grid is None else self.grid.num_steps
         
     
     def compute_landscape(self, verbose: bool = False) -> list:
@@ -100,73 +262,65 @@ class PersLandscapeApprox(PersistenceLandscape):
             verboseprint('values was stored, exiting')
             return 
         
+        cache = get_cache()
+        if cache is not None:
+            key = landscape_key(self.dgms, 'approx', hom_deg=self.hom_deg,
+                                start=self.start, stop=self.stop,
+                                num_steps=self.num_steps,
+                                max_depth=self.depth_limit)
+            cached = cache.get(key)
+            if cached is not None:
+                verboseprint('values was found in the cache')
+                self.values = cached[0] if cached[0].size else _empty_values()
+                return
+
         verboseprint('values was empty, computing values')
-        # make grid
-        grid_values, step = np.linspace(self.start, self.stop, self.num_steps, 
-                                        retstep = True)
-        #grid_values = list(grid_values)
-        #grid = np.array([[x,y] for x in grid_values for y in grid_values])
+        step = self.grid.step
         bd_pairs = self.dgms       
        
-        # create list of triangle top for each birth death pair
-        birth: 'np.ndarray' = bd_pairs[:, 0]
-        death: 'np.ndarray' = bd_pairs[:, 1]
-        triangle_top_ycoord = (death - birth)/ 2
-        triangle_top = np.array(list(zip((birth + death)/2, (death - birth)/2)))
-
-        # snap birth-death pairs and triangle tops to grid 
-        #bd_pairs_grid = pairs_snap(bd_pairs, grid)
-        bd_pairs_grid = ndsnap_regular(bd_pairs,*(grid_values,grid_values))
-        #triangle_top_grid = pairs_snap(triangle_top, grid)
-        #triangle_top_grid = ndsnap_regular(triangle_top,*(grid_values,grid_values))
-
-        # make grid dictionary 
-        index = list(range(self.num_steps))
-        dict_grid = dict(zip( grid_values, index))
-        
-        # initialze W to a list of 2m + 1 empty lists
-        W = [[] for _ in range(self.num_steps)]
-    
-        # for each birth death pair
-        for ind_in_bd_pairs, bd in enumerate(bd_pairs_grid):
-            [b, d] = bd
-            ind_in_Wb = dict_grid[b] # index in W
-            ind_in_Wd = dict_grid[d] # index in W
-            mid_pt = ind_in_Wb + (ind_in_Wd - ind_in_Wb)//2 # index half way between, rounded down
-            
-            # step through by x value
-            j = 0
-            # j in (b, b+d/2] 
-            for _ in range(ind_in_Wb,mid_pt):
-                j += 1
-                # j*step: adding points from a line with slope 1
-                W[ind_in_Wb +j].append(j*step) 
-          
-            j = 0
-            # j in (b+d/2, d)
-            for _ in range(mid_pt+1,ind_in_Wd):
-                j += 1
-                W[ind_in_Wd  - j].append(j*step)
-                
-        
-        # sort each list in W
-        for i in range(len(W)):
-            W[i] = sorted(W[i], reverse = True)
-            
-        # calculate k: max length of lists in W
-        K = max([len(_) for _ in W ])
-        
-        # initialize L to be a zeros matrix of size K x (2m+1)
-        L = np.array([ np.zeros(self.num_steps) for _ in range(K)])
-        
-        # input values from W to L
-        for i in range(self.num_steps):
-            for k in range(len(W[i])):
-                L[k][i] = W[i][k]
-        
+        with stage('snap'):
+            # indices of the grid points nearest to the births and deaths
+            ind = self.grid.snap(np.reshape(bd_pairs, (-1, 2)))
+            ind_b, ind_d = ind[:, 0], ind[:, 1]
+        index = np.arange(self.num_steps)
+        with stage('duplicates'):
+            # bars that snap to the same grid points have the same tent, so
+            # each distinct tent is computed once and weighted by its count
+            bars, counts = unique_bars(np.column_stack([ind_b, ind_d]))
+            ind_b, ind_d = bars[:, 0], bars[:, 1]
+        count('duplicates', bars=len(ind), unique_bars=len(bars))
+
+        if len(ind_b) and np.all(ind_b == ind_b[0]):
+            verboseprint('all births are equal, using nested tents')
+            # the tents of bars with a common birth are nested, so sorting
+            # the deaths sorts the heights in every column
+            ind_d, counts = ind_d[::-1], counts[::-1]
+            if self.depth_limit is not None:
+                # copies needed for the first depth_limit functions
+                counts = np.diff(np.minimum(np.cumsum(counts), self.depth_limit),
+                                 prepend=0)
+            # only bars with d - b >= 2 reach a positive height
+            keep = (ind_d - ind_b[0] >= 2) & (counts > 0)
+            ind_d, counts = ind_d[keep], counts[keep]
+            with stage('fill'):
+                heights = np.minimum(index - ind_b[0], ind_d[:, np.newaxis] - index)
+            with stage('matrix'):
+                L = np.repeat(step*np.maximum(heights, 0), counts, axis=0)
+        else:
+            # the tents are evaluated only on the columns where they are
+            # positive, in chunks of bars so memory stays bounded for large
+            # diagrams
+            L = _tent_heights(ind_b, ind_d, counts, self.num_steps,
+                              self.depth_limit)
+            L *= step
+        count('matrix', depth=len(L))
+
+        if cache is not None:
+            L = cache.put(key, (L,))[0]
+
         # check if L is empty 
         if not L.size:
-            L = np.array(['empty'])
+            L = _empty_values()
             print('Bad choice of grid, values is empty')
 
         self.values = L
@@ -177,7 +331,7 @@ class PersLandscapeApprox(PersistenceLandscape):
 
         """
         self.compute_landscape()
-        grid_values = list(np.linspace(self.start, self.stop, self.num_steps))
+        grid_values = list(self.grid.coords)
         result = []
         for l in self.values:
             pairs = list(zip(grid_values, l))
@@ -185,24 +339,23 @@ class PersLandscapeApprox(PersistenceLandscape):
         return np.array(result)                
     
     def __add__(self, other: PersLandscapeApprox) -> PersLandscapeApprox:
+        if isinstance(other, LandscapeArray):
+            return NotImplemented
+        expr = _lazy_operand(self, other)
+        if expr is not None:
+            return expr + other
         super().__add__(other)
-        if self.start != other.start:
-            raise ValueError("Start values of grids do not coincide")
-        if self.stop != other.stop:
-            raise ValueError("Stop values of grids do not coincide")
-        if self.num_steps != other.num_steps:
-            raise ValueError("Number of steps of grids do not coincide")
+        _check_grids(self, other)
         self_pad, other_pad = union_vals(self.values, other.values)
-        return PersLandscapeApprox(start=self.start, stop=self.stop, 
-                                        num_steps=self.num_steps,
-                                        hom_deg=self.hom_deg, 
-                                        values=self_pad+other_pad)
+        return PersLandscapeApprox(grid=self.grid, hom_deg=self.hom_deg,
+                                   values=self_pad+other_pad)
     
     def __neg__(self) -> PersLandscapeApprox:
+        expr = _lazy_operand(self)
+        if expr is not None:
+            return -expr
         return PersLandscapeApprox(
-            start=self.start, 
-            stop=self.stop, 
-            num_steps=self.num_steps,
+            grid=self.grid,
             hom_deg=self.hom_deg,
             values = np.array([-1*depth_array for depth_array in self.values]))
         pass
@@ -212,10 +365,11 @@ class PersLandscapeApprox(PersistenceLandscape):
     
     def __mul__(self, other: float) -> PersLandscapeApprox:
         super().__mul__(other)
+        expr = _lazy_operand(self)
+        if expr is not None:
+            return expr*other
         return PersLandscapeApprox(
-            start=self.start, 
-            stop=self.stop, 
-            num_steps=self.num_steps,
+            grid=self.grid,
             hom_deg=self.hom_deg,
             values = np.array([other*depth_array for depth_array in self.values]))
     
@@ -225,6 +379,155 @@ class PersLandscapeApprox(PersistenceLandscape):
     def __truediv__(self, other: float) -> PersLandscapeApprox:
         super().__truediv__(other)
         return (1.0/other)*self
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        """ Apply the arithmetic ufuncs of NumPy with the operators of the
+        class, so that for example `np.float64(2)*P` and `np.add(P, Q)` are
+        landscapes, and `np.add(P, Q, out=(P,))` adds in place. """
+        out = kwargs.pop('out', None)
+        if (method != '__call__' or kwargs or ufunc not in _ARITHMETIC_UFUNCS
+                or any(isinstance(x, LandscapeArray) for x in inputs)):
+            return NotImplemented
+        # numpy scalars as python numbers, which the operators accept
+        inputs = [x.item() if isinstance(x, (np.generic, np.ndarray))
+                  and np.ndim(x) == 0 else x for x in inputs]
+        if any(isinstance(x, np.ndarray) for x in inputs):
+            return NotImplemented
+        if out is None:
+            return _ARITHMETIC_UFUNCS[ufunc](*inputs)
+        if len(out) != 1 or out[0] is not inputs[0] or ufunc not in _INPLACE_UFUNCS:
+            return NotImplemented
+        return _INPLACE_UFUNCS[ufunc](*inputs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        """ `np.stack` of landscapes gives a `LandscapeArray`. """
+        if func is not np.stack or kwargs.get('axis', 0) != 0:
+            return NotImplemented
+        landscapes = list(args[0])
+        if not all(isinstance(pl, PersLandscapeApprox) for pl in landscapes):
+            return NotImplemented
+        return LandscapeArray.from_landscapes(landscapes)
+
+    def __getstate__(self) -> dict:
+        # the values are pickled without the spare rows of the buffer
+        state = self.__dict__.copy()
+        state['_buffer'] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        # landscapes pickled before the grid was shared store its
+        # parameters as attributes, which are now read from `grid`
+        if 'grid' not in state:
+            start = state.pop('start', None)
+            stop = state.pop('stop', None)
+            num_steps = state.pop('num_steps', None)
+            state['grid'] = (None if start is None or stop is None
+                             else Grid(start, stop, num_steps))
+        state.setdefault('_buffer', None)
+        state.setdefault('depth_limit', None)
+        self.__dict__.update(state)
+
+    def copy(self) -> PersLandscapeApprox:
+        """ A copy of the landscape with its own values, e.g. to start an
+        accumulation with in-place operators. """
+        self.compute_landscape()
+        return PersLandscapeApprox(grid=self.grid, hom_deg=self.hom_deg,
+                                   values=np.array(self.values),
+                                   max_depth=self.depth_limit)
+
+    def _own_values(self, depth: int) -> np.ndarray:
+        """ Make `values` a writable view of a buffer owned by the landscape
+        with at least `depth` landscape functions, and return it.
+
+        Intended for internal use. Values that the landscape does not own,
+        such as arrays from the cache, memory maps or arrays passed to the
+        constructor, are copied on the first update. The buffer grows
+        geometrically in depth, so a long accumulation reallocates it only
+        a few times.
+        """
+        self.compute_landscape()
+        values = _float_values(self)
+        depth = max(depth, len(values))
+        owned = self._buffer is not None and values.base is self._buffer
+        if not owned or depth > len(self._buffer):
+            capacity = depth if not owned else max(depth, 2*len(self._buffer))
+            buffer = np.zeros((capacity, self.num_steps))
+            buffer[:len(values)] = values
+            self._buffer = buffer
+        if len(values) != depth or not owned:
+            self.values = self._buffer[:depth]
+        return self.values
+
+    def axpy(self, coeff: float, other: PersLandscapeApprox) -> PersLandscapeApprox:
+        """ Add `coeff*other` to the landscape in place and return it.
+
+        The values are updated in place, a few rows at a time, so an
+        accumulation loop allocates no new landscapes or full-size
+        temporary arrays. Like `__add__`, the result is padded to the
+        larger depth.
+
+        Parameters
+        ----------
+        coeff : float
+            The coefficient of `other`.
+
+        other : PersLandscapeApprox
+            A landscape on the same grid.
+
+        Returns
+        -------
+        PersLandscapeApprox
+            The landscape itself.
+        """
+        super().__mul__(coeff)
+        super().__add__(other)
+        _check_grids(self, other)
+        other.compute_landscape()
+        x = _float_values(other)
+        if not len(x):
+            return self
+        y = self._own_values(len(x))
+        rows = max(1, _AXPY_CHUNK//self.num_steps)
+        for i in range(0, len(x), rows):
+            block = slice(i, min(i + rows, len(x)))
+            if coeff == 1:
+                y[block] += x[block]
+            else:
+                y[block] += coeff*x[block]
+        return self
+
+    def __iadd__(self, other: PersLandscapeApprox) -> PersLandscapeApprox:
+        """ Add `other` to the landscape in place, with `axpy`.
+
+        Unlike `P = P + Q`, `P += Q` updates the object bound to `P`, so
+        every name or list entry referring to it sees the sum. To
+        accumulate into a new landscape, start from a copy, as in
+        `total = landscapes[0].copy()`. The same holds for `-=`, `*=` and
+        `/=`.
+        """
+        if _lazy_operand(self, other) is not None:
+            # lazy arithmetic builds an expression instead
+            return NotImplemented
+        return self.axpy(1.0, other)
+
+    def __isub__(self, other: PersLandscapeApprox) -> PersLandscapeApprox:
+        if _lazy_operand(self, other) is not None:
+            return NotImplemented
+        return self.axpy(-1.0, other)
+
+    def __imul__(self, other: float) -> PersLandscapeApprox:
+        super().__mul__(other)
+        if _lazy_operand(self) is not None:
+            return NotImplemented
+        self.compute_landscape()
+        if len(_float_values(self)):
+            self._own_values(0)[...] *= other
+        return self
+
+    def __itruediv__(self, other: float) -> PersLandscapeApprox:
+        super().__truediv__(other)
+        self *= 1.0/other
+        return self
     
     def __getitem__(self, key: slice) -> list:
         """
@@ -254,6 +557,105 @@ class PersLandscapeApprox(PersistenceLandscape):
 # End PersLandscapeApprox class definition #
 ############################################
 
+def _empty_values() -> np.ndarray:
+    """ The placeholder values of a landscape without positive functions,
+    e.g. of an empty diagram. """
+    return np.array(['empty'])
+
+def _landscape_from_values(grid: Grid, values: np.ndarray,
+                           hom_deg: int = 0) -> PersLandscapeApprox:
+    """ A landscape on `grid` with `values`, or with the placeholder values
+    if `values` has no functions. """
+    if not np.size(values):
+        values = _empty_values()
+    return PersLandscapeApprox(grid=grid, hom_deg=hom_deg, values=values)
+
+def _float_values(landscape: PersLandscapeApprox) -> np.ndarray:
+    """ The computed values of `landscape` as a float array, with zero rows
+    for the placeholder values of an empty landscape. """
+    if isinstance(landscape, PersLandscapeApprox):
+        landscape.compute_landscape()
+    values = np.asarray(landscape.values)
+    if values.dtype.kind not in 'biuf':
+        return np.zeros((0, landscape.num_steps))
+    return values.astype(float, copy=False)
+
+def _tent_heights(ind_b: np.ndarray, ind_d: np.ndarray, counts: np.ndarray,
+                  num_cols: int, depth: int = None) -> np.ndarray:
+    """ The tent heights of the bars with snapped births `ind_b`, deaths
+    `ind_d` and multiplicities `counts`, sorted in decreasing order in each
+    column.
+
+    Intended for internal use. The height of a bar in column j is
+    min(j - b, d - j) in units of the grid step, and is only evaluated on the
+    columns b < j < d where it is positive, so the work is proportional to
+    the total support of the bars rather than to bars times columns. The
+    columns are split into windows holding about `_CHUNK_SIZE/8` (column,
+    height) pairs; the pairs of a window are sorted together and scattered
+    by their rank in the column. If `depth` is given, only the largest
+    `depth` heights of each column are kept.
+
+    Returns
+    -------
+    numpy array
+        A float array of shape (K, num_cols), where K is the largest number
+        of positive heights in a column, at most `depth`.
+    """
+    # only bars with d - b >= 2 reach a positive height
+    keep = ind_d - ind_b >= 2
+    ind_b, ind_d, counts = ind_b[keep], ind_d[keep], counts[keep]
+    order = np.argsort(ind_b, kind='stable')
+    ind_b, ind_d, counts = ind_b[order], ind_d[order], counts[order]
+    # the number of bars, and of copies of bars, over each column
+    bars = np.cumsum(np.bincount(ind_b + 1, minlength=num_cols + 1)
+                     - np.bincount(ind_d, minlength=num_cols + 1))[:num_cols]
+    copies = np.cumsum(np.bincount(ind_b + 1, counts, minlength=num_cols + 1)
+                       - np.bincount(ind_d, counts, minlength=num_cols + 1))
+    K = int(np.max(copies, initial=0))
+    if depth is not None:
+        K = min(K, depth)
+    L = np.zeros((K, num_cols))
+    # each window of columns holds a few integer arrays per pair
+    pairs = np.cumsum(bars)
+    chunk = max(1, _CHUNK_SIZE//8)
+    bounds = np.unique(np.searchsorted(
+        pairs, np.arange(chunk, pairs[-1] if num_cols else 0, chunk)) + 1)
+    for lo, hi in zip(np.concatenate([[0], bounds]),
+                      np.concatenate([bounds, [num_cols]])):
+        # the bars over the columns lo, ..., hi - 1, clipped to them
+        last = np.searchsorted(ind_b, hi - 1)
+        over = ind_d[:last] > lo
+        b, d, n = ind_b[:last][over], ind_d[:last][over], counts[:last][over]
+        if not len(b):
+            continue
+        first, end = np.maximum(b + 1, lo), np.minimum(d, hi)
+        w = end - first
+        with stage('fill'):
+            col = np.repeat(first - np.cumsum(w) + w, w) + np.arange(w.sum())
+            height = np.minimum(col - np.repeat(b, w), np.repeat(d, w) - col)
+        with stage('sort'):
+            # by column, then by decreasing height
+            order = np.argsort(col*(np.max(height) + 1) - height)
+            col, height = col[order], height[order]
+            weight = np.repeat(n, w)[order]
+            # rank of the first copy of each pair in its column
+            cumulative = np.cumsum(weight) - weight
+            starts = np.flatnonzero(np.diff(col, prepend=-1))
+            rank = cumulative - np.repeat(cumulative[starts],
+                                          np.diff(starts, append=col.size))
+            if depth is not None:
+                weight = np.minimum(weight, depth - rank)
+                kept = weight > 0
+                col, height = col[kept], height[kept]
+                weight, rank = weight[kept], rank[kept]
+        with stage('matrix'):
+            # one entry per copy, at ranks rank, ..., rank + weight - 1
+            offsets = np.arange(weight.sum()) - np.repeat(
+                np.cumsum(weight) - weight, weight)
+            L[np.repeat(rank, weight) + offsets,
+              np.repeat(col, weight)] = np.repeat(height, weight)
+    return L
+
 def snap_PL(l: list, start: float = None, stop: float = None, num_steps : int =  None) -> list:
         """ Snap a list of PersLandscapeApprox tpes to a common grid
         
@@ -272,26 +674,61 @@ def snap_PL(l: list, start: float = None, stop: float = None, num_steps : int =
             stop = max(l,key=attrgetter('stop')).stop
         if num_steps is None:
             num_steps = max(l,key=attrgetter('num_steps')).num_steps
-        grid = np.linspace(start, stop, num_steps) 
+        target = Grid(start, stop, num_steps)
         k = []
         for pl in l:
-            snapped_landscape = []
-            for funct in pl:
-                # snap each function and store 
-                snapped_landscape.append(np.array(np.interp(grid, np.linspace(pl.start, pl.stop,
-                                                                     pl.num_steps), funct)))
+            values = _float_values(pl)
+            if len(values):
+                # one interpolation operator per source grid, shared by
+                # every landscape function
+                values = _resample(values, _grid_operator(pl.grid, target))
+            else:
+                # landscapes of empty diagrams keep their placeholder values
+                values = pl.values
             # store snapped persistence landscape   
-            k.append( PersLandscapeApprox(start=start, stop=stop, num_steps=num_steps,
-                                     values=np.array(snapped_landscape), 
+            k.append( PersLandscapeApprox(grid=target, values=values, 
                                      hom_deg = pl.hom_deg))
         return k
     
+def stack_approx(landscapes: list, start: float = None, stop: float = None,
+                 num_steps: int = None) -> np.ndarray:
+    """ Snap a list of PersLandscapeApprox types to a common grid and stack
+    their values.
+
+    The grid parameters default to those of `snap_PL`. Landscapes already on
+    the common grid are copied without interpolation.
+
+    Returns
+    -------
+    numpy array
+        An array of shape (len(landscapes), max_depth, num_steps), padded with
+        zero functions.
+    """
+    if start is None:
+        start = min(landscapes, key=attrgetter('start')).start
+    if stop is None:
+        stop = max(landscapes, key=attrgetter('stop')).stop
+    if num_steps is None:
+        num_steps = max(landscapes, key=attrgetter('num_steps')).num_steps
+    depths = [len(_float_values(pl)) for pl in landscapes]
+    result = np.zeros((len(landscapes), max(depths, default=0), num_steps))
+    target = Grid(start, stop, num_steps)
+    for i, (pl, depth) in enumerate(zip(landscapes, depths)):
+        if not depth:
+            continue
+        if pl.grid is target:
+            result[i, :depth] = pl.values
+        else:
+            result[i, :depth] = _resample(pl.values,
+                                          _grid_operator(pl.grid, target))
+    return result
+
 def lc_approx(landscapes: list, coeffs: list, start: float = None, stop: float = None,
              num_steps: int = None) -> PersLandscapeApprox:
     """ Compute the linear combination of a list of PersLandscapeApprox objects.
     
-        This uses vectorized arithmetic from numpy, so it should be faster and
-        more memory efficient than a naive for-loop.
+        The landscapes are stacked into a `LandscapeArray`, and the
+        combination is one tensor product with its padded values.
     
         Parameters
         -------
@@ -320,8 +757,9 @@ def lc_approx(landscapes: list, coeffs: list, start: float = None, stop: float =
         in `landscapes`
         
     """
-    l = snap_PL(landscapes, start = start, stop = stop, num_steps = num_steps)
-    return np.sum(np.array(coeffs)*np.array(l))
+    A = LandscapeArray.from_landscapes(landscapes, start=start, stop=stop,
+                                       num_steps=num_steps)
+    return A.linear_combination(coeffs)
 
 def average_approx(landscapes: list, start: float = None, stop: float = None, 
                num_steps: int = None)-> PersLandscapeApprox:
@@ -350,4 +788,439 @@ def average_approx(landscapes: list, start: float = None, stop: float = None,
             The specified average of PersLandscapeApprox objects in `landscapes`
     """
     return lc_approx(landscapes=landscapes, coeffs = [1.0/len(landscapes) for _ in landscapes],
-                   start=start,stop=stop,num_steps=num_steps)
\ No newline at end of file
+                   start=start,stop=stop,num_steps=num_steps)
+
+def batch_approx(dgms_list: list, hom_deg: int = 0, start: float = None,
+                 stop: float = None, num_steps: int = 500,
+                 max_depth: int = None) -> np.ndarray:
+    """ Compute the approximate landscapes of many diagrams on one grid.
+
+    All diagrams are sampled on the grid given by `start`, `stop` and
+    `num_steps`, and the tent heights are computed and sorted for many
+    diagrams at once rather than one `PersLandscapeApprox` at a time.
+    The landscape of the i-th diagram is `result[i]`, padded with zero
+    functions to the largest depth, and agrees with
+    `PersLandscapeApprox(start, stop, num_steps, dgms=dgms_list[i],
+    hom_deg=hom_deg, compute=True).values`.
+
+    Parameters
+    ----------
+    dgms_list : list
+        A list of diagrams, each in the output format from ripser.py.
+
+    hom_deg : int
+        The homological degree.
+
+    start : float, optional
+        The start parameter of the grid. Defaults to the smallest birth time
+        over all diagrams.
+
+    stop : float, optional
+        The stop parameter of the grid. Defaults to the largest death time
+        over all diagrams.
+
+    num_steps : int, default 500
+        The number of steps in the grid.
+
+    max_depth : int, optional
+        If given, only the first `max_depth` landscape functions are
+        computed.
+
+    Returns
+    -------
+    numpy array
+        An array of shape (len(dgms_list), depth, num_steps), where depth is
+        at most `max_depth`.
+    """
+    if max_depth is not None and max_depth < 1:
+        raise ValueError(f"max_depth must be positive, but {max_depth} was passed")
+    bd_pairs = []
+    for dgms in dgms_list:
+        pairs = np.asarray(dgms[hom_deg], dtype=float).reshape(-1, 2)
+        bd_pairs.append(pairs[~np.any(pairs == np.inf, axis=1)])
+    sizes = np.array([len(pairs) for pairs in bd_pairs], dtype=int)
+    all_pairs = np.concatenate(bd_pairs) if bd_pairs else np.empty((0, 2))
+    if start is None:
+        start = np.min(all_pairs[:, 0])
+    if stop is None:
+        stop = np.max(all_pairs[:, 1])
+    grid = Grid(start, stop, num_steps)
+    with stage('snap'):
+        ind = grid.snap(all_pairs).astype(np.int64)
+    # the diagrams side by side on one axis of len(dgms_list)*num_steps
+    # columns, where no tent crosses from one diagram to the next
+    ind += np.repeat(np.arange(len(sizes))*num_steps, sizes)[:, np.newaxis]
+    with stage('duplicates'):
+        bars, counts = unique_bars(ind)
+        ind_b, ind_d = bars[:, 0], bars[:, 1]
+    count('duplicates', bars=len(ind), unique_bars=len(bars))
+    if max_depth is not None and len(bars):
+        # the tents of the bars of a diagram with a common birth are nested,
+        # so only the copies of the max_depth bars with the largest deaths
+        # are needed
+        starts = np.flatnonzero(np.diff(ind_b//num_steps, prepend=-1))
+        ends = np.append(starts[1:], len(bars))
+        nested = np.repeat(ind_b[starts] == ind_b[ends - 1], ends - starts)
+        # copies of bars of the same diagram with a larger death
+        cumulative = np.cumsum(counts)
+        above = np.repeat(cumulative[ends - 1], ends - starts) - cumulative
+        counts = np.where(nested, np.clip(max_depth - above, 0, counts), counts)
+    # each window of columns may cover bars of several diagrams, or part of
+    # the bars of one large diagram, and keeps only the largest max_depth
+    # heights of each column
+    L = _tent_heights(ind_b, ind_d, counts, len(sizes)*num_steps, max_depth)
+    L *= grid.step
+    with stage('matrix'):
+        result = L.reshape(len(L), len(sizes), num_steps).transpose(1, 0, 2)
+    count('matrix', diagrams=len(sizes), depth=len(L))
+    return result
+
+
+class RunningLandscapeMean:
+    """
+    Streaming mean and variance of approximate persistence landscapes.
+
+    Landscapes (or diagrams) are consumed one at a time, e.g. from a
+    generator, and accumulated with Welford's algorithm into buffers of shape
+    (depth, num_steps) on a fixed grid. The buffers grow geometrically in depth
+    only when a deeper landscape arrives, so memory does not depend on the
+    number of samples.
+
+    Parameters
+    ----------
+    start : float
+        The start parameter of the grid.
+
+    stop : float
+        The stop parameter of the grid.
+
+    num_steps : int, default 500
+        The number of steps in the grid.
+
+    hom_deg : int
+        The homological degree of the landscapes.
+
+    Examples
+    --------
+    >>> acc = RunningLandscapeMean(start=0, stop=2, num_steps=500, hom_deg=1)
+    >>> for dgms in diagram_stream:
+    ...     acc.update(dgms)
+    >>> avg = acc.mean()
+    """
+
+    def __init__(self, start: float, stop: float, num_steps: int = 500,
+                 hom_deg: int = 0) -> None:
+        self.start = start
+        self.stop = stop
+        self.num_steps = num_steps
+        self.grid = Grid(start, stop, num_steps)
+        self.hom_deg = hom_deg
+        self.n = 0
+        self.depth = 0
+        self._mean = np.zeros((0, num_steps))
+        self._m2 = np.zeros((0, num_steps))
+
+    def __repr__(self) -> str:
+        return (f'Running mean of {self.n} persistence landscapes in '
+                f'homological degree {self.hom_deg} on grid from {self.start} '
+                f'to {self.stop} with {self.num_steps} steps')
+
+    def _grow(self, depth: int) -> None:
+        """ Make room for `depth` landscape functions in the buffers. """
+        if depth > len(self._mean):
+            capacity = max(depth, 2*len(self._mean))
+            pad = ((0, capacity - len(self._mean)), (0, 0))
+            self._mean = np.pad(self._mean, pad)
+            self._m2 = np.pad(self._m2, pad)
+        self.depth = max(self.depth, depth)
+
+    def _values(self, landscape) -> np.ndarray:
+        """ The values of `landscape` on the grid of the accumulator. """
+        if not isinstance(landscape, PersLandscapeApprox):
+            landscape = PersLandscapeApprox(
+                grid=self.grid, dgms=landscape, hom_deg=self.hom_deg)
+        elif landscape.hom_deg != self.hom_deg:
+            raise ValueError("Persistence landscapes must be of same homological degree")
+        values = _float_values(landscape)
+        if not len(values):
+            return values
+        if landscape.grid is not self.grid:
+            values = _resample(values, _grid_operator(landscape.grid, self.grid))
+        return values
+
+    def update(self, landscape) -> None:
+        """ Add one landscape to the accumulator.
+
+        Parameters
+        ----------
+        landscape : PersLandscapeApprox or list
+            A landscape, which is snapped to the grid of the accumulator if
+            needed, or a diagram in the output format from ripser.py.
+        """
+        values = self._values(landscape)
+        self._grow(len(values))
+        self.n += 1
+        mean, m2 = self._mean[:self.depth], self._m2[:self.depth]
+        delta = -mean
+        delta[:len(values)] += values
+        mean += delta/self.n
+        # delta*(x - new mean), where x is zero past the depth of values
+        delta2 = -mean
+        delta2[:len(values)] += values
+        m2 += delta*delta2
+
+    def update_many(self, landscapes) -> None:
+        """ Add every landscape from an iterable to the accumulator. """
+        for landscape in landscapes:
+            self.update(landscape)
+
+    def mean(self) -> PersLandscapeApprox:
+        """ Return the mean of the landscapes seen so far. """
+        if not self.n:
+            raise ValueError("No landscapes have been accumulated")
+        return PersLandscapeApprox(
+            grid=self.grid, hom_deg=self.hom_deg, values=self._mean[:self.depth].copy())
+
+    def variance(self, ddof: int = 0) -> PersLandscapeApprox:
+        """ Return the pointwise variance of the landscapes seen so far.
+
+        Parameters
+        ----------
+        ddof : int, default 0
+            Delta degrees of freedom; the divisor is `n - ddof`.
+        """
+        if self.n <= ddof:
+            raise ValueError("Not enough landscapes have been accumulated")
+        return PersLandscapeApprox(
+            grid=self.grid, hom_deg=self.hom_deg,
+            values=self._m2[:self.depth]/(self.n - ddof))
+
+
+# numpy functions implemented by LandscapeArray and LandscapeCollection
+_ARRAY_FUNCTIONS = {}
+
+
+def _implements(func):
+    def register(handler):
+        _ARRAY_FUNCTIONS[func] = handler
+        return handler
+    return register
+
+
+def _collection_array_function(func, types, args, kwargs):
+    """ The `__array_function__` of `LandscapeArray` and
+    `LandscapeCollection`. """
+    handler = _ARRAY_FUNCTIONS.get(func)
+    if handler is None:
+        return NotImplemented
+    return handler(*args, **kwargs)
+
+
+@_implements(np.mean)
+def _mean(a, axis=None, **kwargs):
+    if axis not in (None, 0) or kwargs:
+        return np.mean(np.asarray(a), axis=axis, **kwargs)
+    return a.mean()
+
+
+@_implements(np.sum)
+def _sum(a, axis=None, **kwargs):
+    if axis not in (None, 0) or kwargs:
+        return np.sum(np.asarray(a), axis=axis, **kwargs)
+    return a.linear_combination(np.ones(len(a)))
+
+
+@_implements(np.var)
+def _var(a, axis=None, ddof=0, **kwargs):
+    if axis not in (None, 0) or kwargs:
+        return np.var(np.asarray(a), axis=axis, ddof=ddof, **kwargs)
+    return a.variance(ddof=ddof)
+
+
+@_implements(np.average)
+def _average(a, axis=None, weights=None, **kwargs):
+    if axis not in (None, 0) or kwargs:
+        return np.average(np.asarray(a), axis=axis, weights=weights, **kwargs)
+    if weights is None:
+        return a.mean()
+    weights = np.asarray(weights, dtype=float)
+    return a.linear_combination(weights/weights.sum())
+
+
+@_implements(np.dot)
+def _dot(a, b, out=None):
+    if out is not None or np.ndim(a) != 1 or not hasattr(b, 'linear_combination'):
+        return np.dot(np.asarray(a), np.asarray(b), out=out)
+    return b.linear_combination(a)
+
+
+class LandscapeArray(np.lib.mixins.NDArrayOperatorsMixin):
+    """
+    A stack of approximate persistence landscapes on a common grid, stored
+    as one dense array of values.
+
+    The values have shape (n, depth, num_steps), padded with zero
+    functions. NumPy functions over the landscapes run on this array
+    instead of looping over PersLandscapeApprox objects: `np.mean`,
+    `np.sum`, `np.var` and `np.average` over the landscapes and
+    `np.dot(coeffs, A)` return a PersLandscapeApprox, and `np.stack` of
+    PersLandscapeApprox objects returns a LandscapeArray. Arithmetic with
+    numbers, landscapes and other arrays on the same grid is elementwise, and
+    `np.asarray(A)` gives the values.
+
+    Parameters
+    ----------
+    values : numpy array
+        The values, of shape (n, depth, num_steps).
+
+    grid : Grid
+        The grid of the landscapes.
+
+    hom_deg : int
+        The homological degree of the landscapes.
+
+    Examples
+    --------
+    >>> A = np.stack(landscapes)
+    >>> avg = np.mean(A)
+    >>> combination = np.dot(coeffs, A)
+    """
+
+    def __init__(self, values: np.ndarray, grid: Grid, hom_deg: int = 0) -> None:
+        values = np.asarray(values, dtype=float)
+        if values.ndim != 3 or values.shape[2] != grid.num_steps:
+            raise ValueError(f"values of shape {values.shape} do not match "
+                             f"a grid with {grid.num_steps} steps")
+        self.values = values
+        self.grid = grid
+        self.hom_deg = hom_deg
+
+    @classmethod
+    def from_landscapes(cls, landscapes: list, start: float = None,
+                        stop: float = None, num_steps: int = None) -> LandscapeArray:
+        """ Stack PersLandscapeApprox objects with `stack_approx`, snapping
+        them to a common grid whose parameters default to those of
+        `snap_PL`. """
+        if len({pl.hom_deg for pl in landscapes}) > 1:
+            raise ValueError("Persistence landscapes must be of same homological degree")
+        if not landscapes and None in (start, stop, num_steps):
+            raise ValueError("the grid must be given to stack no landscapes")
+        values = stack_approx(landscapes, start=start, stop=stop,
+                              num_steps=num_steps)
+        if start is None:
+            start = min(landscapes, key=attrgetter('start')).start
+        if stop is None:
+            stop = max(landscapes, key=attrgetter('stop')).stop
+        if num_steps is None:
+            num_steps = max(landscapes, key=attrgetter('num_steps')).num_steps
+        hom_deg = landscapes[0].hom_deg if landscapes else 0
+        return cls(values, Grid(start, stop, num_steps), hom_deg)
+
+    def __repr__(self) -> str:
+        return (f'Array of {len(self)} persistence landscapes in homological '
+                f'degree {self.hom_deg} on grid from {self.grid.start} to '
+                f'{self.grid.stop} with {self.grid.num_steps} steps')
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, key):
+        """ The landscape at an integer index, whose values are a view of the
+        array, or a LandscapeArray for other indices. """
+        if isinstance(key, (int, np.integer)):
+            return self._landscape(self.values[key])
+        return LandscapeArray(self.values[key], self.grid, self.hom_deg)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        if copy:
+            return np.array(self.values, dtype=dtype)
+        return np.asarray(self.values, dtype=dtype)
+
+    def _landscape(self, values: np.ndarray) -> PersLandscapeApprox:
+        return _landscape_from_values(self.grid, values, self.hom_deg)
+
+    def linear_combination(self, coeffs) -> PersLandscapeApprox:
+        """ The linear combination of the landscapes with coefficients
+        `coeffs`, one per landscape. """
+        coeffs = np.asarray(coeffs, dtype=float)
+        if coeffs.shape != (len(self),):
+            raise ValueError(f"{coeffs.size} coefficients were passed for "
+                             f"{len(self)} landscapes")
+        return self._landscape(np.tensordot(coeffs, self.values, axes=1))
+
+    def mean(self) -> PersLandscapeApprox:
+        """ The average of the landscapes. """
+        if not len(self):
+            raise ValueError("The array is empty")
+        return self._landscape(self.values.mean(axis=0))
+
+    def variance(self, ddof: int = 0) -> PersLandscapeApprox:
+        """ The pointwise variance of the landscapes.
+
+        Parameters
+        ----------
+        ddof : int, default 0
+            Delta degrees of freedom; the divisor is `n - ddof`.
+        """
+        if len(self) <= ddof:
+            raise ValueError("Not enough landscapes in the array")
+        return self._landscape(self.values.var(axis=0, ddof=ddof))
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func is np.concatenate:
+            return _concatenate(*args, **kwargs)
+        return _collection_array_function(func, types, args, kwargs)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs or ufunc not in _ARITHMETIC_UFUNCS:
+            return NotImplemented
+        landscapes = [x for x in inputs
+                      if isinstance(x, (LandscapeArray, PersLandscapeApprox))]
+        numbers = [x for x in inputs if not isinstance(
+                   x, (LandscapeArray, PersLandscapeApprox)) and np.ndim(x) == 0]
+        if len(landscapes) + len(numbers) != len(inputs):
+            return NotImplemented
+        # sums and differences of landscapes, and products and quotients
+        # of landscapes by numbers
+        if ufunc in (np.add, np.subtract, np.negative):
+            if numbers:
+                return NotImplemented
+        elif len(numbers) != 1 or inputs[0] is numbers[0] and ufunc is np.true_divide:
+            return NotImplemented
+        first = landscapes[0]
+        for x in landscapes[1:]:
+            if x.hom_deg != first.hom_deg:
+                raise ValueError("Persistence landscapes must be of same homological degree")
+            _check_grids(first, x)
+        # a single landscape is combined with every landscape of the array
+        values = {id(x): _float_values(x) if isinstance(x, LandscapeArray)
+                  else _float_values(x)[np.newaxis] for x in landscapes}
+        # pad to the larger depth, like `PersLandscapeApprox.__add__`
+        depth = max(v.shape[1] for v in values.values())
+        operands = [np.pad(values[id(x)],
+                           ((0, 0), (0, depth - values[id(x)].shape[1]), (0, 0)))
+                    if id(x) in values else x for x in inputs]
+        return LandscapeArray(ufunc(*operands), first.grid, first.hom_deg)
+
+
+def _concatenate(arrays, axis=0, **kwargs):
+    arrays = list(arrays)
+    if (axis != 0 or kwargs or not arrays
+            or not all(isinstance(a, LandscapeArray) for a in arrays)):
+        return NotImplemented
+    for a in arrays[1:]:
+        if a.hom_deg != arrays[0].hom_deg:
+            raise ValueError("Persistence landscapes must be of same homological degree")
+        _check_grids(arrays[0], a)
+    depth = max(a.values.shape[1] for a in arrays)
+    return LandscapeArray(np.concatenate([
+        np.pad(a.values, ((0, 0), (0, depth - a.values.shape[1]), (0, 0)))
+        for a in arrays]), arrays[0].grid, arrays[0].hom_deg)
+
+
+# the ufuncs applied by the arithmetic operators of the landscape classes
+_ARITHMETIC_UFUNCS = {np.add: operator.add, np.subtract: operator.sub,
+                      np.multiply: operator.mul, np.true_divide: operator.truediv,
+                      np.negative: operator.neg}
+_INPLACE_UFUNCS = {np.add: operator.iadd, np.subtract: operator.isub,
+                   np.multiply: operator.imul, np.true_divide: operator.itruediv}
@@ -3,10 +3,12 @@ Auxilary functions for working with persistence diagrams.
 """
 
 from __future__ import annotations
+import os
 import itertools
 import numpy as np
+from landscape_expr import LandscapeExpr
 
-__all__ = ["death_vector", "linear_combination"]
+__all__ = ["death_vector", "linear_combination", "unique_bars"]
 
 def death_vector(dgms: list, hom_deg: int = 0):
     """ Returns the death vector in degree 0 for the persistence diagram
@@ -29,6 +31,31 @@ def death_vector(dgms: list, hom_deg: int = 0):
     return sorted(dgms[hom_deg][:,1], reverse=True)
     
 
+def unique_bars(bd_pairs: np.ndarray) -> tuple:
+    """ Collapse repeated bars of a diagram into unique bars with counts.
+
+    Diagrams from ripser often contain many copies of the same birth-death
+    pair. The landscape algorithms compute each distinct bar once and use the
+    counts for the copies.
+
+    Parameters
+    ----------
+    bd_pairs : numpy array
+        An (n, 2) array of birth-death pairs.
+
+    Returns
+    -------
+    bars : numpy array
+        The distinct rows of `bd_pairs`, sorted by birth and then by death.
+
+    counts : numpy array
+        The number of copies of each row of `bars` in `bd_pairs`.
+    """
+    bd_pairs = np.asarray(bd_pairs).reshape(-1, 2)
+    if not len(bd_pairs):
+        return bd_pairs, np.zeros(0, dtype=np.int64)
+    return np.unique(bd_pairs, axis=0, return_counts=True)
+
 def linear_combination(landscapes: list, coeffs: list):
     """ Compute a linear combination of landscapes
     Parameters
@@ -39,12 +66,13 @@ def linear_combination(landscapes: list, coeffs: list):
 
     Returns
     -------
-    None.
+    PersistenceLandscape
+        The landscapes are combined in a single pass by
+        `LandscapeExpr.evaluate`.
     """
-    result = coeffs[0]*landscapes[0]
-    for c, L in enumerate(landscapes):
-        result += coeffs[c]*L
-    return result
+    if len(landscapes) != len(coeffs):
+        raise ValueError("landscapes and coeffs must have the same length")
+    return LandscapeExpr(list(zip(coeffs, landscapes))).evaluate()
 
 def union_vals(A,B):
     """ Helper function for summing grid landscapes.
@@ -147,25 +175,23 @@ def sum_slopes(a: list, b: list) -> list:
     """
     result = []
     am, bm = 0, 0  # initialize slopes
-    while len(a) > 0 or len(b) > 0:
-        if len(a) == 0 or (len(a) > 0 and len(b) > 0 and a[0][0] > b[0][0]):
+    i, j = 0, 0  # positions of the next pairs of a and b
+    while i < len(a) or j < len(b):
+        if i == len(a) or (j < len(b) and a[i][0] > b[j][0]):
             # The next critical pair comes from list b.
-            bx, bm = b[0]
-            # pop b0
-            b = b[1:]
+            bx, bm = b[j]
+            j += 1
             result.append([bx, am + bm])
-        elif len(b) == 0 or (len(a) > 0 and len(b) > 0 and a[0][0] < b[0][0]):
+        elif j == len(b) or a[i][0] < b[j][0]:
             # The next critical pair comes from list a.
-            ax, am = a[0]
-            # pop a0
-            a = a[1:]
+            ax, am = a[i]
+            i += 1
             result.append([ax, am + bm])
         else:
             # The x-values of two critical pairs coincide.
-            ax, am = a[0]
-            bx, bm = b[0]
-            # pop a0 and b0
-            a, b = a[1:], b[1:]
+            ax, am = a[i]
+            bx, bm = b[j]
+            i, j = i + 1, j + 1
             result.append([ax, am + bm])
     return result
 
@@ -196,16 +222,112 @@ def sum_slopes(a: list, b: list) -> list:
 #     best = np.argmin(diffs, axis = 1)
 #     return  grid[best,:]
 
+def _resolve_n_jobs(n_jobs: int = None) -> int:
+    """ The number of worker processes for an `n_jobs` parameter: None, 0
+    and 1 mean one process, which runs in the caller, and a negative value
+    means every CPU. """
+    if not n_jobs:
+        return 1
+    if n_jobs < 0:
+        return os.cpu_count() or 1
+    return n_jobs
+
+def _snap_axis(x: np.ndarray, ax: np.ndarray, regular: bool = None) -> np.ndarray:
+    """ Index of the grid point of `ax` nearest to each value of `x`.
+
+    Ties go to the lowest index, as with an argmin over the whole grid, and
+    non-finite values go to index 0. A regular grid (as from np.linspace)
+    gives an estimate of the index by arithmetic and an irregular sorted grid
+    by binary search; only a few neighbouring grid points are then compared.
+    `regular` tells whether `ax` is an increasing regular grid, which is
+    checked if it is None.
+    """
+    m = len(ax)
+    if m < 2 or not len(x):
+        return np.zeros(len(x), dtype=np.intp)
+    if regular is None:
+        regular = ax[-1] > ax[0] and np.array_equal(ax, np.linspace(ax[0], ax[-1], m))
+    if not regular and np.any(ax[1:] < ax[:-1]):
+        # unsorted grid: compare with every grid point
+        return np.argmin(np.abs(ax[:, np.newaxis] - x), axis=0)
+    finite = np.isfinite(x)
+    x = np.where(finite, x, ax[0])
+    if regular:
+        # the grid point below x, up to rounding, so compare a window of four
+        below = np.floor((x - ax[0])/((ax[-1] - ax[0])/(m - 1)))
+        below = np.clip(below, -1, m - 1).astype(np.intp)
+        window = np.arange(-1, 3)
+    else:
+        # the grid point below x, so compare it and the next one
+        below = np.searchsorted(ax, x) - 1
+        window = np.arange(2)
+    candidates = np.clip(below[:, np.newaxis] + window, 0, m - 1)
+    best = np.argmin(np.abs(ax[candidates] - x[:, np.newaxis]), axis=1)
+    best = candidates[np.arange(len(x)), best]
+    # the first of any repeated grid values
+    best = np.searchsorted(ax, ax[best])
+    best[~finite] = 0
+    return best
+
+
+def ndsnap_indices(points, *grid_axes) -> np.ndarray:
+    """ Indices of the grid points nearest to `points` on each axis.
+
+    Parameters
+    ----------
+    points : numpy array
+        An (n, d) array of points.
+
+    *grid_axes : numpy array
+        The coordinates of the grid on each of the d axes.
+
+    Returns
+    -------
+    numpy array
+        An (n, d) array of indices, such that `ax[indices[:, i]]` is
+        `ndsnap_regular(points, *grid_axes)[:, i]`.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, len(grid_axes))
+    return np.column_stack([_snap_axis(points[:, i], np.asarray(ax, dtype=float))
+                            for i, ax in enumerate(grid_axes)]).reshape(
+                                -1, len(grid_axes))
+
+
+def _interp_operator(xp: np.ndarray, x: np.ndarray) -> tuple:
+    """ The two-tap linear operator of `np.interp(x, xp, fp)`.
+
+    Intended for internal use. `xp` must be increasing. Returns arrays `lo`,
+    `hi` and `w` of the length of `x` such that `fp[lo] + w*(fp[hi] - fp[lo])`
+    is `np.interp(x, xp, fp)` for any `fp`, up to rounding, holding the end
+    values of `fp` constant outside of `xp`.
+    """
+    m = len(xp)
+    # the last point of xp not above x
+    lo = np.clip(np.searchsorted(xp, x, side='right') - 1, 0, m - 1)
+    hi = np.minimum(lo + 1, m - 1)
+    inside = (x > xp[0]) & (hi > lo)
+    w = np.zeros(len(x))
+    w[inside] = ((x[inside] - xp[lo[inside]])
+                 /(xp[hi[inside]] - xp[lo[inside]]))
+    hi[~inside] = lo[~inside]
+    return lo, hi, w
+
+
+def _resample(values: np.ndarray, operator: tuple) -> np.ndarray:
+    """ Apply an interpolation operator to the last axis of `values`, so
+    every landscape function is resampled by one gather and multiply. """
+    lo, hi, w = operator
+    low = values[..., lo]
+    return low + w*(values[..., hi] - low)
+
+
 def ndsnap_regular(points, *grid_axes):   
     """ Snap points to the 2d grid determined by grid_axes
     """      
-    # https://stackoverflow.com/q/8457645/717525
-    snapped = []                                         
-    for i, ax in enumerate(grid_axes):                         
-        diff = ax[:, np.newaxis] - points[:, i]
-        best = np.argmin(np.abs(diff), axis=0)                                                                                                  
-        snapped.append(ax[best])                                                                                           
-    return np.array(snapped).T
+    indices = ndsnap_indices(points, *grid_axes)
+    return np.array([np.asarray(ax)[indices[:, i]]
+                     for i, ax in enumerate(grid_axes)]).T.reshape(
+                         -1, len(grid_axes))
 
 # def values_snap(values, grid):
 #     # transpose values 
@@ -0,0 +1,315 @@
+"""
+Benchmarks of the landscape computations on synthetic diagrams.
+
+Every benchmark is run on each family of diagrams and each size, and the
+best time of a few repeats is written to a JSON file, so runs of different
+versions can be compared:
+
+    python benchmarks.py --output new.json
+    python benchmarks.py --output new.json --compare old.json
+
+With --compare, benchmarks that got slower than the baseline by more than
+the threshold are listed and the exit status is 1.
+"""
+from __future__ import annotations
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import numpy as np
+
+from PersistenceLandscapeExact import PersLandscapeExact, vectorize
+from PersistenceLandscapeGrid import PersLandscapeApprox, snap_PL, lc_approx
+
+# version of the JSON layout
+FORMAT_VERSION = 1
+
+
+#%% Diagram families
+
+def uniform_bars(n: int, rng) -> np.ndarray:
+    """ Births uniform on [0, 1] and exponential lengths, so each bar
+    overlaps about 10 others, like the small H1 bars from ripser. """
+    birth = rng.uniform(0, 1, n)
+    return np.column_stack([birth, birth + rng.exponential(10/n, n)])
+
+
+def clustered_bars(n: int, rng) -> np.ndarray:
+    """ Bars in tight clusters of about 50 bars with nearly equal births and
+    deaths. """
+    centers = rng.uniform(0, 1, max(1, n//50))
+    birth = centers[rng.integers(0, len(centers), n)] + rng.normal(0, 1e-4, n)
+    return np.column_stack([birth, birth + 0.01 + rng.exponential(1e-4, n)])
+
+
+def h0_bars(n: int, rng) -> np.ndarray:
+    """ Bars born at 0, like the degree 0 diagram of a point cloud. """
+    return np.column_stack([np.zeros(n), rng.uniform(0, 1, n)])
+
+
+def overlap_bars(n: int, rng) -> np.ndarray:
+    """ Births uniform on [0, 1] and lengths chosen so each bar overlaps
+    about 100 others. """
+    birth = rng.uniform(0, 1, n)
+    return np.column_stack([birth, birth + rng.uniform(0, 200/n, n)])
+
+
+FAMILIES = {'uniform': uniform_bars, 'clustered': clustered_bars,
+            'h0': h0_bars, 'overlap': overlap_bars}
+
+# the number of critical points of an exact landscape grows with the number
+# of bars times the overlap, so the largest sizes are skipped for the exact
+# benchmarks on the families with heavy overlap
+EXACT_MAX_SIZE = {'uniform': 10**5, 'clustered': 10**4, 'h0': 10**5,
+                  'overlap': 10**4}
+
+
+#%% Benchmarks
+# Each benchmark takes the inputs of one family and size and returns the
+# function to be timed, so that setup is not timed, or None if the inputs
+# do not apply.
+
+class Inputs:
+    """ Two diagrams of one family and size, and their landscapes, which are
+    computed once and shared by the benchmarks. """
+
+    def __init__(self, A: np.ndarray, B: np.ndarray) -> None:
+        self.A, self.B = A, B
+        self._landscapes = {}
+
+    def _get(self, name: str, make):
+        if name not in self._landscapes:
+            self._landscapes[name] = make()
+        return self._landscapes[name]
+
+    def exact(self, which: str = 'A') -> PersLandscapeExact:
+        return self._get('exact' + which, lambda: _exact(getattr(self, which)))
+
+    def grid(self, which: str = 'A') -> PersLandscapeApprox:
+        """ The grid landscape, or None if every bar is shorter than two
+        grid steps, which gives the 'empty' placeholder values. """
+        P = self._get('grid' + which, lambda: _grid(getattr(self, which)))
+        return P if P.values.dtype.kind in 'fiu' else None
+
+    def grid_list(self) -> list:
+        """ Ten landscapes on different grids, which snap_PL has to
+        interpolate, or None if one of them is empty. """
+        landscapes = self._get('grid_list', lambda: [
+            _grid(part, num_steps=400 + 10*i)
+            for i, part in enumerate(np.array_split(self.A, 10))])
+        if any(P.values.dtype.kind not in 'fiu' for P in landscapes):
+            return None
+        return landscapes
+
+
+def _exact(bars):
+    return PersLandscapeExact(dgms=[bars])
+
+
+def _grid(bars, num_steps=500):
+    return PersLandscapeApprox(0, 1.5, num_steps, dgms=[bars], compute=True)
+
+
+def bench_exact_compute(inputs):
+    return lambda: _exact(inputs.A)
+
+
+def bench_grid_compute(inputs):
+    return lambda: _grid(inputs.A)
+
+
+def bench_exact_add(inputs):
+    P, Q = inputs.exact('A'), inputs.exact('B')
+    return lambda: P + Q
+
+
+def bench_exact_scale(inputs):
+    P = inputs.exact()
+    return lambda: 2.5*P
+
+
+def bench_grid_add(inputs):
+    P, Q = inputs.grid('A'), inputs.grid('B')
+    if P is None or Q is None:
+        return None
+    return lambda: P + Q
+
+
+def bench_grid_scale(inputs):
+    P = inputs.grid()
+    if P is None:
+        return None
+    return lambda: 2.5*P
+
+
+def bench_exact_p_norm(inputs):
+    P = inputs.exact()
+    return lambda: P.p_norm(2)
+
+
+def bench_exact_sup_norm(inputs):
+    P = inputs.exact()
+    return lambda: P.sup_norm()
+
+
+def bench_grid_p_norm(inputs):
+    P = inputs.grid()
+    if P is None:
+        return None
+    return lambda: P.p_norm(2)
+
+
+def bench_grid_sup_norm(inputs):
+    P = inputs.grid()
+    if P is None:
+        return None
+    return lambda: P.sup_norm()
+
+
+def bench_vectorize(inputs):
+    P = inputs.exact()
+    return lambda: vectorize(P, num_dims=500)
+
+
+def bench_snap_PL(inputs):
+    landscapes = inputs.grid_list()
+    if landscapes is None:
+        return None
+    return lambda: snap_PL(landscapes, num_steps=500)
+
+
+def bench_lc_approx(inputs):
+    landscapes = inputs.grid_list()
+    if landscapes is None:
+        return None
+    coeffs = np.linspace(-1, 1, len(landscapes))
+    return lambda: lc_approx(landscapes, coeffs, num_steps=500)
+
+
+BENCHMARKS = {name[6:]: func for name, func in globals().items()
+              if name.startswith('bench_')}
+
+# the benchmarks that compute exact landscapes
+EXACT_BENCHMARKS = {'exact_compute', 'exact_add', 'exact_scale',
+                    'exact_p_norm', 'exact_sup_norm', 'vectorize'}
+
+
+#%% Running and comparing
+
+def time_call(func, repeat: int = 3, budget: float = 1.0) -> tuple:
+    """ The best time of up to `repeat` calls of `func`, stopping early once
+    `budget` seconds are spent. Returns the time and the number of calls. """
+    best, spent, calls = np.inf, 0.0, 0
+    while calls < repeat and (calls == 0 or spent < budget):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best, spent, calls = min(best, elapsed), spent + elapsed, calls + 1
+    return best, calls
+
+
+def _metadata() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return dict(python=platform.python_version(), numpy=np.__version__,
+                machine=platform.machine(), platform=platform.platform(),
+                commit=commit, time=time.strftime('%Y-%m-%dT%H:%M:%S'))
+
+
+def run(benchmarks: list, families: list, sizes: list, repeat: int = 3,
+        seed: int = 0, verbose: bool = True) -> dict:
+    """ Run every benchmark on every family and size.
+
+    Returns
+    -------
+    dict
+        The metadata of the run and a list of results, each with the
+        benchmark, family, size, best time in seconds and number of calls.
+        Exact benchmarks above `EXACT_MAX_SIZE` and grid benchmarks on
+        empty landscapes are left out.
+    """
+    results = []
+    for family in families:
+        for size in sizes:
+            rng = np.random.default_rng([seed, size])
+            inputs = Inputs(FAMILIES[family](size, rng),
+                            FAMILIES[family](size, rng))
+            for name in benchmarks:
+                if name in EXACT_BENCHMARKS and size > EXACT_MAX_SIZE[family]:
+                    continue
+                func = BENCHMARKS[name](inputs)
+                if func is None:
+                    continue
+                seconds, calls = time_call(func, repeat)
+                results.append(dict(benchmark=name, family=family, size=size,
+                                    seconds=seconds, calls=calls))
+                if verbose:
+                    print(f"{name:>18} {family:>10} {size:>8} {seconds:12.6f}",
+                          flush=True)
+    return dict(format_version=FORMAT_VERSION, metadata=_metadata(),
+                seed=seed, results=results)
+
+
+def compare(baseline: dict, current: dict, threshold: float = 1.25,
+            min_seconds: float = 1e-3) -> list:
+    """ The results of `current` that are slower than the same benchmark in
+    `baseline` by more than a factor of `threshold`, as tuples
+    (benchmark, family, size, baseline seconds, current seconds). Times
+    below `min_seconds` are too noisy to compare and are ignored. """
+    before = {(r['benchmark'], r['family'], r['size']): r['seconds']
+              for r in baseline['results']}
+    regressions = []
+    for r in current['results']:
+        key = (r['benchmark'], r['family'], r['size'])
+        if (key in before and r['seconds'] > min_seconds
+                and r['seconds'] > threshold*before[key]):
+            regressions.append(key + (before[key], r['seconds']))
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='a JSON file of an earlier run')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown factor reported as a regression')
+    parser.add_argument('--min-seconds', type=float, default=1e-3,
+                        help='times below this are not compared')
+    parser.add_argument('--benchmarks', nargs='+', default=list(BENCHMARKS),
+                        choices=list(BENCHMARKS))
+    parser.add_argument('--families', nargs='+', default=list(FAMILIES),
+                        choices=list(FAMILIES))
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        default=[100, 1000, 10000, 100000])
+    parser.add_argument('--quick', action='store_true',
+                        help='only run the sizes 100 and 1000')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sizes = [100, 1000] if args.quick else args.sizes
+    current = run(args.benchmarks, args.families, sizes,
+                  repeat=args.repeat, seed=args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), current, args.threshold,
+                                  args.min_seconds)
+        for name, family, size, before, after in regressions:
+            print(f"regression: {name} on {family} with {size} bars took "
+                  f"{after:.6f}s, was {before:.6f}s")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
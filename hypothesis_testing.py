@@ -0,0 +1,138 @@
+"""
+Permutation tests for comparing two groups of persistence landscapes.
+"""
+from __future__ import annotations
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from auxiliary import _resolve_n_jobs
+from landscape_distances import _stack_landscapes
+
+__all__ = ['permutation_test']
+
+# values of the pooled landscapes in each worker process
+_worker_values = None
+
+
+def _init_worker(values: np.ndarray, depth: int) -> None:
+    global _worker_values
+    _worker_values = (values, depth)
+
+
+def _statistic(values: np.ndarray, depth: int, weights: np.ndarray,
+               p: float) -> np.ndarray:
+    """ Compute the norm of the weighted sum of landscapes for each row of
+    `weights`.
+
+    Intended for internal use. `values` has shape (n, depth*num_steps) and
+    `weights` has shape (k, n). The norms agree with
+    `PersLandscapeApprox.sup_norm` for p = inf and with
+    `PersLandscapeApprox.p_norm` otherwise.
+    """
+    diff = weights @ values
+    if p == np.inf:
+        return np.max(np.abs(diff), axis=1, initial=0.)
+    diff = np.abs(diff).reshape(len(weights), depth, -1)
+    return np.sum(np.sum(diff**p, axis=2)**(1.0/p), axis=1)
+
+
+def _null_batch(labels: np.ndarray, n_perms: int, seed, p: float,
+                values: np.ndarray = None, depth: int = None) -> np.ndarray:
+    """ Compute the statistic for `n_perms` random relabelings.
+
+    Intended for internal use. When called in a worker process, `values`
+    and `depth` come from `_init_worker`.
+    """
+    if values is None:
+        values, depth = _worker_values
+    rng = np.random.default_rng(seed)
+    # each row is a shuffle of the labels, so group sizes are preserved
+    shuffled = rng.permuted(np.tile(labels, (n_perms, 1)), axis=1)
+    n_A = np.count_nonzero(labels)
+    weights = shuffled/n_A - (1 - shuffled)/(len(labels) - n_A)
+    return _statistic(values, depth, weights, p)
+
+
+def permutation_test(group_A: list, group_B: list, p: float = np.inf,
+                     n_perms: int = 10000, start: float = None,
+                     stop: float = None, num_steps: int = None,
+                     seed=None, n_jobs: int = None,
+                     batch_size: int = 500) -> tuple:
+    """ Permutation test for a difference between the average landscapes
+    of two groups.
+
+    The statistic is the norm of the difference of the group averages. The
+    landscapes of both groups are put once on a common grid and flattened
+    into a matrix, so the group averages of a batch of relabelings are a
+    single matrix product of group-membership weights with that matrix.
+    Relabelings preserve the group sizes.
+
+    Parameters
+    ----------
+    group_A : list
+        A list of PersLandscapeApprox or PersLandscapeExact objects.
+
+    group_B : list
+        A list of PersLandscapeApprox or PersLandscapeExact objects.
+
+    p : float, default np.inf
+        The norm of the statistic. np.inf gives the sup norm.
+
+    n_perms : int, default 10000
+        The number of random relabelings.
+
+    start, stop, num_steps : optional
+        The common grid. By default it is computed as in `snap_PL`, and exact
+        landscapes are sampled on 500 steps between their extreme critical
+        points.
+
+    seed : optional
+        A seed for `numpy.random.default_rng`. The result for a given seed
+        does not depend on `n_jobs`.
+
+    n_jobs : int, optional
+        The number of worker processes. None or 1 runs in this process and
+        -1 uses every CPU.
+
+    batch_size : int, default 500
+        The number of relabelings evaluated by each matrix product.
+
+    Returns
+    -------
+    p_value : float
+        The estimate (1 + #{null >= observed})/(1 + n_perms).
+
+    null : numpy array
+        The statistic of each relabeling.
+    """
+    landscapes = list(group_A) + list(group_B)
+    if len(group_A) == 0 or len(group_B) == 0:
+        raise ValueError("Both groups must contain at least one landscape")
+    if len({pl.hom_deg for pl in landscapes}) > 1:
+        raise ValueError("Persistence landscapes must be of same homological degree")
+    values = _stack_landscapes(landscapes, start=start, stop=stop,
+                               num_steps=num_steps)
+    depth = values.shape[1]
+    values = values.reshape(len(values), -1)
+
+    labels = np.zeros(len(landscapes))
+    labels[:len(group_A)] = 1
+    observed = _statistic(values, depth, (labels/len(group_A)
+                          - (1 - labels)/len(group_B))[np.newaxis], p)[0]
+
+    # one child seed per batch, so results do not depend on n_jobs
+    sizes = [batch_size]*(n_perms//batch_size)
+    if n_perms % batch_size:
+        sizes.append(n_perms % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    n_jobs = _resolve_n_jobs(n_jobs)
+    if n_jobs == 1:
+        null = [_null_batch(labels, size, s, p, values, depth)
+                for size, s in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(values, depth)) as executor:
+            null = list(executor.map(_null_batch, [labels]*len(sizes), sizes,
+                                     seeds, [p]*len(sizes)))
+    null = np.concatenate(null) if null else np.array([])
+    p_value = (1 + np.count_nonzero(null >= observed))/(1 + n_perms)
+    return p_value, null
@@ -0,0 +1,235 @@
+"""
+Opt-in cache of computed landscapes, keyed on the diagram and the grid.
+"""
+from __future__ import annotations
+import os
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+from collections import OrderedDict
+
+__all__ = ['LandscapeCache', 'landscape_key', 'set_cache', 'get_cache']
+
+# the cache used by `compute_landscape` and the transformers, if any
+_active_cache = None
+
+
+def set_cache(cache: LandscapeCache = None) -> LandscapeCache:
+    """ Use `cache` for every landscape computed from now on, or turn caching
+    off if `cache` is None. Returns the previous cache. """
+    global _active_cache
+    previous, _active_cache = _active_cache, cache
+    return previous
+
+
+def get_cache() -> LandscapeCache:
+    """ The cache set by `set_cache`, or None. """
+    return _active_cache
+
+
+def landscape_key(bd_pairs: np.ndarray, kind: str, **params) -> str:
+    """ A hash identifying the landscape of `bd_pairs`.
+
+    Parameters
+    ----------
+    bd_pairs : numpy array
+        The finite birth-death pairs.
+
+    kind : str
+        'approx' or 'exact'.
+
+    **params
+        The parameters the landscape depends on, such as hom_deg, start,
+        stop, num_steps and max_depth.
+
+    Returns
+    -------
+    str
+        The hex digest of the SHA-256 of the pairs and parameters.
+    """
+    pairs = np.ascontiguousarray(bd_pairs, dtype=np.float64).reshape(-1, 2)
+    h = hashlib.sha256(pairs.tobytes())
+    # repr of python floats round-trips, so equal grids give equal keys
+    h.update(repr((kind, sorted((name, value if value is None else float(value))
+                               for name, value in params.items()))).encode())
+    return h.hexdigest()
+
+
+class LandscapeCache:
+    """
+    A least-recently-used cache of landscape arrays with a byte budget.
+
+    Each entry is a tuple of numpy arrays, such as the values of a
+    `PersLandscapeApprox` or the xs, ys and offsets of a
+    `PersLandscapeExact`. Cached arrays are read-only, since they may be
+    shared between several landscapes. If `directory` is given, entries are
+    also written there as raw `.npy` files, one subdirectory per key, and are
+    memory-mapped when read back, so the cache survives restarts and can be
+    shared by several processes.
+
+    Parameters
+    ----------
+    max_bytes : int, default 2**28
+        The budget for the arrays kept in memory. Least recently used
+        entries are evicted beyond it.
+
+    directory : str, optional
+        The directory of the on-disk store.
+
+    max_disk_bytes : int, default 2**30
+        The budget of the on-disk store. Entries whose files were least
+        recently used are deleted beyond it, down to 90% of the budget. The
+        size of the store is scanned when the cache is created and kept as a
+        running total of the entries written since, so entries written by
+        other processes are only counted at the next scan.
+
+    Attributes
+    ----------
+    hits, misses : int
+        The number of lookups that found or did not find an entry.
+
+    disk_hits : int
+        The number of hits that were read from the on-disk store.
+
+    disk_bytes : int
+        The size of the on-disk store, as of the last scan plus the entries
+        written since.
+
+    Examples
+    --------
+    >>> cache = LandscapeCache(max_bytes=2**30, directory='landscapes')
+    >>> set_cache(cache)
+    >>> features = PLA(num_steps=1000).fit_transform(X)
+    >>> cache.stats()
+    """
+
+    def __init__(self, max_bytes: int = 2**28, directory: str = None,
+                 max_disk_bytes: int = 2**30) -> None:
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = self.misses = self.disk_hits = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self.disk_bytes = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def __repr__(self) -> str:
+        return (f"LandscapeCache with {len(self)} entries of "
+                f"{self.nbytes} bytes in memory")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """ The hit and miss counters and the size of the cache. """
+        return dict(hits=self.hits, misses=self.misses,
+                    disk_hits=self.disk_hits, entries=len(self),
+                    nbytes=self.nbytes)
+
+    def clear(self) -> None:
+        """ Empty the in-memory cache and reset the counters. The on-disk
+        store is kept. """
+        self._entries.clear()
+        self.nbytes = 0
+        self.hits = self.misses = self.disk_hits = 0
+
+    def get(self, key: str) -> tuple:
+        """ The arrays stored under `key`, or None. """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        arrays = self._read(key)
+        if arrays is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.disk_hits += 1
+        self._remember(key, arrays)
+        return arrays
+
+    def put(self, key: str, arrays: tuple) -> tuple:
+        """ Store `arrays` under `key` and return the read-only arrays that
+        were stored. """
+        arrays = tuple(np.array(a) for a in arrays)
+        for a in arrays:
+            a.setflags(write=False)
+        self._remember(key, arrays)
+        if self.directory is not None:
+            self._write(key, arrays)
+        return arrays
+
+    def _remember(self, key: str, arrays: tuple) -> None:
+        size = sum(a.nbytes for a in arrays)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.nbytes -= sum(a.nbytes for a in self._entries.pop(key))
+        self._entries[key] = arrays
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= sum(a.nbytes for a in evicted)
+
+    def _read(self, key: str) -> tuple:
+        if self.directory is None:
+            return None
+        path = os.path.join(self.directory, key)
+        try:
+            names = sorted(os.listdir(path), key=lambda name: int(name[:-4]))
+            arrays = tuple(np.load(os.path.join(path, name), mmap_mode='r')
+                           for name in names)
+            # the modification time orders entries for eviction
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return arrays
+
+    def _write(self, key: str, arrays: tuple) -> None:
+        path = os.path.join(self.directory, key)
+        if os.path.isdir(path):
+            return
+        # write to a temporary directory first, so readers in other
+        # processes never see a partial entry
+        tmp = tempfile.mkdtemp(dir=self.directory, prefix='.tmp')
+        size = 0
+        for i, a in enumerate(arrays):
+            name = os.path.join(tmp, f'{i}.npy')
+            np.save(name, a)
+            size += os.path.getsize(name)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # another process stored the same entry
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.disk_bytes += size
+        if self.disk_bytes > self.max_disk_bytes:
+            self._evict_disk()
+
+    def _disk_entries(self) -> list:
+        """ The modification time, size and path of each entry of the
+        on-disk store. """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.tmp') or not entry.is_dir():
+                continue
+            size = sum(f.stat().st_size for f in os.scandir(entry.path))
+            entries.append((entry.stat().st_mtime, size, entry.path))
+        return entries
+
+    def _evict_disk(self) -> None:
+        # evicting below the budget leaves room for many writes before the
+        # store has to be scanned again
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= 0.9*self.max_disk_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+        self.disk_bytes = total
@@ -0,0 +1,320 @@
+"""
+Disk-backed collections of approximate landscapes on a common grid.
+"""
+from __future__ import annotations
+import os
+import itertools
+import numpy as np
+import PersistenceLandscapeGrid
+from PersistenceLandscapeGrid import (Grid, PersLandscapeApprox, batch_approx,
+                                      stack_approx, _collection_array_function,
+                                      _landscape_from_values)
+from landscape_distances import _block_distances, _stack_landscapes
+from landscape_io import FORMAT_VERSION, _check_header
+
+__all__ = ['LandscapeCollection']
+
+
+class LandscapeCollection:
+    """
+    A collection of approximate persistence landscapes stored on disk.
+
+    The values of the landscapes are stored in a raw file of shape
+    (n, depth, num_steps) in a directory, together with a small
+    `header.npz`. Landscapes are appended in batches, and every statistic is
+    computed block by block from a memory map of that file, so the memory
+    used does not depend on the number of landscapes. All landscapes share
+    one grid and keep at most `depth` landscape functions: the functions of
+    deeper landscapes past `depth` are dropped when they are appended.
+
+    Parameters
+    ----------
+    path : str
+        The directory of the collection. It must not already hold one; use
+        `LandscapeCollection.open` to reopen a collection.
+
+    start : float
+        The start parameter of the grid.
+
+    stop : float
+        The stop parameter of the grid.
+
+    num_steps : int, default 500
+        The number of steps in the grid.
+
+    depth : int, default 10
+        The number of landscape functions stored for each landscape. Deeper
+        landscapes are truncated and shallower ones padded with zeros.
+
+    hom_deg : int
+        The homological degree of the landscapes.
+
+    Examples
+    --------
+    >>> C = LandscapeCollection('corpus', start=0, stop=2, depth=5)
+    >>> for dgms_list in diagram_batches:
+    ...     C.append_diagrams(dgms_list)
+    >>> avg = C.mean()
+    """
+
+    def __init__(self, path: str, start: float, stop: float,
+                 num_steps: int = 500, depth: int = 10,
+                 hom_deg: int = 0) -> None:
+        if depth < 1:
+            raise ValueError(f"depth must be positive, but {depth} was passed")
+        if os.path.exists(os.path.join(path, 'header.npz')):
+            raise FileExistsError(f"{path} already holds a collection")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.start = start
+        self.stop = stop
+        self.num_steps = num_steps
+        self.depth = depth
+        self.hom_deg = hom_deg
+        self.n = 0
+        open(self._values_path, 'wb').close()
+        self._write_header()
+
+    @classmethod
+    def open(cls, path: str) -> LandscapeCollection:
+        """ Reopen a collection created in `path`. """
+        with np.load(os.path.join(path, 'header.npz')) as data:
+            _check_header(data, ['collection'])
+            result = cls.__new__(cls)
+            result.path = path
+            result.start = data['start'].item()
+            result.stop = data['stop'].item()
+            result.num_steps = int(data['num_steps'])
+            result.depth = int(data['depth'])
+            result.hom_deg = int(data['hom_deg'])
+            result.n = int(data['n'])
+        result._values = None
+        return result
+
+    def __repr__(self) -> str:
+        return (f'Collection of {self.n} persistence landscapes in '
+                f'homological degree {self.hom_deg} on grid from {self.start} '
+                f'to {self.stop} with {self.num_steps} steps')
+
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def grid(self) -> Grid:
+        """ The grid shared by the landscapes. """
+        return Grid(self.start, self.stop, self.num_steps)
+
+    @property
+    def _values_path(self) -> str:
+        return os.path.join(self.path, 'values.bin')
+
+    def _write_header(self) -> None:
+        np.savez(os.path.join(self.path, 'header.npz'),
+                 format_version=FORMAT_VERSION, kind='collection',
+                 start=self.start, stop=self.stop, num_steps=self.num_steps,
+                 depth=self.depth, hom_deg=self.hom_deg, n=self.n)
+        # the memory map is reopened with the new length when needed
+        self._values = None
+
+    @property
+    def values(self) -> np.ndarray:
+        """ A read-only memory map of shape (n, depth, num_steps). """
+        if self._values is None:
+            if not self.n:
+                return np.zeros((0, self.depth, self.num_steps))
+            self._values = np.memmap(self._values_path, dtype='<f8', mode='r',
+                                     shape=(self.n, self.depth, self.num_steps))
+        return self._values
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        if copy:
+            return np.array(self.values, dtype=dtype)
+        return np.asarray(self.values, dtype=dtype)
+
+    def __array_function__(self, func, types, args, kwargs):
+        """ `np.mean`, `np.sum`, `np.var` and `np.average` over the
+        landscapes and `np.dot(coeffs, C)` are computed block by block, as
+        by the methods of the collection. """
+        return _collection_array_function(func, types, args, kwargs)
+
+    def __getitem__(self, i: int) -> PersLandscapeApprox:
+        """ The i-th landscape, whose values are a view of the file. """
+        return PersLandscapeApprox(grid=self.grid, hom_deg=self.hom_deg,
+                                   values=self.values[i])
+
+    def _block_size(self) -> int:
+        return max(1, PersistenceLandscapeGrid._CHUNK_SIZE
+                   // (self.depth*self.num_steps))
+
+    def blocks(self, block_size: int = None):
+        """ Iterate over consecutive blocks of the values.
+
+        Parameters
+        ----------
+        block_size : int, optional
+            The number of landscapes per block. Defaults to roughly
+            `_CHUNK_SIZE` values per block.
+
+        Yields
+        ------
+        slice, numpy array
+            The indices of the block and its values, of shape
+            (block_size, depth, num_steps).
+        """
+        if block_size is None:
+            block_size = self._block_size()
+        for i in range(0, self.n, block_size):
+            rows = slice(i, min(i + block_size, self.n))
+            yield rows, np.asarray(self.values[rows])
+
+    def _append_values(self, values: np.ndarray) -> None:
+        if not len(values):
+            return
+        # deeper landscapes keep their first `depth` functions
+        values = values[:, :self.depth]
+        block = np.zeros((len(values), self.depth, self.num_steps), dtype='<f8')
+        block[:, :values.shape[1]] = values
+        with open(self._values_path, 'r+b') as f:
+            # anything past the recorded length is from an interrupted append
+            f.seek(self.n*block[0].nbytes)
+            f.write(block.tobytes())
+            f.truncate()
+        self.n += len(block)
+        self._write_header()
+
+    def append(self, landscapes: list) -> None:
+        """ Append PersLandscapeApprox objects, snapped to the grid of the
+        collection if needed and truncated to its depth. """
+        if any(pl.hom_deg != self.hom_deg for pl in landscapes):
+            raise ValueError("Persistence landscapes must be of same homological degree")
+        for i in range(0, len(landscapes), self._block_size()):
+            self._append_values(stack_approx(
+                landscapes[i:i + self._block_size()], start=self.start,
+                stop=self.stop, num_steps=self.num_steps))
+
+    def append_diagrams(self, dgms_list) -> None:
+        """ Compute the first `depth` functions of the landscapes of the
+        diagrams in an iterable with `batch_approx` and append them, one
+        block at a time. """
+        dgms_list = iter(dgms_list)
+        while True:
+            batch = list(itertools.islice(dgms_list, self._block_size()))
+            if not batch:
+                return
+            self._append_values(batch_approx(
+                batch, hom_deg=self.hom_deg, start=self.start, stop=self.stop,
+                num_steps=self.num_steps, max_depth=self.depth))
+
+    def _landscape(self, values: np.ndarray) -> PersLandscapeApprox:
+        # like the other landscapes, drop the zero functions at the end
+        depth = np.count_nonzero(values.any(axis=1))
+        return _landscape_from_values(self.grid, values[:depth], self.hom_deg)
+
+    def linear_combination(self, coeffs) -> PersLandscapeApprox:
+        """ The linear combination of the landscapes with coefficients
+        `coeffs`, one per landscape. """
+        coeffs = np.asarray(coeffs, dtype=float)
+        if coeffs.shape != (self.n,):
+            raise ValueError(f"{len(coeffs)} coefficients were passed for "
+                             f"{self.n} landscapes")
+        total = np.zeros(self.depth*self.num_steps)
+        for rows, block in self.blocks():
+            total += coeffs[rows] @ block.reshape(len(block), -1)
+        return self._landscape(total.reshape(self.depth, self.num_steps))
+
+    def _moments(self) -> tuple:
+        """ The mean and the sum of squared deviations of the values,
+        combining the moments of each block as in Chan et al. """
+        if not self.n:
+            raise ValueError("The collection is empty")
+        n, mean = 0, np.zeros((self.depth, self.num_steps))
+        m2 = np.zeros_like(mean)
+        for _, block in self.blocks():
+            block_mean = block.mean(axis=0)
+            block_m2 = np.sum((block - block_mean)**2, axis=0)
+            delta = block_mean - mean
+            total = n + len(block)
+            mean += delta*len(block)/total
+            m2 += block_m2 + delta**2*n*len(block)/total
+            n = total
+        return mean, m2
+
+    def mean(self) -> PersLandscapeApprox:
+        """ The average of the landscapes. """
+        return self._landscape(self._moments()[0])
+
+    def variance(self, ddof: int = 0) -> PersLandscapeApprox:
+        """ The pointwise variance of the landscapes.
+
+        Parameters
+        ----------
+        ddof : int, default 0
+            Delta degrees of freedom; the divisor is `n - ddof`.
+        """
+        if self.n <= ddof:
+            raise ValueError("Not enough landscapes in the collection")
+        return self._landscape(self._moments()[1]/(self.n - ddof))
+
+    def distances_to(self, landscape, p: float = 2) -> np.ndarray:
+        """ The distance from every landscape in the collection to
+        `landscape`, snapped to the grid of the collection.
+
+        The distances agree with `pairwise_distances`, and with
+        `(Li - landscape).p_norm(p)` (or `.sup_norm()` for p = np.inf)
+        for landscapes on the grid of the collection.
+        """
+        if p <= 0:
+            raise ValueError(f"p must be positive, but {p} was passed")
+        values = _stack_landscapes([landscape], start=self.start,
+                                   stop=self.stop, num_steps=self.num_steps)[0]
+        other = np.zeros((1, self.depth, self.num_steps))
+        other[0, :len(values)] = values[:self.depth]
+        result = np.concatenate([np.empty(0)] + [
+            _block_distances(block, other, p)[:, 0]
+            for _, block in self.blocks()])
+        # the landscapes of the collection are zero past its depth
+        extra = values[np.newaxis, self.depth:]
+        if extra.size:
+            rest = _block_distances(extra, np.zeros_like(extra), p)[0, 0]
+            result = np.maximum(result, rest) if p == np.inf else result + rest
+        return result
+
+    def pairwise_distances(self, p: float = 2, out: str = None) -> np.ndarray:
+        """ The matrix of distances between every pair of landscapes,
+        computed block by block.
+
+        Parameters
+        ----------
+        p : float, default 2
+            The norm. np.inf gives the sup norm.
+
+        out : str, optional
+            A file name for the result, which is then a memory map, for
+            matrices too large for memory.
+
+        Returns
+        -------
+        numpy array
+            A symmetric array of shape (n, n), which agrees with
+            `landscape_distances.pairwise_distances`.
+        """
+        if p <= 0:
+            raise ValueError(f"p must be positive, but {p} was passed")
+        if out is None:
+            result = np.zeros((self.n, self.n))
+        else:
+            result = np.lib.format.open_memmap(out, mode='w+', dtype=float,
+                                               shape=(self.n, self.n))
+        # two blocks are in memory at once
+        block_size = max(1, self._block_size()//2)
+        for rows, A in self.blocks(block_size):
+            for cols in range(rows.start, self.n, block_size):
+                cols = slice(cols, min(cols + block_size, self.n))
+                block = _block_distances(A, np.asarray(self.values[cols]), p)
+                if cols == rows:
+                    np.fill_diagonal(block, 0)
+                result[rows, cols] = block
+                result[cols, rows] = block.T
+        if out is not None:
+            result.flush()
+        return result
@@ -0,0 +1,278 @@
+"""
+Pairwise distance and kernel matrices of persistence landscapes.
+"""
+from __future__ import annotations
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import PersistenceLandscapeGrid
+from PersistenceLandscapeExact import (PersLandscapeExact, vectorize,
+                                       lc_exact, _integrate_abs_power)
+from PersistenceLandscapeGrid import stack_approx
+from auxiliary import _resolve_n_jobs
+
+__all__ = ['pairwise_distances', 'landscape_kernel_matrix']
+
+# relative size of the squared distances of the p = 2 expansion in
+# `_block_distances` below which they are recomputed from the differences
+_CANCELLATION = 1e-4
+
+# arrays of the exact landscapes in each worker process
+_worker_landscapes = None
+
+
+def _init_worker(arrays: list) -> None:
+    global _worker_landscapes
+    _worker_landscapes = [PersLandscapeExact._from_arrays(*a)
+                          for a in arrays]
+
+
+def _stack_landscapes(landscapes: list, start: float = None,
+                      stop: float = None, num_steps: int = None) -> np.ndarray:
+    """ Put a list of PersLandscapeApprox or PersLandscapeExact objects on a
+    common grid and stack their values.
+
+    Intended for internal use. The grid defaults to that of `snap_PL`, and
+    exact landscapes are sampled on 500 steps between their extreme critical
+    points.
+
+    Returns
+    -------
+    numpy array
+        An array of shape (len(landscapes), max_depth, num_steps).
+    """
+    exact = [pl for pl in landscapes if isinstance(pl, PersLandscapeExact)]
+    approx = [pl for pl in landscapes if not isinstance(pl, PersLandscapeExact)]
+    if exact:
+        for pl in exact:
+            pl.compute_landscape()
+        if start is None:
+            start = min([pl.xs[pl.offsets[:-1]].min() for pl in exact
+                         if pl.max_depth] + [pl.start for pl in approx])
+        if stop is None:
+            stop = max([pl.xs[pl.offsets[1:] - 1].max() for pl in exact
+                        if pl.max_depth] + [pl.stop for pl in approx])
+        if num_steps is None:
+            num_steps = max([500] + [pl.num_steps for pl in approx])
+        landscapes = [vectorize(pl, start=start, stop=stop, num_dims=num_steps)
+                      if isinstance(pl, PersLandscapeExact) else pl
+                      for pl in landscapes]
+    return stack_approx(landscapes, start=start, stop=stop,
+                        num_steps=num_steps)
+
+
+def _tiles(n: int, size: int) -> list:
+    """ Split range(n) into consecutive slices of at most `size` entries. """
+    return [slice(i, min(i + size, n)) for i in range(0, n, size)]
+
+
+def _tile_size(depth: int, num_steps: int) -> int:
+    """ The number of landscapes per side of a tile whose differences fit in
+    roughly _CHUNK_SIZE entries. """
+    return max(1, int(np.sqrt(PersistenceLandscapeGrid._CHUNK_SIZE
+                              // max(depth*num_steps, 1))))
+
+
+def _diff_norms(A: np.ndarray, B: np.ndarray, p: float) -> np.ndarray:
+    """ The norms of the differences of every landscape in `A` and in `B`,
+    computed by broadcasting. """
+    diff = np.abs(A[:, np.newaxis] - B[np.newaxis])
+    if p == np.inf:
+        return np.max(diff, axis=(2, 3), initial=0.)
+    return np.sum(np.sum(diff**p, axis=3)**(1.0/p), axis=2)
+
+
+def _block_distances(A: np.ndarray, B: np.ndarray, p: float) -> np.ndarray:
+    """ Distances between the stacked landscapes in `A` and in `B`.
+
+    Intended for internal use. `A` and `B` have shapes (a, depth, num_steps)
+    and (b, depth, num_steps). For p = 2 they are computed with one matrix
+    product per depth, and for other p in tiles of bounded size.
+    """
+    result = np.zeros((len(A), len(B)))
+    if p == 2:
+        # |x - y|^2 = |x|^2 + |y|^2 - 2<x, y>, one matrix product per depth
+        for k in range(A.shape[1]):
+            U, V = A[:, k], B[:, k]
+            sq_norms = (np.einsum('ij,ij->i', U, U)[:, np.newaxis]
+                        + np.einsum('ij,ij->i', V, V))
+            sq_dists = np.maximum(sq_norms - 2*(U @ V.T), 0)
+            # the expansion cancels for nearly equal functions, so their
+            # distances are recomputed from the differences
+            rows, cols = np.nonzero(sq_dists <= _CANCELLATION*sq_norms)
+            size = _tile_size(1, U.shape[1])**2
+            for i in range(0, len(rows), size):
+                r, c = rows[i:i + size], cols[i:i + size]
+                diff = U[r] - V[c]
+                sq_dists[r, c] = np.einsum('ij,ij->i', diff, diff)
+            result += np.sqrt(sq_dists)
+        return result
+    size = _tile_size(*A.shape[1:])
+    for rows in _tiles(len(A), size):
+        for cols in _tiles(len(B), size):
+            result[rows, cols] = _diff_norms(A[rows], B[cols], p)
+    return result
+
+
+def _grid_distances(values: np.ndarray, p: float) -> np.ndarray:
+    """ Distances between the stacked landscapes in `values`.
+
+    Intended for internal use. `values` has shape (n, depth, num_steps). The
+    distances agree with `(Li - Lj).sup_norm()` for p = inf and with
+    `(Li - Lj).p_norm(p)` otherwise.
+    """
+    if p == 2:
+        result = _block_distances(values, values, p)
+        np.fill_diagonal(result, 0)
+        return result
+    n = len(values)
+    result = np.zeros((n, n))
+    # only the tiles on and above the diagonal are computed
+    tiles = _tiles(n, _tile_size(*values.shape[1:]))
+    for a, rows in enumerate(tiles):
+        for cols in tiles[a:]:
+            block = _diff_norms(values[rows], values[cols], p)
+            result[rows, cols] = block
+            result[cols, rows] = block.T
+    return result
+
+
+def _exact_rows(rows: range, p: float, landscapes: list = None) -> np.ndarray:
+    """ Distances (for p > 0) or L2 inner products (for p = 0) from each
+    landscape in `rows` to every later landscape.
+
+    Intended for internal use. When called in a worker process,
+    `landscapes` come from `_init_worker`.
+    """
+    if landscapes is None:
+        landscapes = _worker_landscapes
+    n = len(landscapes)
+    result = np.zeros((len(rows), n))
+    for r, i in enumerate(rows):
+        for j in range(i if p == 0 else i + 1, n):
+            if p == 0:
+                # polarization identity
+                L = lc_exact([landscapes[i], landscapes[j]], [1, 1])
+                M = lc_exact([landscapes[i], landscapes[j]], [1, -1])
+                result[r, j] = (_integrate_abs_power(L.xs, L.ys, L.offsets, 2)
+                                - _integrate_abs_power(M.xs, M.ys, M.offsets, 2))/4
+            else:
+                result[r, j] = lc_exact([landscapes[i], landscapes[j]],
+                                        [1, -1]).p_norm(p)
+    return result
+
+
+def _exact_matrix(landscapes: list, p: float, n_jobs: int = None) -> np.ndarray:
+    """ Assemble the symmetric matrix of `_exact_rows`, possibly in
+    parallel. """
+    for pl in landscapes:
+        pl.compute_landscape()
+    n = len(landscapes)
+    n_jobs = _resolve_n_jobs(n_jobs)
+    if n_jobs == 1 or n < 2:
+        upper = _exact_rows(range(n), p, landscapes)
+    else:
+        # rows near the top have more pairs, so interleave them across chunks
+        num_chunks = min(n, 4*n_jobs)
+        chunks = [range(c, n, num_chunks) for c in range(num_chunks)]
+        arrays = [(pl.xs, pl.ys, pl.offsets, pl.hom_deg) for pl in landscapes]
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(arrays,)) as executor:
+            results = list(executor.map(_exact_rows, chunks, [p]*num_chunks))
+        upper = np.zeros((n, n))
+        for rows, result in zip(chunks, results):
+            upper[list(rows)] = result
+    return upper + np.triu(upper, 1).T
+
+
+def _check_landscapes(landscapes: list) -> None:
+    if len({pl.hom_deg for pl in landscapes}) > 1:
+        raise ValueError("Persistence landscapes must be of same homological degree")
+
+
+def pairwise_distances(landscapes: list, p: float = 2, start: float = None,
+                       stop: float = None, num_steps: int = None,
+                       n_jobs: int = None) -> np.ndarray:
+    """ Compute the matrix of distances between every pair of landscapes.
+
+    The distance between two landscapes is the norm of their difference.
+    If every landscape is a PersLandscapeExact, the exact norms are computed
+    and the entry (i, j) equals `(Li - Lj).p_norm(p)`. Otherwise all
+    landscapes are stacked on a common grid and the entry (i, j) equals
+    `(Li - Lj).p_norm(p)` (or `.sup_norm()` for p = np.inf) for the
+    PersLandscapeApprox objects on that grid, without creating them. For
+    p = 2 these are computed with one matrix product per depth, and for other
+    p in tiles of bounded size.
+
+    Parameters
+    ----------
+    landscapes : list
+        A list of PersLandscapeApprox or PersLandscapeExact objects.
+
+    p : float, default 2
+        The norm. np.inf gives the sup norm.
+
+    start, stop, num_steps : optional
+        The common grid for approximate landscapes. By default it is computed
+        as in `snap_PL`.
+
+    n_jobs : int, optional
+        The number of worker processes for exact landscapes. None or 1 runs
+        in this process and -1 uses every CPU.
+
+    Returns
+    -------
+    numpy array
+        A symmetric array of shape (len(landscapes), len(landscapes)).
+    """
+    if p <= 0:
+        raise ValueError(f"p must be positive, but {p} was passed")
+    _check_landscapes(landscapes)
+    if not landscapes:
+        return np.zeros((0, 0))
+    if all(isinstance(pl, PersLandscapeExact) for pl in landscapes):
+        return _exact_matrix(landscapes, p, n_jobs=n_jobs)
+    values = _stack_landscapes(landscapes, start=start, stop=stop,
+                               num_steps=num_steps)
+    return _grid_distances(values, p)
+
+
+def landscape_kernel_matrix(landscapes: list, start: float = None,
+                            stop: float = None, num_steps: int = None,
+                            n_jobs: int = None) -> np.ndarray:
+    """ Compute the matrix of L2 inner products of every pair of landscapes.
+
+    If every landscape is a PersLandscapeExact, the entry (i, j) is the
+    integral of the sum over depths of the products of the landscape
+    functions of Li and Lj. Otherwise all landscapes are stacked on a common
+    grid and the entry (i, j) is the sum of the products of their values,
+    computed as a single matrix product. This is consistent with `p_norm`,
+    which does not scale by the step size of the grid.
+
+    Parameters
+    ----------
+    landscapes : list
+        A list of PersLandscapeApprox or PersLandscapeExact objects.
+
+    start, stop, num_steps : optional
+        The common grid for approximate landscapes. By default it is computed
+        as in `snap_PL`.
+
+    n_jobs : int, optional
+        The number of worker processes for exact landscapes. None or 1 runs
+        in this process and -1 uses every CPU.
+
+    Returns
+    -------
+    numpy array
+        A symmetric positive semidefinite array of shape
+        (len(landscapes), len(landscapes)).
+    """
+    _check_landscapes(landscapes)
+    if not landscapes:
+        return np.zeros((0, 0))
+    if all(isinstance(pl, PersLandscapeExact) for pl in landscapes):
+        return _exact_matrix(landscapes, 0, n_jobs=n_jobs)
+    values = _stack_landscapes(landscapes, start=start, stop=stop,
+                               num_steps=num_steps)
+    values = values.reshape(len(values), -1)
+    return values @ values.T
@@ -0,0 +1,254 @@
+"""
+Lazy linear combinations of persistence landscapes.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+import numpy as np
+from PersistenceLandscape import PersistenceLandscape
+
+__all__ = ['LandscapeExpr', 'lazy', 'lazy_arithmetic']
+
+# while True, arithmetic on landscapes builds LandscapeExpr objects
+_lazy = False
+
+
+@contextmanager
+def lazy_arithmetic():
+    """ Within this context, arithmetic on PersLandscapeApprox and
+    PersLandscapeExact objects builds `LandscapeExpr` objects instead of
+    computing new landscapes.
+
+    Examples
+    --------
+    >>> with lazy_arithmetic():
+    ...     expr = (A_sum/100.) - (B_sum/100.)
+    >>> expr.sup_norm()
+    """
+    global _lazy
+    previous, _lazy = _lazy, True
+    try:
+        yield
+    finally:
+        _lazy = previous
+
+
+def lazy(landscape) -> LandscapeExpr:
+    """ `landscape` as a `LandscapeExpr`, so arithmetic with it is lazy. """
+    if isinstance(landscape, LandscapeExpr):
+        return landscape
+    return LandscapeExpr([(1.0, landscape)])
+
+
+def _lazy_operand(landscape, other=None) -> LandscapeExpr:
+    """ `landscape` as an expression if arithmetic is lazy, because of
+    `lazy_arithmetic` or because `other` is an expression, else None.
+
+    Intended for the arithmetic operators of the landscape classes.
+    """
+    if _lazy or isinstance(other, LandscapeExpr):
+        return LandscapeExpr([(1.0, landscape)])
+    return None
+
+
+def _terms(operand) -> list:
+    if isinstance(operand, LandscapeExpr):
+        return operand.terms
+    if isinstance(operand, PersistenceLandscape):
+        return [(1.0, operand)]
+    return None
+
+
+class LandscapeExpr:
+    """
+    A linear combination of persistence landscapes, evaluated only when its
+    values or a norm are needed.
+
+    Sums and differences of expressions and landscapes, and their products
+    and quotients by numbers, give new expressions, which only collect the
+    coefficient of each landscape. `evaluate` then computes the combination
+    in one pass: approximate landscapes are summed into one array, a block
+    of columns at a time, and exact landscapes are merged by `lc_exact`.
+    `sup_norm` and `p_norm` of approximate landscapes are reduced block by
+    block without storing the combination.
+
+    Expressions are made by `lazy`, or by the arithmetic of landscapes
+    inside `lazy_arithmetic`.
+
+    Parameters
+    ----------
+    terms : list
+        (coefficient, landscape) pairs, all PersLandscapeApprox on the same
+        grid or all PersLandscapeExact, of the same homological degree.
+
+    Examples
+    --------
+    >>> (lazy(A) - B).sup_norm()
+    >>> avg = sum((lazy(P) for P in landscapes[1:]), lazy(landscapes[0]))/n
+    >>> avg.evaluate()
+    """
+
+    def __init__(self, terms: list) -> None:
+        # one term per landscape, so A - A is not evaluated twice
+        merged = {}
+        for coeff, landscape in terms:
+            if id(landscape) in merged:
+                merged[id(landscape)][0] += coeff
+            else:
+                merged[id(landscape)] = [coeff, landscape]
+        self.terms = [(coeff, landscape) for coeff, landscape in merged.values()]
+        if len({landscape.hom_deg for _, landscape in self.terms}) > 1:
+            raise ValueError("Persistence landscapes must be of same homological degree")
+        self.hom_deg = self.terms[0][1].hom_deg if self.terms else 0
+        if len({self._is_exact(landscape) for _, landscape in self.terms}) > 1:
+            raise TypeError("Cannot combine exact and approximate persistence landscapes")
+        self.exact = bool(self.terms) and self._is_exact(self.terms[0][1])
+        if not self.exact:
+            for _, landscape in self.terms[1:]:
+                _check_grids(self.terms[0][1], landscape)
+
+    @staticmethod
+    def _is_exact(landscape) -> bool:
+        from PersistenceLandscapeExact import PersLandscapeExact
+        return isinstance(landscape, PersLandscapeExact)
+
+    def __repr__(self) -> str:
+        return (f'Lazy linear combination of {len(self.terms)} persistence '
+                f'landscapes in homological degree {self.hom_deg}')
+
+    def __add__(self, other) -> LandscapeExpr:
+        terms = _terms(other)
+        if terms is None:
+            return NotImplemented
+        return LandscapeExpr(self.terms + terms)
+
+    def __radd__(self, other) -> LandscapeExpr:
+        terms = _terms(other)
+        if terms is None:
+            return NotImplemented
+        return LandscapeExpr(terms + self.terms)
+
+    def __neg__(self) -> LandscapeExpr:
+        return self*-1.0
+
+    def __sub__(self, other) -> LandscapeExpr:
+        terms = _terms(other)
+        if terms is None:
+            return NotImplemented
+        return LandscapeExpr(self.terms + [(-c, l) for c, l in terms])
+
+    def __rsub__(self, other) -> LandscapeExpr:
+        terms = _terms(other)
+        if terms is None:
+            return NotImplemented
+        return LandscapeExpr(terms + [(-c, l) for c, l in self.terms])
+
+    def __mul__(self, other: float) -> LandscapeExpr:
+        if not isinstance(other, (int, float)):
+            raise TypeError("Can only multiply persistence landscapes by real numbers")
+        return LandscapeExpr([(other*c, l) for c, l in self.terms])
+
+    def __rmul__(self, other: float) -> LandscapeExpr:
+        return self.__mul__(other)
+
+    def __truediv__(self, other: float) -> LandscapeExpr:
+        if other == 0.:
+            raise ValueError("Cannot divide by zero")
+        return (1.0/other)*self
+
+    def _approx_terms(self) -> tuple:
+        """ The depth of the combination and the coefficients and values of
+        the landscapes that are not empty. """
+        from PersistenceLandscapeGrid import _float_values
+        terms = []
+        for coeff, landscape in self.terms:
+            values = _float_values(landscape)
+            # landscapes of empty diagrams have no rows
+            if len(values):
+                terms.append((coeff, values))
+        return max((len(values) for _, values in terms), default=0), terms
+
+    def _blocks(self, out: np.ndarray = None):
+        """ Iterate over blocks of columns of an approximate combination.
+
+        Yields
+        ------
+        numpy array
+            The values of the combination on a block of about `_CHUNK_SIZE`
+            entries, which is a view of `out` if it is given.
+        """
+        import PersistenceLandscapeGrid
+        depth, terms = self._approx_terms()
+        num_steps = self.terms[0][1].num_steps
+        width = max(1, PersistenceLandscapeGrid._CHUNK_SIZE//max(depth, 1))
+        for first in range(0, num_steps, width):
+            cols = slice(first, min(first + width, num_steps))
+            if out is None:
+                block = np.zeros((depth, cols.stop - cols.start))
+            else:
+                block = out[:, cols]
+            for coeff, values in terms:
+                block[:len(values)] += coeff*values[:, cols]
+            yield block
+
+    def evaluate(self):
+        """ Compute the combination.
+
+        Returns
+        -------
+        PersLandscapeApprox or PersLandscapeExact
+        """
+        if not self.terms:
+            raise ValueError("Cannot evaluate an empty linear combination")
+        if self.exact:
+            from PersistenceLandscapeExact import lc_exact
+            return lc_exact([l for _, l in self.terms],
+                            [c for c, _ in self.terms])
+        from PersistenceLandscapeGrid import _landscape_from_values
+        grid = self.terms[0][1].grid
+        depth, _ = self._approx_terms()
+        values = np.zeros((depth, grid.num_steps))
+        for _ in self._blocks(out=values):
+            pass
+        return _landscape_from_values(grid, values, self.hom_deg)
+
+    @property
+    def values(self) -> np.ndarray:
+        """ The values of the evaluated combination. """
+        return self.evaluate().values
+
+    def sup_norm(self) -> float:
+        """ The sup norm of the combination. """
+        if self.exact or not self.terms:
+            return self.evaluate().sup_norm()
+        return max((np.max(np.abs(block), initial=0.)
+                    for block in self._blocks()), default=0.)
+
+    def p_norm(self, p: int = 2) -> float:
+        """ The p-norm of the combination, as given by the `p_norm` of the
+        evaluated landscape. """
+        if self.exact or not self.terms or not 0 < p:
+            return self.evaluate().p_norm(p)
+        depth, _ = self._approx_terms()
+        if p == np.inf:
+            rows = np.zeros(depth)
+            for block in self._blocks():
+                rows = np.maximum(rows, np.max(np.abs(block), axis=1,
+                                               initial=0.))
+            return np.sum(rows)
+        rows = np.zeros(depth)
+        for block in self._blocks():
+            rows += np.sum(np.abs(block)**p, axis=1)
+        return np.sum(rows**(1/p))
+
+
+def _check_grids(P, Q) -> None:
+    """ Raise the errors of `PersLandscapeApprox.__add__` if `P` and `Q`,
+    which hold a `Grid` in `grid`, are on different grids. """
+    A, B = P.grid, Q.grid
+    if A is not B:
+        if A.start != B.start:
+            raise ValueError("Start values of grids do not coincide")
+        if A.stop != B.stop:
+            raise ValueError("Stop values of grids do not coincide")
+        if A.num_steps != B.num_steps:
+            raise ValueError("Number of steps of grids do not coincide")
@@ -0,0 +1,190 @@
+"""
+Save and load persistence landscapes in a versioned binary format.
+"""
+from __future__ import annotations
+import os
+import numpy as np
+from PersistenceLandscapeExact import PersLandscapeExact
+from PersistenceLandscapeGrid import (Grid, PersLandscapeApprox, _float_values,
+                                     _landscape_from_values)
+
+__all__ = ['save', 'load', 'save_collection', 'load_collection']
+
+# version of the on-disk layout, stored with every file
+FORMAT_VERSION = 1
+
+# raw arrays of a collection of each kind, besides the header
+_COLLECTION_ARRAYS = {'approx': ['values', 'value_offsets'],
+                      'exact': ['xs', 'ys', 'offsets', 'point_offsets',
+                                'depth_offsets']}
+
+
+def _kind(landscape) -> str:
+    if isinstance(landscape, PersLandscapeExact):
+        return 'exact'
+    if isinstance(landscape, PersLandscapeApprox):
+        return 'approx'
+    raise TypeError(f"cannot save an object of type {type(landscape).__name__}")
+
+
+def _check_header(header, kinds: list) -> str:
+    version = int(header['format_version'])
+    if version > FORMAT_VERSION:
+        raise ValueError(f"format version {version} is newer than the "
+                         f"supported version {FORMAT_VERSION}")
+    kind = str(header['kind'])
+    if kind not in kinds:
+        raise ValueError(f"unknown landscape kind {kind!r}")
+    return kind
+
+
+def _exact_arrays(landscape: PersLandscapeExact) -> tuple:
+    """ The compressed layout of an exact landscape, computing it if
+    needed. """
+    landscape.compute_landscape()
+    if landscape.offsets is None:
+        return np.empty(0), np.empty(0), np.zeros(1, dtype=np.int64)
+    return landscape.xs, landscape.ys, landscape.offsets
+
+
+def _approx_landscape(start: float, stop: float, num_steps: int, hom_deg: int,
+                      values: np.ndarray) -> PersLandscapeApprox:
+    return _landscape_from_values(Grid(start, stop, num_steps), values,
+                                  hom_deg)
+
+
+def save(path: str, landscape) -> None:
+    """ Save a single landscape to an uncompressed `.npz` file.
+
+    Approximate landscapes are stored as their grid parameters and values,
+    exact landscapes as the arrays `xs`, `ys` and `offsets` of their
+    compressed layout.
+
+    Parameters
+    ----------
+    path : str
+        The file name. numpy appends `.npz` if it is missing.
+
+    landscape : PersLandscapeApprox or PersLandscapeExact
+        The landscape to save.
+    """
+    kind = _kind(landscape)
+    header = dict(format_version=FORMAT_VERSION, kind=kind,
+                  hom_deg=landscape.hom_deg)
+    if kind == 'approx':
+        np.savez(path, **header, start=landscape.start, stop=landscape.stop,
+                 num_steps=landscape.num_steps,
+                 values=_float_values(landscape))
+    else:
+        xs, ys, offsets = _exact_arrays(landscape)
+        np.savez(path, **header, xs=xs, ys=ys, offsets=offsets)
+
+
+def load(path: str):
+    """ Load a landscape saved by `save`.
+
+    Returns
+    -------
+    PersLandscapeApprox or PersLandscapeExact
+    """
+    with np.load(path) as data:
+        kind = _check_header(data, ['approx', 'exact'])
+        hom_deg = int(data['hom_deg'])
+        if kind == 'exact':
+            return PersLandscapeExact._from_arrays(
+                data['xs'], data['ys'], data['offsets'], hom_deg=hom_deg)
+        return _approx_landscape(data['start'].item(), data['stop'].item(),
+                                 int(data['num_steps']), hom_deg, data['values'])
+
+
+def save_collection(path: str, landscapes: list) -> None:
+    """ Save a list of landscapes of the same kind to a directory of raw
+    `.npy` files, which `load_collection` can memory-map.
+
+    The arrays of all landscapes are concatenated into one file per array,
+    with offset arrays giving the range of each landscape. A small
+    `header.npz` holds the format version, the kind of landscape and the
+    homological degree and grid of each landscape.
+
+    Parameters
+    ----------
+    path : str
+        The directory, which is created if it does not exist.
+
+    landscapes : list
+        A list of PersLandscapeApprox objects or of PersLandscapeExact
+        objects.
+    """
+    kinds = {_kind(pl) for pl in landscapes}
+    if len(kinds) > 1:
+        raise ValueError("a collection must hold landscapes of one kind")
+    kind = kinds.pop() if kinds else 'approx'
+    os.makedirs(path, exist_ok=True)
+    header = dict(format_version=FORMAT_VERSION, kind=kind,
+                  hom_deg=np.array([pl.hom_deg for pl in landscapes],
+                                   dtype=np.int64))
+    if kind == 'approx':
+        header.update(start=np.array([pl.start for pl in landscapes], dtype=float),
+                      stop=np.array([pl.stop for pl in landscapes], dtype=float),
+                      num_steps=np.array([pl.num_steps for pl in landscapes],
+                                         dtype=np.int64))
+        values = [_float_values(pl).ravel() for pl in landscapes]
+        arrays = dict(values=np.concatenate([np.empty(0)] + values),
+                      value_offsets=np.cumsum([0] + [len(v) for v in values],
+                                              dtype=np.int64))
+    else:
+        layouts = [_exact_arrays(pl) for pl in landscapes]
+        arrays = dict(
+            xs=np.concatenate([np.empty(0)] + [xs for xs, _, _ in layouts]),
+            ys=np.concatenate([np.empty(0)] + [ys for _, ys, _ in layouts]),
+            offsets=np.concatenate([np.empty(0, dtype=np.int64)]
+                                   + [offsets for _, _, offsets in layouts]),
+            point_offsets=np.cumsum([0] + [len(xs) for xs, _, _ in layouts],
+                                    dtype=np.int64),
+            depth_offsets=np.cumsum([0] + [len(o) for _, _, o in layouts],
+                                    dtype=np.int64))
+    np.savez(os.path.join(path, 'header.npz'), **header)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, name + '.npy'), array)
+
+
+def load_collection(path: str, mmap_mode: str = 'r') -> list:
+    """ Load a list of landscapes saved by `save_collection`.
+
+    With memory-mapping, each landscape holds views into the files on disk,
+    so nothing is read until it is used and processes that load the same
+    collection share its pages in the operating system's cache.
+
+    Parameters
+    ----------
+    path : str
+        The directory passed to `save_collection`.
+
+    mmap_mode : str, default 'r'
+        Passed to `numpy.load`. None reads the arrays into memory.
+
+    Returns
+    -------
+    list
+        A list of PersLandscapeApprox or PersLandscapeExact objects.
+    """
+    with np.load(os.path.join(path, 'header.npz')) as data:
+        header = dict(data)
+    kind = _check_header(header, list(_COLLECTION_ARRAYS))
+    arrays = {name: np.load(os.path.join(path, name + '.npy'),
+                            mmap_mode=mmap_mode)
+              for name in _COLLECTION_ARRAYS[kind]}
+    if kind == 'approx':
+        ranges = arrays['value_offsets']
+        return [_approx_landscape(start.item(), stop.item(), int(num_steps),
+                                  int(hom_deg),
+                                  arrays['values'][a:b].reshape(-1, num_steps))
+                for hom_deg, start, stop, num_steps, a, b
+                in zip(header['hom_deg'], header['start'], header['stop'],
+                       header['num_steps'], ranges[:-1], ranges[1:])]
+    points, depths = arrays['point_offsets'], arrays['depth_offsets']
+    return [PersLandscapeExact._from_arrays(
+                arrays['xs'][p:q], arrays['ys'][p:q], arrays['offsets'][d:e],
+                hom_deg=int(hom_deg))
+            for hom_deg, p, q, d, e in zip(header['hom_deg'], points[:-1],
+                                           points[1:], depths[:-1], depths[1:])]
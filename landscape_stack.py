@@ -0,0 +1,169 @@
+"""
+Landscapes of several homological degrees of one persistence diagram.
+"""
+from __future__ import annotations
+import operator
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from auxiliary import _resolve_n_jobs
+from PersistenceLandscapeExact import PersLandscapeExact
+from PersistenceLandscapeGrid import Grid, PersLandscapeApprox
+
+__all__ = ['LandscapeStack']
+
+
+def _build_landscape(finite: list, hom_deg: int, grid: Grid, exact: bool,
+                     max_depth: int):
+    """ Compute the landscape of degree `hom_deg`.
+
+    Intended for internal use. `finite` holds the finite birth-death pairs of
+    each degree.
+    """
+    if exact:
+        return PersLandscapeExact(dgms=finite, hom_deg=hom_deg,
+                                  max_depth=max_depth)
+    return PersLandscapeApprox(grid=grid, dgms=finite, hom_deg=hom_deg,
+                               compute=True, max_depth=max_depth)
+
+
+class LandscapeStack:
+    """
+    The persistence landscapes of several homological degrees.
+
+    Each degree is stored as an ordinary `PersLandscapeApprox` or
+    `PersLandscapeExact`, available as `stack[hom_deg]`, so arithmetic and
+    norms work on it directly. Approximate landscapes of all degrees share
+    one grid. Stacks with the same degrees support the same arithmetic,
+    which is applied degree by degree.
+
+    Parameters
+    ----------
+    landscapes : dict
+        A dictionary mapping each homological degree to its landscape.
+
+    Examples
+    --------
+    >>> dgms = ripser(data)['dgms']
+    >>> stack = LandscapeStack.from_ripser(dgms, degrees=[1, 2])
+    >>> (stack[1] + stack[2]).p_norm()
+    """
+
+    def __init__(self, landscapes: dict) -> None:
+        for hom_deg, pl in landscapes.items():
+            if pl.hom_deg != hom_deg:
+                raise ValueError(f"the landscape stored for degree {hom_deg} "
+                                 f"has degree {pl.hom_deg}")
+        self.landscapes = dict(sorted(landscapes.items()))
+
+    @classmethod
+    def from_ripser(cls, dgms: list, degrees: list = None, grid: Grid = None,
+                    exact: bool = False, max_depth: int = None,
+                    n_jobs: int = None) -> LandscapeStack:
+        """ Compute the landscapes of several degrees of a diagram at once.
+
+        The diagrams are read and stripped of infinite bars once, and the
+        default grid is computed once over all requested degrees.
+
+        Parameters
+        ----------
+        dgms : list
+            A list of diagrams, one per homological degree, in the output
+            format from ripser.py.
+
+        degrees : list, optional
+            The homological degrees to compute. Defaults to every degree in
+            `dgms`.
+
+        grid : Grid or tuple, optional
+            The shared grid of the approximate landscapes, as a `Grid` or a
+            tuple (start, stop, num_steps). Defaults to the smallest birth and
+            largest death over the requested degrees, with 500 steps. Ignored
+            if `exact`.
+
+        exact : bool, default False
+            Compute `PersLandscapeExact` instead of `PersLandscapeApprox`.
+
+        max_depth : int, optional
+            If given, only the first `max_depth` landscape functions of each
+            degree are computed.
+
+        n_jobs : int, optional
+            The number of worker processes, each computing one degree at a
+            time. None or 1 runs in this process and -1 uses every CPU.
+        """
+        if degrees is None:
+            degrees = range(len(dgms))
+        degrees = sorted({operator.index(hom_deg) for hom_deg in degrees})
+        for hom_deg in degrees:
+            if not 0 <= hom_deg < len(dgms):
+                raise ValueError(f"no diagram of degree {hom_deg} was passed")
+        finite = [np.empty((0, 2)) for _ in dgms]
+        for hom_deg in degrees:
+            pairs = np.asarray(dgms[hom_deg], dtype=float).reshape(-1, 2)
+            finite[hom_deg] = pairs[~np.any(pairs == np.inf, axis=1)]
+        if not exact and grid is None:
+            pairs = np.concatenate([finite[hom_deg] for hom_deg in degrees])
+            if not len(pairs):
+                raise ValueError("start and stop can't be computed from "
+                                 "empty diagrams, pass a grid")
+            grid = (np.min(pairs[:, 0]), np.max(pairs[:, 1]), 500)
+        if not exact and not isinstance(grid, Grid):
+            grid = Grid(*grid)
+        n_jobs = _resolve_n_jobs(n_jobs)
+        args = [(finite, hom_deg, grid, exact, max_depth) for hom_deg in degrees]
+        if n_jobs == 1 or len(degrees) < 2:
+            landscapes = [_build_landscape(*a) for a in args]
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(degrees))
+                                     ) as executor:
+                landscapes = list(executor.map(_build_landscape, *zip(*args)))
+        return cls(dict(zip(degrees, landscapes)))
+
+    @property
+    def degrees(self) -> list:
+        """ The homological degrees in the stack. """
+        return list(self.landscapes)
+
+    def __repr__(self) -> str:
+        return f"Persistence landscapes in homological degrees {self.degrees}"
+
+    def __getitem__(self, hom_deg: int):
+        return self.landscapes[hom_deg]
+
+    def __iter__(self):
+        return iter(self.landscapes.values())
+
+    def __len__(self) -> int:
+        return len(self.landscapes)
+
+    def _check_degrees(self, other: LandscapeStack) -> None:
+        if self.degrees != other.degrees:
+            raise ValueError("stacks must have the same homological degrees")
+
+    def __add__(self, other: LandscapeStack) -> LandscapeStack:
+        self._check_degrees(other)
+        return LandscapeStack({d: self[d] + other[d] for d in self.degrees})
+
+    def __neg__(self) -> LandscapeStack:
+        return LandscapeStack({d: -pl for d, pl in self.landscapes.items()})
+
+    def __sub__(self, other: LandscapeStack) -> LandscapeStack:
+        self._check_degrees(other)
+        return LandscapeStack({d: self[d] - other[d] for d in self.degrees})
+
+    def __mul__(self, other: float) -> LandscapeStack:
+        return LandscapeStack({d: pl*other for d, pl in self.landscapes.items()})
+
+    def __rmul__(self, other: float) -> LandscapeStack:
+        return self.__mul__(other)
+
+    def __truediv__(self, other: float) -> LandscapeStack:
+        return LandscapeStack({d: pl/other for d, pl in self.landscapes.items()})
+
+    def p_norm(self, p: int = 2) -> dict:
+        """ Returns the p-norm of the landscape of each degree. """
+        return {d: pl.p_norm(p) for d, pl in self.landscapes.items()}
+
+    def sup_norm(self) -> dict:
+        """ Returns the sup norm of the landscape of each degree. """
+        return {d: pl.sup_norm() for d, pl in self.landscapes.items()}
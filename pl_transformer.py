@@ -2,53 +2,261 @@
     Implementation of scikit-learn transformers for persistence
     landscapes.
 """
-from operator import itemgetter
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.base import BaseEstimator, TransformerMixin
-from PersistenceLandscapeExact import PersLandscapeExact
-from PersistenceLandscapeGrid import PersLandscapeApprox
+from PersistenceLandscapeExact import PersLandscapeExact, _sweep_landscape
+from PersistenceLandscapeGrid import batch_approx
+from landscape_cache import get_cache, landscape_key
+from auxiliary import _resolve_n_jobs
 
 
-# To get the following functionality to work, I think we need 
-# to split off the compute landscape function from within the 
-# PL class.
+def _pack(X: list, hom_deg: int):
+    """ Pack the diagrams of degree `hom_deg` into one array of
+    birth-death pairs and an array of the number of pairs in each.
+
+    Intended for internal use. This is the compact form that is sent to
+    worker processes.
+    """
+    bd_pairs = [np.asarray(dgms[hom_deg], dtype=float).reshape(-1, 2)
+                for dgms in X]
+    sizes = np.array([len(pairs) for pairs in bd_pairs], dtype=int)
+    if not bd_pairs:
+        return np.empty((0, 2)), sizes
+    return np.concatenate(bd_pairs), sizes
+
+
+def _unpack(bd_pairs: np.ndarray, sizes: np.ndarray) -> list:
+    """ Inverse of `_pack`, with each diagram in degree 0. """
+    return [[pairs] for pairs in np.split(bd_pairs, np.cumsum(sizes)[:-1])]
+
+
+def _approx_chunk(bd_pairs, sizes, start, stop, num_steps, max_depth=None):
+    return batch_approx(_unpack(bd_pairs, sizes), start=start, stop=stop,
+                        num_steps=num_steps, max_depth=max_depth)
+
+
+def _exact_chunk(bd_pairs, sizes, max_depth=None):
+    """ The arrays xs, ys and offsets of the exact landscape of each
+    diagram. """
+    bd_pairs = [dgms[0][~np.any(dgms[0] == np.inf, axis=1)]
+                for dgms in _unpack(bd_pairs, sizes)]
+    return [_sweep_landscape(pairs, max_depth=max_depth) for pairs in bd_pairs]
+
+
+def _map_chunks(func, bd_pairs: np.ndarray, sizes: np.ndarray,
+                args: tuple = (), n_jobs: int = None) -> list:
+    """ Apply `func` to chunks of the packed diagrams, possibly in
+    parallel, and return the results in order. Extra positional arguments
+    for `func` are passed in `args`.
+
+    Intended for internal use. `n_jobs` is the number of worker processes;
+    None or 1 runs everything in this process and -1 uses every CPU.
+    """
+    n_jobs = _resolve_n_jobs(n_jobs)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    if n_jobs == 1 or len(sizes) < 2:
+        return [func(bd_pairs, sizes, *args)]
+    # a few chunks per worker balances the load without much pickling
+    bounds = np.linspace(0, len(sizes), min(len(sizes), 4*n_jobs) + 1,
+                         dtype=int)
+    chunks = [(bd_pairs[offsets[i]:offsets[j]], sizes[i:j])
+              for i, j in zip(bounds, bounds[1:])]
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        futures = [executor.submit(func, *chunk, *args) for chunk in chunks]
+        return [future.result() for future in futures]
+
+
+def _map_cached(func, bd_pairs: np.ndarray, sizes: np.ndarray, split,
+                args: tuple = (), n_jobs: int = None, kind: str = 'approx',
+                params: dict = {}) -> list:
+    """ Like `_map_chunks`, but look up each diagram in the active cache
+    first and compute only the missing ones.
+
+    Intended for internal use. `split` turns the result of `func` on a
+    chunk into a tuple of arrays per diagram, which is what is cached, and
+    the list of these tuples is returned. The keys are those of
+    `compute_landscape`, so the transformers and the landscape classes
+    share cache entries.
+    """
+    cache = get_cache()
+    if cache is None:
+        return [arrays for result in _map_chunks(func, bd_pairs, sizes, args,
+                                                 n_jobs)
+                for arrays in split(result)]
+    diagrams = np.split(bd_pairs, np.cumsum(sizes)[:-1]) if len(sizes) else []
+    keys = [landscape_key(pairs[~np.any(pairs == np.inf, axis=1)], kind,
+                          **params) for pairs in diagrams]
+    results = [cache.get(key) for key in keys]
+    missing = [i for i, arrays in enumerate(results) if arrays is None]
+    if missing:
+        computed = _map_chunks(func, np.concatenate([diagrams[i] for i in missing]),
+                               sizes[missing], args, n_jobs)
+        computed = [arrays for result in computed for arrays in split(result)]
+        for i, arrays in zip(missing, computed):
+            results[i] = cache.put(keys[i], arrays)
+    return results
+
+
+def _split_values(values: np.ndarray) -> list:
+    """ The values of each landscape in the output of `batch_approx`,
+    without the padding functions. """
+    return [(v[:np.count_nonzero(v.any(axis=1))],) for v in values]
+
+
+def _split_exact(result: list) -> list:
+    return result
+
 
 class PLE(BaseEstimator, TransformerMixin):
     """ A scikit-learn transformer class for exact persistence landscapes. The transform
-    method returns the list of critical pairs for the landscape. For a vectorized
-    encoding of the landscape, using the PL_grid transformer.
+    method returns the list of critical pairs for the landscape of each
+    diagram. For a vectorized encoding of the landscape, using the PLA
+    transformer.
+
+    Parameters
+    ----------
+    hom_deg : int
+        The homological degree.
+
+    n_jobs : int, optional
+        The number of worker processes. None or 1 computes the landscapes in
+        this process, -1 uses every CPU.
+
+    max_depth : int, optional
+        If given, only the first `max_depth` landscape functions of each
+        diagram are computed.
     """
-    def __init__(self,hom_deg:int = 0):
+    def __init__(self,hom_deg:int = 0, n_jobs: int = None,
+                 max_depth: int = None):
         self.hom_deg = hom_deg
-        
+        self.n_jobs = n_jobs
+        self.max_depth = max_depth
+
     def fit(self,X, y=None):
         return self
-    
+
     def transform(self, X, y=None):
-        # Add check that X is the output of a PH calculation.
-        # return X[self.homological_degree].compute_landscape()
-        result = PersLandscapeExact(dgms=X, hom_deg=self.hom_deg)
-        return result.critical_pairs
-    
+        """ Return the critical pairs of each diagram in `X`.
+
+        Parameters
+        ----------
+        X : list
+            A list of diagrams, each in the output format from ripser.py.
+        """
+        bd_pairs, sizes = _pack(X, self.hom_deg)
+        results = _map_cached(_exact_chunk, bd_pairs, sizes, _split_exact,
+                              args=(self.max_depth,), n_jobs=self.n_jobs,
+                              kind='exact',
+                              params=dict(hom_deg=self.hom_deg,
+                                          max_depth=self.max_depth))
+        return [PersLandscapeExact._from_arrays(*arrays).critical_pairs
+                for arrays in results]
+
 class PLA(BaseEstimator, TransformerMixin):
     """ A scikit-learn transformer for grid persistence landscapes.
+
+    The transform method returns a feature matrix with one row per
+    diagram, holding the landscape values sampled on a common grid. Rows
+    are padded with zero functions, or truncated, to the largest depth
+    among the diagrams passed to `fit`, or to `max_depth` if it is given,
+    so every call to transform gives the same number of features.
+
+    Parameters
+    ----------
+    hom_deg : int
+        The homological degree.
+
+    start : float, optional
+        The start parameter of the grid. If None, the smallest birth time
+        of the diagrams passed to `fit` is used.
+
+    stop : float, optional
+        The stop parameter of the grid. If None, the largest death time
+        of the diagrams passed to `fit` is used.
+
+    num_steps : int, default 500
+        The number of steps in the grid.
+
+    n_jobs : int, optional
+        The number of worker processes. None or 1 computes the landscapes in
+        this process, -1 uses every CPU.
+
+    max_depth : int, optional
+        If given, only the first `max_depth` landscape functions of each
+        diagram are computed, and every row has max_depth*num_steps entries.
     """
-    def __init__(self,hom_deg:int = 0,  start: float = None, stop: float = None, num_steps: int = 500):
+    def __init__(self,hom_deg:int = 0,  start: float = None, stop: float = None,
+                 num_steps: int = 500, n_jobs: int = None,
+                 max_depth: int = None):
         self.hom_deg = hom_deg
         self.start = start
         self.stop = stop
         self.num_steps = num_steps
-        
+        self.n_jobs = n_jobs
+        self.max_depth = max_depth
+
     def fit(self,X,y=None):
+        """ Set the grid, and the depth `depth_` of the feature matrix: the
+        largest depth among the landscapes of `X`, or `max_depth` if it is
+        given. """
+        self._fit(X)
         return self
-    
+
+    def _fit(self, X) -> list:
+        """ Fit to `X` and return the values of its landscapes, if they had
+        to be computed. """
+        bd_pairs, _ = _pack(X, self.hom_deg)
+        bd_pairs = bd_pairs[~np.any(bd_pairs == np.inf, axis=1)]
+        self.start_ = np.min(bd_pairs[:, 0]) if self.start is None else self.start
+        self.stop_ = np.max(bd_pairs[:, 1]) if self.stop is None else self.stop
+        if self.max_depth is not None:
+            self.depth_ = self.max_depth
+            return None
+        results = self._values(X)
+        self.depth_ = max([len(values) for values, in results], default=0)
+        return results
+
+    def _values(self, X) -> list:
+        """ The values of the landscape of each diagram in `X`. """
+        bd_pairs, sizes = _pack(X, self.hom_deg)
+        return _map_cached(_approx_chunk, bd_pairs, sizes, _split_values,
+                           args=(self.start_, self.stop_, self.num_steps,
+                                 self.max_depth),
+                           n_jobs=self.n_jobs, kind='approx',
+                           params=dict(hom_deg=self.hom_deg,
+                                       start=self.start_, stop=self.stop_,
+                                       num_steps=self.num_steps,
+                                       max_depth=self.max_depth))
+
+    def _features(self, results: list) -> np.ndarray:
+        """ The feature matrix of the landscape values in `results`, padded
+        with zero functions or truncated to `depth_`. """
+        result = np.zeros((len(results), self.depth_, self.num_steps))
+        for row, (values,) in zip(result, results):
+            row[:len(values)] = values[:self.depth_]
+        return result.reshape(len(result), -1)
+
     def transform(self,X,y=None):
-        if self.start is None:
-            _start = min(X, key=itemgetter(0))[0]
-        else:
-            _start = self.start
-        if self.stop is None:
-            _stop = max(X, key=itemgetter(1))[1]        
-        else:
-            _stop = self.stop
-        result = PersLandscapeApprox(diagrams=X, start = _start, stop = _stop, num_steps = self.num_steps, hom_deg = self.hom_deg)
-        return result.values
+        """ Return the feature matrix of the diagrams in `X`.
+
+        Parameters
+        ----------
+        X : list
+            A list of diagrams, each in the output format from ripser.py.
+
+        Returns
+        -------
+        numpy array
+            An array of shape (len(X), depth_*num_steps), with the depth
+            set by `fit`. Landscapes deeper than that are truncated.
+        """
+        return self._features(self._values(X))
+
+    def fit_transform(self, X, y=None):
+        """ Fit to `X` and return its feature matrix, computing the
+        landscapes once. """
+        results = self._fit(X)
+        if results is None:
+            results = self._values(X)
+        return self._features(results)
@@ -0,0 +1,158 @@
+"""
+Per-stage timing of the landscape computations.
+"""
+from __future__ import annotations
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+__all__ = ['StageProfiler', 'stage', 'count']
+
+# the profiler receiving the stages, if any
+_active = None
+
+# returned by `stage` while no profiler is active
+_NULL_STAGE = nullcontext()
+
+
+def stage(name: str):
+    """ A context manager timing the stage `name` for the active profiler.
+
+    When no profiler is active this returns a shared no-op context manager,
+    so instrumented code costs one function call per stage.
+    """
+    if _active is None:
+        return _NULL_STAGE
+    return _Stage(_active, name)
+
+
+def count(name: str, **counts) -> None:
+    """ Add `counts`, such as the number of bars, to the stage `name` of the
+    active profiler. """
+    if _active is not None:
+        _active._add_counts(name, counts)
+
+
+class _Stage:
+
+    def __init__(self, profiler: StageProfiler, name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.profiler._enter(self)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        seconds = time.perf_counter() - self.start
+        self.profiler._exit(self, seconds)
+
+
+class StageProfiler:
+    """
+    Records the wall time, number of calls and counts of each internal stage
+    of the landscape computations run while it is active.
+
+    The instrumented stages are 'sort', 'nested', 'sweep' and 'duplicates'
+    of `PersLandscapeExact.compute_landscape`, and 'snap', 'duplicates',
+    'fill' (the tent heights), 'sort' and 'matrix' (assembling the values)
+    of `PersLandscapeApprox.compute_landscape` and `batch_approx`. The time
+    of a stage includes the stages nested in it.
+
+    Parameters
+    ----------
+    memory : bool, default False
+        Also record, with `tracemalloc`, the peak memory allocated during
+        each stage above the memory in use when it started. This slows down
+        the computation.
+
+    callback : callable, optional
+        Called as `callback(name, seconds)` at the end of every stage.
+
+    Examples
+    --------
+    >>> with StageProfiler(memory=True) as prof:
+    ...     P = PersLandscapeExact(dgms=dgms, hom_deg=1)
+    >>> prof.report()['sweep']['seconds']
+    >>> print(prof)
+    """
+
+    def __init__(self, memory: bool = False, callback=None) -> None:
+        self.memory = memory
+        self.callback = callback
+        self.stages = {}
+        self._stack = []
+        self._previous = None
+        self._started_tracing = False
+
+    def __enter__(self) -> StageProfiler:
+        global _active
+        self._previous, _active = _active, self
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc) -> None:
+        global _active
+        _active = self._previous
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _record(self, name: str) -> dict:
+        if name not in self.stages:
+            self.stages[name] = dict(calls=0, seconds=0.0)
+            if self.memory:
+                self.stages[name]['peak_bytes'] = 0
+        return self.stages[name]
+
+    def _enter(self, current: _Stage) -> None:
+        if self.memory:
+            used, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # the peak is reset below, so keep it for the outer stage
+                outer = self._stack[-1]
+                outer.peak = max(outer.peak, peak)
+            current.base = current.peak = used
+            tracemalloc.reset_peak()
+        self._stack.append(current)
+
+    def _exit(self, current: _Stage, seconds: float) -> None:
+        self._stack.pop()
+        record = self._record(current.name)
+        record['calls'] += 1
+        record['seconds'] += seconds
+        if self.memory:
+            peak = max(current.peak, tracemalloc.get_traced_memory()[1])
+            record['peak_bytes'] = max(record['peak_bytes'],
+                                       peak - current.base)
+            if self._stack:
+                outer = self._stack[-1]
+                outer.peak = max(outer.peak, peak)
+        if self.callback is not None:
+            self.callback(current.name, seconds)
+
+    def _add_counts(self, name: str, counts: dict) -> None:
+        record = self._record(name)
+        for key, value in counts.items():
+            record[key] = record.get(key, 0) + value
+
+    def report(self) -> dict:
+        """ A dictionary mapping each stage to a dictionary with its number
+        of calls, total seconds, counts and, with `memory`, peak bytes. """
+        return {name: dict(record) for name, record in self.stages.items()}
+
+    def reset(self) -> None:
+        """ Forget the recorded stages. """
+        self.stages = {}
+
+    def __repr__(self) -> str:
+        lines = [f"{'stage':>12} {'calls':>8} {'seconds':>12}  counts"]
+        for name, record in sorted(self.stages.items(),
+                                   key=lambda item: -item[1]['seconds']):
+            counts = ', '.join(f'{key}={value}' for key, value in record.items()
+                               if key not in ('calls', 'seconds'))
+            lines.append(f"{name:>12} {record['calls']:>8} "
+                         f"{record['seconds']:>12.6f}  {counts}")
+        return '\n'.join(lines)
@@ -99,8 +99,8 @@ sph2_pl1_list = snap_PL(sph2_pl1_list)
 sph3_pl1_list = snap_PL(sph3_pl1_list)
 
 #%% Construct the true average landscape
-avg_sph2_pl1 = sph2_pl1_list[0]
-avg_sph3_pl1 = sph3_pl1_list[0]
+avg_sph2_pl1 = sph2_pl1_list[0].copy()
+avg_sph3_pl1 = sph3_pl1_list[0].copy()
 
 for i in range(1,100):
     avg_sph2_pl1 += sph2_pl1_list[i]
@@ -137,8 +137,8 @@ for run in range(100):
     A_pl_list = [comb_pl_list[i] for i in A_indices]
     B_pl_list = [comb_pl_list[j] for j in B_indices]
     
-    A_sum = A_pl_list[0]
-    B_sum = B_pl_list[0]
+    A_sum = A_pl_list[0].copy()
+    B_sum = B_pl_list[0].copy()
     for i in range(99):
         A_sum += A_pl_list[i+1]
         B_sum += B_pl_list[i+1]
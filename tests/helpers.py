@@ -0,0 +1,45 @@
+"""
+Helpers shared by the unit tests
+"""
+
+import numpy as np
+
+
+def random_dgms(num_dgms=None, seed=0, sizes=(1, 20), length=1.0, rng=None):
+    """ Random diagrams of one homological degree, in the output format from
+    ripser.py, with births uniform on [0, 1] and lengths uniform on
+    [0, length].
+
+    Parameters
+    ----------
+    num_dgms : int, optional
+        The number of diagrams. If None, a single diagram is returned
+        rather than a list of them.
+
+    seed : int, default 0
+        The seed of the random generator, if `rng` is not given.
+
+    sizes : int or tuple, default (1, 20)
+        The number of bars of each diagram, or the range (low, high) from
+        which the numbers of bars are drawn.
+
+    length : float, default 1.0
+        The largest length of a bar.
+
+    rng : numpy Generator, optional
+        The random generator, e.g. to draw several diagrams in turn from one
+        stream.
+    """
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    count = 1 if num_dgms is None else num_dgms
+    if np.ndim(sizes) == 0:
+        sizes = np.full(count, sizes)
+    else:
+        sizes = rng.integers(*sizes, count)
+    dgms_list = []
+    for n in sizes:
+        birth = rng.uniform(0, 1, n)
+        dgms_list.append([np.column_stack(
+            [birth, birth + length*rng.uniform(0, 1, n)])])
+    return dgms_list[0] if num_dgms is None else dgms_list
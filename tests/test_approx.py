@@ -0,0 +1,368 @@
+"""
+Unit tests for PersLandscapeApprox
+"""
+
+import pickle
+import tracemalloc
+import pytest
+import numpy as np
+
+import PersistenceLandscapeGrid
+from PersistenceLandscapeGrid import (Grid, PersLandscapeApprox, batch_approx,
+                                      RunningLandscapeMean, LandscapeArray,
+                                      snap_PL, lc_approx, _grid_operator)
+from helpers import random_dgms
+
+
+class TestGrid():
+
+    def test_interned(self):
+        grid = Grid(0, 2, 50)
+        assert Grid(0.0, 2.0, np.int64(50)) is grid
+        assert grid != Grid(0, 2, 51) and len({grid, Grid(0, 2, 50)}) == 1
+        assert pickle.loads(pickle.dumps(grid)) is grid
+        np.testing.assert_array_equal(grid.coords, np.linspace(0, 2, 50))
+        assert grid.step == np.linspace(0, 2, 50, retstep=True)[1]
+        assert not grid.coords.flags.writeable
+        with pytest.raises(AttributeError):
+            grid.start = 1
+        with pytest.raises(ValueError):
+            Grid(0, 1, 0)
+
+    def test_snap(self):
+        grid = Grid(-1, 2, 31)
+        x = np.random.default_rng(15).uniform(-2, 3, (40, 2))
+        nearest = np.argmin(np.abs(grid.coords - x[..., np.newaxis]), axis=-1)
+        np.testing.assert_array_equal(grid.snap(x), nearest)
+
+    def test_shared_by_landscapes(self):
+        dgms = [np.array([[0, 1], [0.2, 0.9]])]
+        P = PersLandscapeApprox(0, 1, 20, dgms=dgms, compute=True)
+        Q = PersLandscapeApprox(grid=P.grid, dgms=dgms, compute=True)
+        assert Q.grid is P.grid and (P.start, P.stop, P.num_steps) == (0, 1, 20)
+        assert (P + 2*Q).grid is P.grid
+        np.testing.assert_array_equal(Q.values, P.values)
+
+    def test_unpickle_without_grid(self):
+        # the state of a landscape pickled before the grid was shared
+        values = np.ones((2, 20))
+        state = {'hom_deg': 0, 'dgms': [], 'start': 0, 'stop': 1,
+                 'values': values, 'num_steps': 20}
+        P = PersLandscapeApprox.__new__(PersLandscapeApprox)
+        P.__setstate__(state)
+        assert P.grid is Grid(0, 1, 20) and P.depth_limit is None
+        P += PersLandscapeApprox(0, 1, 20, values=values)
+        np.testing.assert_array_equal(P.values, 2*values)
+        Q = pickle.loads(pickle.dumps(P))
+        assert Q.grid is P.grid
+        np.testing.assert_array_equal(Q.values, P.values)
+
+    def test_snap_PL(self):
+        P = PersLandscapeApprox(0, 1, 11, values=np.random.default_rng(16)
+                                .normal(size=(3, 11)))
+        operator = _grid_operator(P.grid, Grid(0, 2, 21))
+        assert _grid_operator(P.grid, Grid(0, 2, 21)) is operator
+        assert not operator[2].flags.writeable
+        [Q] = snap_PL([P], start=0, stop=2, num_steps=21)
+        assert Q.grid is Grid(0, 2, 21)
+        np.testing.assert_allclose(
+            Q.values, [np.interp(Q.grid.coords, P.grid.coords, f)
+                       for f in P.values], rtol=0, atol=1e-12)
+
+
+class TestComputeLandscape():
+
+    def test_values(self):
+        dgms = [np.array([[2, 6], [4, 10]])]
+        P1 = PersLandscapeApprox(0, 10, 11, dgms=dgms, compute=True)
+        P2 = PersLandscapeApprox(0, 10, 6, dgms=dgms, compute=True)
+        P3 = PersLandscapeApprox(0, 10, 21, dgms=dgms, compute=True)
+        np.testing.assert_array_equal(P1.values,
+            np.array([[0., 0., 0., 1., 2., 1., 2., 3., 2., 1., 0.],
+                      [0., 0., 0., 0., 0., 1., 0., 0., 0., 0., 0.]]))
+        np.testing.assert_array_equal(P2.values,
+            np.array([[0., 0., 2., 2., 2., 0.]]))
+        np.testing.assert_array_equal(P3.values,
+            np.array([[0., 0., 0., 0., 0., 0.5, 1., 1.5, 2., 1.5, 1., 1.5, 2.,
+                       2.5, 3., 2.5, 2., 1.5, 1., 0.5, 0.],
+                      [0., 0., 0., 0., 0., 0., 0., 0., 0., 0.5, 1., 0.5, 0.,
+                       0., 0., 0., 0., 0., 0., 0., 0.]]))
+
+    def test_chunks(self, monkeypatch):
+        dgms = random_dgms(sizes=300, seed=0)
+        P = PersLandscapeApprox(num_steps=100, dgms=dgms, compute=True)
+        monkeypatch.setattr(PersistenceLandscapeGrid, '_CHUNK_SIZE', 1000)
+        Q = PersLandscapeApprox(num_steps=100, dgms=dgms, compute=True)
+        np.testing.assert_array_equal(P.values, Q.values)
+
+
+    def test_max_depth(self, monkeypatch):
+        dgms = random_dgms(sizes=300, seed=5)
+        P = PersLandscapeApprox(num_steps=100, dgms=dgms, compute=True)
+        Q = PersLandscapeApprox(num_steps=100, dgms=dgms, compute=True,
+                                max_depth=5)
+        np.testing.assert_array_equal(Q.values, P.values[:5])
+        monkeypatch.setattr(PersistenceLandscapeGrid, '_CHUNK_SIZE', 1000)
+        Q = PersLandscapeApprox(num_steps=100, dgms=dgms, compute=True,
+                                max_depth=5)
+        np.testing.assert_array_equal(Q.values, P.values[:5])
+
+
+    def test_common_birth(self):
+        rng = np.random.default_rng(7)
+        bd_pairs = np.column_stack([np.zeros(200), rng.uniform(0, 1, 200)])
+        P = PersLandscapeApprox(0, 1, 100, dgms=[bd_pairs], compute=True)
+        # a bar of length zero with another birth forces the general path
+        Q = PersLandscapeApprox(0, 1, 100, dgms=[np.vstack([bd_pairs,
+                                [0.5, 0.5]])], compute=True)
+        np.testing.assert_array_equal(P.values, Q.values)
+        R = PersLandscapeApprox(0, 1, 100, dgms=[bd_pairs], compute=True,
+                                max_depth=4)
+        np.testing.assert_array_equal(R.values, P.values[:4])
+
+
+    def test_repeated_bars(self, monkeypatch):
+        rng = np.random.default_rng(10)
+        bars = rng.uniform(0, 1, (20, 2))
+        bars = np.column_stack([bars.min(axis=1), bars.max(axis=1)])
+        bd_pairs = bars[rng.integers(0, 20, 500)]
+        P = PersLandscapeApprox(0, 1, 50, dgms=[bd_pairs], compute=True)
+        # the tents of all 500 bars, sorted in each column
+        grid = np.linspace(0, 1, 50)
+        ind = np.argmin(np.abs(grid[:, np.newaxis, np.newaxis] - bd_pairs),
+                        axis=0)
+        tents = np.maximum(np.minimum(np.arange(50) - ind[:, :1],
+                                      ind[:, 1:] - np.arange(50)), 0)
+        expected = -np.sort(-grid[1]*tents, axis=0)
+        np.testing.assert_array_equal(P.values, expected[:len(P.values)])
+        assert not expected[len(P.values):].any()
+        monkeypatch.setattr(PersistenceLandscapeGrid, '_CHUNK_SIZE', 200)
+        Q = PersLandscapeApprox(0, 1, 50, dgms=[bd_pairs], compute=True,
+                                max_depth=30)
+        np.testing.assert_array_equal(Q.values, P.values[:30])
+
+
+    def test_short_bars(self, monkeypatch):
+        # bars covering a few columns each, with repeats
+        rng = np.random.default_rng(11)
+        birth = rng.uniform(0, 1, 400)
+        bd_pairs = np.column_stack([birth, birth + rng.exponential(0.02, 400)])
+        bd_pairs = bd_pairs[rng.integers(0, 400, 600)]
+        grid = np.linspace(0, 1.2, 300)
+        ind = np.argmin(np.abs(grid[:, np.newaxis, np.newaxis] - bd_pairs),
+                        axis=0)
+        tents = np.maximum(np.minimum(np.arange(300) - ind[:, :1],
+                                      ind[:, 1:] - np.arange(300)), 0)
+        expected = -np.sort(-grid[1]*tents, axis=0)
+        expected = expected[:np.count_nonzero(expected.any(axis=1))]
+        # windows of a few columns
+        monkeypatch.setattr(PersistenceLandscapeGrid, '_CHUNK_SIZE', 400)
+        P = PersLandscapeApprox(0, 1.2, 300, dgms=[bd_pairs], compute=True)
+        np.testing.assert_array_equal(P.values, expected)
+        Q = PersLandscapeApprox(0, 1.2, 300, dgms=[bd_pairs], compute=True,
+                                max_depth=3)
+        np.testing.assert_array_equal(Q.values, expected[:3])
+
+
+class TestBatchApprox():
+
+    def test_matches_single_landscapes(self, monkeypatch):
+        rng = np.random.default_rng(1)
+        dgms_list = [random_dgms(sizes=n, rng=rng) for n in [5, 0, 40, 12, 1]]
+        dgms_list[1] = [np.array([[0., np.inf]])]
+        T = batch_approx(dgms_list, start=0, stop=2, num_steps=50)
+        assert T.shape[0] == 5 and T.shape[2] == 50
+        assert not T[1].any()
+        for i in [0, 2, 3, 4]:
+            P = PersLandscapeApprox(0, 2, 50, dgms=dgms_list[i], compute=True)
+            K = len(P.values)
+            np.testing.assert_array_equal(T[i, :K], P.values)
+            assert not T[i, K:].any()
+        monkeypatch.setattr(PersistenceLandscapeGrid, '_CHUNK_SIZE', 100)
+        np.testing.assert_array_equal(
+            batch_approx(dgms_list, start=0, stop=2, num_steps=50), T)
+        np.testing.assert_array_equal(
+            batch_approx(dgms_list, start=0, stop=2, num_steps=50,
+                         max_depth=3), T[:, :3])
+
+    def test_large_diagram(self, monkeypatch):
+        rng = np.random.default_rng(12)
+        birth = rng.uniform(0, 1, 3000)
+        dgms = [np.column_stack([birth, birth + rng.exponential(0.01, 3000)])]
+        P = PersLandscapeApprox(0, 1.1, 1000, dgms=dgms, compute=True)
+        # the bars of the diagram are split between windows of columns
+        monkeypatch.setattr(PersistenceLandscapeGrid, '_CHUNK_SIZE', 4000)
+        tracemalloc.start()
+        T = batch_approx([dgms], start=0, stop=1.1, num_steps=1000)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        np.testing.assert_array_equal(T[0], P.values)
+        # far below the heights of every bar in every column
+        assert peak < 8*3000*1000/10
+
+    def test_max_depth_memory(self, monkeypatch):
+        dgms = random_dgms(sizes=2000, seed=13)
+        monkeypatch.setattr(PersistenceLandscapeGrid, '_CHUNK_SIZE', 2**16)
+        T = batch_approx([dgms], start=0, stop=2, num_steps=2000)
+        tracemalloc.start()
+        S = batch_approx([dgms], start=0, stop=2, num_steps=2000, max_depth=3)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        np.testing.assert_array_equal(S, T[:, :3])
+        # the full landscape is never stored
+        assert peak < T.nbytes/10
+
+    def test_common_birth(self):
+        rng = np.random.default_rng(8)
+        dgms_list = [[np.column_stack([np.full(n, b), b + rng.uniform(0, 1, n)])]
+                     for n, b in zip([30, 0, 5, 12], [0, 0, 0.2, 0.5])]
+        T = batch_approx(dgms_list, start=0, stop=1.5, num_steps=60)
+        for i, dgms in enumerate(dgms_list):
+            P = PersLandscapeApprox(0, 1.5, 60, dgms=[np.vstack([dgms[0],
+                                    [0.7, 0.7]])], compute=True)
+            if P.values.dtype.kind == 'f':
+                np.testing.assert_array_equal(T[i, :len(P.values)], P.values)
+                assert not T[i, len(P.values):].any()
+        np.testing.assert_array_equal(
+            batch_approx(dgms_list, start=0, stop=1.5, num_steps=60,
+                         max_depth=2), T[:, :2])
+
+
+def random_landscapes(n, seed=0):
+    return [PersLandscapeApprox(0, 2, 30, dgms=dgms, compute=True)
+            for dgms in random_dgms(n, seed, sizes=(1, 15))]
+
+
+class TestInPlace():
+
+    def test_matches_eager(self):
+        Ps = random_landscapes(20)
+        total, eager = Ps[0].copy(), Ps[0]
+        for c, P in zip(np.linspace(-1, 2, 19), Ps[1:]):
+            total.axpy(c, P)
+            eager = eager + c*P
+        total += Ps[3]
+        total -= Ps[4]
+        total *= 3
+        total /= 2
+        eager = (eager + Ps[3] - Ps[4])*3/2
+        assert total.grid is eager.grid
+        np.testing.assert_allclose(total.values, eager.values, atol=1e-12)
+
+    def test_buffer_grows_geometrically(self):
+        P = PersLandscapeApprox(0, 1, 10, values=np.ones((1, 10)))
+        buffers = set()
+        for depth in range(2, 65):
+            P += PersLandscapeApprox(0, 1, 10, values=np.ones((depth, 10)))
+            buffers.add(id(P._buffer))
+            assert P.values.shape == (depth, 10)
+        assert len(buffers) <= 8
+        np.testing.assert_array_equal(P.values[:, 0], 64 - np.arange(64))
+
+    def test_copy_on_write(self):
+        values = np.ones((2, 10))
+        values.setflags(write=False)
+        P = PersLandscapeApprox(0, 1, 10, values=values)
+        Q = P
+        Q += P
+        assert Q is P and not P.values.base is values
+        np.testing.assert_array_equal(P.values, 2*np.ones((2, 10)))
+        np.testing.assert_array_equal(values, np.ones((2, 10)))
+
+    def test_accumulate_from_copy(self):
+        # the accumulation idiom of sphere_example_grid.py
+        Ps = random_landscapes(5)
+        before = [P.values.copy() for P in Ps]
+        total = Ps[0].copy()
+        for P in Ps[1:]:
+            total += P
+        for P, values in zip(Ps, before):
+            np.testing.assert_array_equal(P.values, values)
+        # without the copy, += updates the first landscape itself
+        alias = Ps[0]
+        alias += Ps[1]
+        assert alias is Ps[0]
+        assert not np.array_equal(Ps[0].values[:len(before[0])], before[0])
+
+    def test_errors(self):
+        P, = random_landscapes(1)
+        with pytest.raises(ValueError):
+            P += PersLandscapeApprox(0, 3, 30, values=np.ones((1, 30)))
+        with pytest.raises(TypeError):
+            P *= P
+        with pytest.raises(ValueError):
+            P /= 0
+
+
+class TestLandscapeArray():
+
+    def test_reductions(self):
+        Ps = random_landscapes(6)
+        A = np.stack(Ps)
+        assert isinstance(A, LandscapeArray) and len(A) == 6
+        depth = max(len(P.values) for P in Ps)
+        assert np.asarray(A).shape == (6, depth, 30)
+        coeffs = np.linspace(-1, 2, 6)
+        eager = coeffs[0]*Ps[0]
+        for c, P in zip(coeffs[1:], Ps[1:]):
+            eager = eager + c*P
+        for result in [np.dot(coeffs, A), lc_approx(Ps, coeffs)]:
+            assert isinstance(result, PersLandscapeApprox)
+            assert result.grid is Ps[0].grid
+            np.testing.assert_allclose(result.values, eager.values, atol=1e-12)
+        np.testing.assert_allclose(np.mean(A).values,
+                                   np.asarray(A).mean(axis=0))
+        np.testing.assert_allclose(np.sum(A).values, np.asarray(A).sum(axis=0))
+        np.testing.assert_allclose(np.var(A, ddof=1).values,
+                                   np.asarray(A).var(axis=0, ddof=1))
+        np.testing.assert_allclose(
+            np.average(A, weights=coeffs + 2).values,
+            np.average(np.asarray(A), axis=0, weights=coeffs + 2))
+        # other axes reduce the dense values
+        assert np.sum(A, axis=2).shape == (6, depth)
+
+    def test_arithmetic(self):
+        Ps = random_landscapes(4)
+        A = np.stack(Ps[:3])
+        for result, expected in [(A + Ps[3], [P + Ps[3] for P in Ps[:3]]),
+                                 (Ps[3] - A, [Ps[3] - P for P in Ps[:3]]),
+                                 (np.float64(2)*A/4, [P/2 for P in Ps[:3]]),
+                                 (-np.concatenate([A[:1], A[1:]]),
+                                  [-P for P in Ps[:3]])]:
+            assert isinstance(result, LandscapeArray) and len(result) == 3
+            for R, E in zip(result, expected):
+                np.testing.assert_allclose(
+                    R.values[:len(E.values)], E.values, atol=1e-12)
+        with pytest.raises(TypeError):
+            A*A
+        with pytest.raises(ValueError):
+            A + PersLandscapeApprox(0, 3, 30, values=np.ones((1, 30)))
+
+    def test_landscape_ufuncs(self):
+        P, Q = random_landscapes(2)
+        assert isinstance(np.float64(3)*P, PersLandscapeApprox)
+        np.testing.assert_allclose(np.add(P, Q).values, (P + Q).values)
+        total = P.copy()
+        assert np.subtract(total, Q, out=(total,)) is total
+        np.testing.assert_allclose(total.values, (P - Q).values)
+
+
+class TestRunningLandscapeMean():
+
+    def test_mean_and_variance(self):
+        rng = np.random.default_rng(2)
+        dgms_list = [random_dgms(sizes=n, rng=rng) for n in [3, 30, 1, 12]]
+        acc = RunningLandscapeMean(start=0, stop=2, num_steps=50)
+        acc.update_many(dgms_list)
+        T = batch_approx(dgms_list, start=0, stop=2, num_steps=50)
+        assert acc.n == 4
+        assert acc.mean().values == pytest.approx(T.mean(axis=0))
+        assert acc.variance(ddof=1).values == pytest.approx(
+            T.var(axis=0, ddof=1))
+
+    def test_snaps_landscapes(self):
+        P = PersLandscapeApprox(0, 4, 5, values=np.array([[0., 1., 2., 1., 0.]]))
+        acc = RunningLandscapeMean(start=0, stop=4, num_steps=9)
+        acc.update(P)
+        assert acc.mean().values == pytest.approx(
+            np.array([[0., .5, 1., 1.5, 2., 1.5, 1., .5, 0.]]))
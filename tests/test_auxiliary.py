@@ -0,0 +1,66 @@
+"""
+Unit tests for the auxiliary functions
+"""
+
+import numpy as np
+
+from auxiliary import (unique_bars, ndsnap_indices, ndsnap_regular,
+                       _interp_operator, _resample)
+
+
+class TestUniqueBars():
+
+    def test_counts(self):
+        bars, counts = unique_bars(np.array([[1, 5], [0, 2], [1, 5], [1, 3],
+                                             [1, 5], [0, 2]]))
+        np.testing.assert_array_equal(bars, [[0, 2], [1, 3], [1, 5]])
+        np.testing.assert_array_equal(counts, [2, 1, 3])
+
+    def test_empty(self):
+        bars, counts = unique_bars(np.empty((0, 2)))
+        assert bars.shape == (0, 2) and counts.shape == (0,)
+
+
+def argmin_indices(x, ax):
+    """ Index of the nearest grid point by comparing with all of them. """
+    return np.argmin(np.abs(ax[:, np.newaxis] - x), axis=0)
+
+
+class TestSnap():
+
+    def test_matches_argmin(self):
+        rng = np.random.default_rng(11)
+        grids = [np.linspace(-1, 2, 37), np.linspace(0, 1, 2),
+                 np.sort(rng.uniform(0, 1, 20)),
+                 np.sort(rng.choice(np.linspace(0, 1, 4), 15)),
+                 np.full(5, 0.5), np.array([3., 1., 2.])]
+        for ax in grids:
+            # random values, grid points and midpoints, where ties occur
+            x = np.concatenate([rng.uniform(-2, 3, 200), ax,
+                                (ax[1:] + ax[:-1])/2, [np.inf, -np.inf]])
+            points = np.column_stack([x, x[::-1]])
+            ind = ndsnap_indices(points, ax, ax)
+            np.testing.assert_array_equal(ind[:, 0], argmin_indices(x, ax))
+            np.testing.assert_array_equal(ind[:, 1],
+                                          argmin_indices(x[::-1], ax))
+            np.testing.assert_array_equal(ndsnap_regular(points, ax, ax),
+                                          ax[ind])
+
+    def test_empty(self):
+        ax = np.linspace(0, 1, 5)
+        assert ndsnap_indices(np.empty((0, 2)), ax, ax).shape == (0, 2)
+        assert ndsnap_regular(np.empty((0, 2)), ax, ax).shape == (0, 2)
+
+
+class TestInterpOperator():
+
+    def test_matches_interp(self):
+        rng = np.random.default_rng(12)
+        sources = [np.linspace(0.2, 0.7, 30), np.sort(rng.uniform(0, 1, 20)),
+                   np.array([0.5]), np.linspace(0, 1, 2)]
+        for xp in sources:
+            x = np.concatenate([rng.uniform(-0.5, 1.5, 100), xp])
+            fp = rng.normal(size=(3, len(xp)))
+            expected = [np.interp(x, xp, f) for f in fp]
+            np.testing.assert_allclose(_resample(fp, _interp_operator(xp, x)),
+                                       expected, rtol=0, atol=1e-12)
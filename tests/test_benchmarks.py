@@ -0,0 +1,33 @@
+"""
+Unit tests for the benchmark runner
+"""
+
+import json
+
+import benchmarks
+
+
+class TestBenchmarks():
+
+    def test_run_and_compare(self, tmp_path):
+        result = benchmarks.run(list(benchmarks.BENCHMARKS),
+                                list(benchmarks.FAMILIES), [100],
+                                repeat=1, verbose=False)
+        names = {(r['benchmark'], r['family']) for r in result['results']}
+        assert len(names) == len(benchmarks.BENCHMARKS)*len(benchmarks.FAMILIES)
+        assert all(r['seconds'] > 0 for r in result['results'])
+        baseline = json.loads(json.dumps(result))
+        assert benchmarks.compare(baseline, result) == []
+        for r in baseline['results']:
+            r['seconds'] /= 10
+        slow = benchmarks.compare(baseline, result, min_seconds=0)
+        assert len(slow) == len(result['results'])
+
+    def test_main_writes_json(self, tmp_path):
+        output = tmp_path / 'run.json'
+        assert benchmarks.main(['--benchmarks', 'grid_compute', '--families',
+                                'h0', '--sizes', '50', '--output',
+                                str(output)]) == 0
+        result = json.loads(output.read_text())
+        assert result['format_version'] == benchmarks.FORMAT_VERSION
+        assert [r['benchmark'] for r in result['results']] == ['grid_compute']
@@ -0,0 +1,112 @@
+"""
+Unit tests for the landscape cache
+"""
+
+import os
+import pytest
+import numpy as np
+
+from landscape_cache import LandscapeCache, landscape_key, set_cache
+from pl_transformer import PLA, PLE
+from PersistenceLandscapeExact import PersLandscapeExact
+from PersistenceLandscapeGrid import PersLandscapeApprox
+from helpers import random_dgms
+
+
+@pytest.fixture
+def cache():
+    cache = LandscapeCache()
+    set_cache(cache)
+    yield cache
+    set_cache(None)
+
+
+class TestLandscapeCache():
+
+    def test_key(self):
+        A = np.array([[0, 1], [0.5, 2]])
+        assert landscape_key(A, 'approx', start=0, stop=2) == landscape_key(
+            A.astype(float), 'approx', start=0.0, stop=2.0)
+        assert landscape_key(A, 'approx', start=0, stop=2) != landscape_key(
+            A, 'approx', start=0, stop=3)
+        assert landscape_key(A, 'approx') != landscape_key(A, 'exact')
+        assert landscape_key(A, 'approx') != landscape_key(A[::-1], 'approx')
+
+    def test_lru_budget(self):
+        cache = LandscapeCache(max_bytes=3*800)
+        for key in 'abc':
+            cache.put(key, (np.zeros(100),))
+        assert cache.get('a') is not None
+        cache.put('d', (np.zeros(100),))
+        assert cache.get('b') is None
+        assert len(cache) == 3 and cache.nbytes == 2400
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+        with pytest.raises(ValueError):
+            cache.get('a')[0][0] = 1
+
+    def test_disk_store(self, tmp_path):
+        cache = LandscapeCache(directory=tmp_path)
+        cache.put('a', (np.arange(5.), np.arange(3)))
+        other = LandscapeCache(directory=tmp_path)
+        a, b = other.get('a')
+        np.testing.assert_array_equal(a, np.arange(5.))
+        np.testing.assert_array_equal(b, np.arange(3))
+        assert other.disk_hits == 1
+        small = LandscapeCache(directory=tmp_path, max_disk_bytes=1000)
+        for key in 'bcd':
+            small.put(key, (np.zeros(50),))
+        assert 0 < len(os.listdir(tmp_path)) < 4
+
+    def test_disk_total(self, tmp_path, monkeypatch):
+        cache = LandscapeCache(directory=tmp_path, max_disk_bytes=20000)
+        scans = []
+        scan = cache._disk_entries
+        monkeypatch.setattr(cache, '_disk_entries',
+                            lambda: scans.append(1) or scan())
+        for i in range(100):
+            cache.put(str(i), (np.zeros(50),))
+            sizes = [os.path.getsize(os.path.join(root, name))
+                     for root, _, names in os.walk(tmp_path) for name in names]
+            assert cache.disk_bytes == sum(sizes) <= 20000
+        # the store is only scanned when the running total is over budget
+        assert 0 < len(scans) < 100/5
+        assert LandscapeCache(directory=tmp_path).disk_bytes == cache.disk_bytes
+
+
+class TestCachedLandscapes():
+
+    def test_approx(self, cache):
+        dgms = random_dgms(1)[0]
+        P = PersLandscapeApprox(0, 2, 40, dgms=dgms, compute=True)
+        Q = PersLandscapeApprox(0, 2, 40, dgms=dgms, compute=True)
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+        np.testing.assert_array_equal(P.values, Q.values)
+        R = PersLandscapeApprox(0, 2, 40, dgms=dgms, compute=True, max_depth=1)
+        assert cache.misses == 2 and len(R.values) == 1
+
+    def test_exact(self, cache):
+        dgms = random_dgms(1)[0]
+        P = PersLandscapeExact(dgms=dgms)
+        Q = PersLandscapeExact(dgms=dgms)
+        assert cache.hits == 1
+        assert P.critical_pairs == Q.critical_pairs
+
+    def test_transformers_share_entries(self, cache):
+        X = random_dgms(5)
+        set_cache(None)
+        expected = PLA(start=0, stop=2, num_steps=30).fit_transform(X)
+        pairs = PLE().fit_transform(X)
+        set_cache(cache)
+        features = PLA(start=0, stop=2, num_steps=30).fit_transform(X[:3])
+        np.testing.assert_array_equal(features,
+                                      expected[:3, :features.shape[1]])
+        np.testing.assert_array_equal(
+            PLA(start=0, stop=2, num_steps=30).fit_transform(X), expected)
+        assert cache.hits == 3 and cache.misses == 5
+        P = PersLandscapeApprox(0, 2, 30, dgms=X[4], compute=True)
+        assert cache.hits == 4
+        np.testing.assert_array_equal(P.values,
+                                      expected[4, :P.values.size].reshape(-1, 30))
+        assert PLE().fit_transform(X) == pairs
+        assert PLE(n_jobs=2).fit_transform(X) == pairs
+        assert cache.hits == 9
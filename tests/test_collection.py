@@ -0,0 +1,89 @@
+"""
+Unit tests for LandscapeCollection
+"""
+
+import pytest
+import numpy as np
+
+import PersistenceLandscapeGrid
+from landscape_collection import LandscapeCollection
+from landscape_distances import pairwise_distances
+from PersistenceLandscapeGrid import PersLandscapeApprox, batch_approx
+from helpers import random_dgms
+
+
+@pytest.fixture
+def collection(tmp_path, monkeypatch):
+    # small blocks, so every computation uses several of them
+    monkeypatch.setattr(PersistenceLandscapeGrid, '_CHUNK_SIZE', 3*4*40)
+    dgms_list = random_dgms(25, sizes=(0, 20))
+    C = LandscapeCollection(tmp_path / 'c', start=0, stop=2, num_steps=40,
+                            depth=4)
+    C.append_diagrams(iter(dgms_list[:10]))
+    C.append_diagrams(dgms_list[10:])
+    return C, batch_approx(dgms_list, start=0, stop=2, num_steps=40,
+                           max_depth=4)
+
+
+class TestLandscapeCollection():
+
+    def test_append_and_open(self, collection, tmp_path):
+        C, T = collection
+        assert len(C) == 25
+        np.testing.assert_array_equal(C.values, T)
+        D = LandscapeCollection.open(tmp_path / 'c')
+        assert (D.start, D.stop, D.num_steps, D.depth) == (0, 2, 40, 4)
+        np.testing.assert_array_equal(D[3].values, T[3])
+        D.append([PersLandscapeApprox(0, 2, 20, values=np.ones((2, 20)))])
+        assert len(D) == 26
+        np.testing.assert_array_equal(D.values[25], np.pad(np.ones((2, 40)),
+                                                           ((0, 2), (0, 0))))
+        # like append_diagrams, append keeps the first depth functions
+        D.append([PersLandscapeApprox(0, 2, 40, values=np.ones((5, 40)))])
+        np.testing.assert_array_equal(D.values[26], np.ones((4, 40)))
+        with pytest.raises(FileExistsError):
+            LandscapeCollection(tmp_path / 'c', start=0, stop=2)
+
+    def test_statistics(self, collection):
+        C, T = collection
+        assert C.mean().values == pytest.approx(T.mean(axis=0))
+        assert C.variance(ddof=1).values == pytest.approx(
+            T.var(axis=0, ddof=1))
+        coeffs = np.linspace(-1, 1, 25)
+        assert C.linear_combination(coeffs).values == pytest.approx(
+            np.tensordot(coeffs, T, axes=1))
+
+    def test_empty_result(self, collection, tmp_path):
+        C, T = collection
+        E = LandscapeCollection(tmp_path / 'e', start=0, stop=2, num_steps=40)
+        E.append_diagrams([[np.empty((0, 2))], [np.array([[0.5, 0.51]])]])
+        for P in [C.linear_combination(np.zeros(25)), E.mean()]:
+            assert P.values.dtype.kind == 'U'
+            Q = P.copy()
+            Q += C.mean()
+            np.testing.assert_array_equal(Q.values, C.mean().values)
+            P.values_to_pairs()
+
+    def test_numpy_functions(self, collection):
+        C, T = collection
+        coeffs = np.linspace(-1, 1, 25)
+        assert np.mean(C).values == pytest.approx(C.mean().values)
+        assert np.var(C, ddof=1).values == pytest.approx(
+            C.variance(ddof=1).values)
+        assert np.dot(coeffs, C).values == pytest.approx(
+            C.linear_combination(coeffs).values)
+        assert np.sum(C, axis=1) == pytest.approx(T.sum(axis=1))
+
+    def test_distances(self, collection, tmp_path):
+        C, T = collection
+        landscapes = [PersLandscapeApprox(0, 2, 40, values=v) for v in T]
+        for p in [1, 2, np.inf]:
+            expected = pairwise_distances(landscapes, p=p)
+            assert C.pairwise_distances(p) == pytest.approx(expected)
+            assert C.distances_to(landscapes[7], p) == pytest.approx(
+                expected[:, 7])
+        D = C.pairwise_distances(out=tmp_path / 'D.npy')
+        assert np.load(tmp_path / 'D.npy') == pytest.approx(np.asarray(D))
+        deep = PersLandscapeApprox(0, 2, 40, values=np.ones((6, 40)))
+        assert C.distances_to(deep, 1)[0] == pytest.approx(
+            (landscapes[0] - deep).p_norm(1))
@@ -0,0 +1,81 @@
+"""
+Unit tests for pairwise distances and kernels of landscapes
+"""
+
+import pytest
+import numpy as np
+
+import PersistenceLandscapeGrid
+from PersistenceLandscapeExact import PersLandscapeExact
+from PersistenceLandscapeGrid import PersLandscapeApprox
+from landscape_distances import pairwise_distances, landscape_kernel_matrix
+from helpers import random_dgms
+
+
+class TestPairwiseDistances():
+
+    @pytest.mark.parametrize('p', [1, 2, 3.5, np.inf])
+    def test_approx(self, p, monkeypatch):
+        rng = np.random.default_rng(0)
+        landscapes = [PersLandscapeApprox(0, 1.5, 40, compute=True, dgms=
+                                          random_dgms(sizes=n, length=0.5, rng=rng))
+                      for n in [8, 1, 20, 5]]
+        D = pairwise_distances(landscapes, p=p)
+        for i, L in enumerate(landscapes):
+            for j, M in enumerate(landscapes):
+                expected = (L - M).sup_norm() if p == np.inf else (L - M).p_norm(p)
+                assert D[i, j] == pytest.approx(expected, abs=1e-7)
+        monkeypatch.setattr(PersistenceLandscapeGrid, '_CHUNK_SIZE', 200)
+        assert pairwise_distances(landscapes, p=p) == pytest.approx(D)
+
+    def test_nearly_equal(self):
+        # the squared norms are ~1e6 and the squared distances ~1e-16, far
+        # below the rounding error of expanding |x - y|^2
+        rng = np.random.default_rng(4)
+        values = 1e3 + rng.random((2, 100))
+        landscapes = [PersLandscapeApprox(0, 1, 100, values=v)
+                      for v in [values, values + 1e-9, values[::-1]]]
+        D = pairwise_distances(landscapes, p=2)
+        assert D[0, 1] == D[1, 0] == pytest.approx(
+            (landscapes[0] - landscapes[1]).p_norm(2), rel=1e-6)
+        assert D[0, 2] == pytest.approx(
+            (landscapes[0] - landscapes[2]).p_norm(2), rel=1e-9)
+        assert np.all(np.diag(D) == 0)
+
+    @pytest.mark.parametrize('n_jobs', [None, 2])
+    def test_exact(self, n_jobs):
+        rng = np.random.default_rng(1)
+        landscapes = [PersLandscapeExact(
+                          dgms=random_dgms(sizes=n, length=0.5, rng=rng))
+                      for n in [6, 12, 3]]
+        D = pairwise_distances(landscapes, p=2, n_jobs=n_jobs)
+        assert D[0, 1] == D[1, 0] == pytest.approx(
+            (landscapes[0] - landscapes[1]).p_norm(2))
+        assert np.all(np.diag(D) == 0)
+
+
+class TestKernelMatrix():
+
+    def test_approx(self):
+        rng = np.random.default_rng(2)
+        landscapes = [PersLandscapeApprox(0, 1.5, 40, compute=True, dgms=
+                                          random_dgms(sizes=n, length=0.5, rng=rng))
+                      for n in [8, 1, 20]]
+        K = landscape_kernel_matrix(landscapes)
+        L, M = landscapes[0], landscapes[2]
+        assert K[0, 2] == pytest.approx(np.sum(
+            PersistenceLandscapeGrid.union_vals(L.values, M.values)[0]
+            * PersistenceLandscapeGrid.union_vals(L.values, M.values)[1]))
+
+    @pytest.mark.parametrize('n_jobs', [None, 2])
+    def test_exact(self, n_jobs):
+        rng = np.random.default_rng(3)
+        landscapes = [PersLandscapeExact(
+                          dgms=random_dgms(sizes=n, length=0.5, rng=rng))
+                      for n in [6, 12, 3]]
+        K = landscape_kernel_matrix(landscapes, n_jobs=n_jobs)
+        for i, L in enumerate(landscapes):
+            assert K[i, i] == pytest.approx(L.p_norm(2)**2)
+        D = pairwise_distances(landscapes, p=2)
+        assert K[0, 0] + K[1, 1] - 2*K[0, 1] == pytest.approx(D[0, 1]**2)
+        assert K == pytest.approx(K.T)
@@ -0,0 +1,201 @@
+"""
+Unit tests for PersLandscapeExact
+"""
+
+import pickle
+import pytest
+import numpy as np
+
+from PersistenceLandscapeExact import PersLandscapeExact, lc_exact, average_exact
+from auxiliary import linear_combination, union_crit_pairs
+from helpers import random_dgms
+
+
+def brute_force_landscape(bd_pairs, xs):
+    """ Evaluate every landscape function on `xs` by sorting the tents. """
+    tents = np.maximum(0, np.minimum(xs - bd_pairs[:, :1], bd_pairs[:, 1:] - xs))
+    return -np.sort(-tents, axis=0)
+
+
+def evaluate(critical_pairs, xs):
+    """ Evaluate critical pairs on `xs` by linear interpolation. """
+    return np.array([np.interp(xs, *zip(*depth), left=0, right=0)
+                     for depth in critical_pairs])
+
+
+class TestComputeLandscape():
+
+    def test_critical_pairs(self):
+        # example from Peter & Pavel's paper
+        P = PersLandscapeExact(
+            dgms=[np.array([[1.0, 5.0], [2.0, 8.0], [3.0, 4.0], [5.0, 9.0],
+                            [6.0, 7.0]])],
+            hom_deg=0)
+        assert P.critical_pairs == [[[1.0, 0], [3.0, 2.0], [3.5, 1.5],
+        [5.0, 3.0], [6.5, 1.5], [7.0, 2.0], [9.0, 0]],
+        [[2.0, 0], [3.5, 1.5], [5.0, 0], [6.5, 1.5], [8.0, 0]],
+        [[3.0, 0], [3.5, 0.5], [4.0, 0], [6.0, 0], [6.5, 0.5], [7.0, 0]]]
+
+    def test_duplicate_bars(self):
+        Q = PersLandscapeExact(dgms=[np.array([[1, 5], [1, 5], [3, 6]])])
+        assert Q.critical_pairs == [[[1, 0], [3.0, 2.0], [4.0, 1.0],
+        [4.5, 1.5], [6, 0]], [[1, 0], [3.0, 2.0], [4.0, 1.0], [4.5, 1.5],
+        [6, 0]], [[3, 0], [4.0, 1.0], [5, 0]]]
+
+    def test_infinite_bar_is_dropped(self):
+        P = PersLandscapeExact(dgms=[np.array([[0, 2], [1, 3], [0, np.inf]])])
+        assert P.critical_pairs == [[[0, 0], [1.0, 1.0], [1.5, 0.5],
+        [2.0, 1.0], [3, 0]], [[1, 0], [1.5, 0.5], [2, 0]]]
+
+    def test_empty_diagram(self):
+        P = PersLandscapeExact(dgms=[np.empty((0, 2))])
+        assert P.critical_pairs == []
+        assert P.max_depth == 0
+
+    def test_matches_brute_force(self):
+        bd_pairs, = random_dgms(sizes=200, seed=42, length=0.3)
+        P = PersLandscapeExact(dgms=[bd_pairs])
+        xs = np.linspace(0, 1.3, 5001)
+        expected = brute_force_landscape(bd_pairs, xs)
+        assert P.max_depth == np.count_nonzero(expected.any(axis=1))
+        assert evaluate(P.critical_pairs, xs) == pytest.approx(
+            expected[:P.max_depth])
+
+
+    def test_max_depth(self):
+        dgms = random_dgms(sizes=100, seed=6, length=0.5)
+        P = PersLandscapeExact(dgms=dgms)
+        Q = PersLandscapeExact(dgms=dgms, max_depth=3)
+        assert Q.max_depth == 3
+        assert Q.critical_pairs == P.critical_pairs[:3]
+        R = PersLandscapeExact(dgms=dgms, compute=False)
+        assert R.compute_landscape_by_depth(4) == P.critical_pairs[4]
+        assert R.offsets is None
+        D = PersLandscapeExact(dgms=[np.array([[1, 5], [1, 5], [1, 5]])],
+                               max_depth=2)
+        assert D.max_depth == 2
+
+
+    def test_common_birth(self):
+        P = PersLandscapeExact(dgms=[np.array([[0, 4], [0, 2], [0, 2], [0, 1]])])
+        assert P.critical_pairs == [[[0, 0], [2, 2], [4, 0]],
+                                    [[0, 0], [1, 1], [2, 0]],
+                                    [[0, 0], [1, 1], [2, 0]],
+                                    [[0, 0], [0.5, 0.5], [1, 0]]]
+        rng = np.random.default_rng(9)
+        bd_pairs = np.column_stack([np.zeros(50), rng.uniform(0, 1, 50)])
+        P = PersLandscapeExact(dgms=[bd_pairs])
+        xs = np.linspace(0, 1, 1001)
+        assert evaluate(P.critical_pairs, xs) == pytest.approx(
+            brute_force_landscape(bd_pairs, xs))
+        Q = PersLandscapeExact(dgms=[bd_pairs], max_depth=3)
+        assert Q.critical_pairs == P.critical_pairs[:3]
+
+
+class TestCompressedLayout():
+
+    def test_arrays(self):
+        P = PersLandscapeExact(critical_pairs=[[[0, 0], [1, 1], [2, 0]],
+                                               [[0.5, 0], [1, 0.5], [1.5, 0]]])
+        np.testing.assert_array_equal(P.xs, [0, 1, 2, 0.5, 1, 1.5])
+        np.testing.assert_array_equal(P.ys, [0, 1, 0, 0, 0.5, 0])
+        np.testing.assert_array_equal(P.offsets, [0, 3, 6])
+        assert P.max_depth == 2
+        assert P.compute_landscape_by_depth(1) == [[0.5, 0], [1, 0.5], [1.5, 0]]
+
+    def test_arithmetic(self):
+        P = PersLandscapeExact(critical_pairs=[[[0, 0], [1, 1], [2, 0]]])
+        assert (-P).critical_pairs == [[[0, 0], [1, -1], [2, 0]]]
+        assert (3*P).critical_pairs == [[[0, 0], [1, 3], [2, 0]]]
+        assert (P/2).sup_norm() == 0.5
+
+    def test_unpickle_nested_pairs(self):
+        # the state of a landscape pickled before the compressed layout
+        pairs = [[[0, 0], [1, 1], [2, 0]], [[0.5, 0], [1, 0.5], [1.5, 0]]]
+        state = {'hom_deg': 0, 'critical_pairs': pairs, 'dgms': [],
+                 'max_depth': 2}
+        P = PersLandscapeExact.__new__(PersLandscapeExact)
+        P.__setstate__(state)
+        assert 'max_depth' not in vars(P) and P.depth_limit is None
+        assert P.max_depth == 2 and P.critical_pairs == pairs
+        np.testing.assert_array_equal(P.offsets, [0, 3, 6])
+        Q = pickle.loads(pickle.dumps(2*P))
+        assert Q.critical_pairs == (2*P).critical_pairs
+
+
+class TestNorms():
+
+    def test_p_norm(self):
+        P = PersLandscapeExact(critical_pairs=[[[0, 0], [1, 1], [2, 1], [3, 1],
+                                                [4, 0]]])
+        assert P.p_norm(p=2) == pytest.approx(np.sqrt(2 + 2/3))
+        assert P.p_norm(p=5) == pytest.approx((2 + 1/3)**(1/5))
+        assert (-P).p_norm(p=2) == pytest.approx(np.sqrt(2 + 2/3))
+        assert P.p_norm(p=np.inf) == P.sup_norm() == 1
+
+    def test_segment_crossing_axis(self):
+        P = PersLandscapeExact(critical_pairs=[[[0, -1], [2, 1]]])
+        assert P.p_norm(p=1) == pytest.approx(1)
+        assert P.p_norm(p=2) == pytest.approx(np.sqrt(2/3))
+        assert P.p_norm(p=1.5) == pytest.approx((2/2.5)**(1/1.5))
+
+    def test_nearly_horizontal_segment(self):
+        P = PersLandscapeExact(critical_pairs=[[[0, 0], [1, 0.3],
+                                                [2, 0.3 + 1e-16], [3, 0]]])
+        assert P.p_norm(p=2) == pytest.approx(np.sqrt(0.09*(1 + 2/3)))
+
+    def test_matches_quadrature(self):
+        bd_pairs, = random_dgms(sizes=50, seed=3, length=0.5)
+        P = PersLandscapeExact(dgms=[bd_pairs])
+        xs = np.linspace(0, 1.5, 300001)
+        values = brute_force_landscape(bd_pairs, xs)
+        # trapezoid rule on the squared values
+        squares = values**2
+        expected = (np.sum(squares[:, 1:] + squares[:, :-1])/2
+                    * (xs[1] - xs[0]))**0.5
+        assert P.p_norm(p=2) == pytest.approx(expected, rel=1e-6)
+
+    def test_empty(self):
+        P = PersLandscapeExact(dgms=[np.empty((0, 2))])
+        assert P.p_norm(p=2) == 0
+        assert P.sup_norm() == 0
+
+
+class TestLinearCombination():
+
+    def test_sum(self):
+        P = PersLandscapeExact(critical_pairs=[[[0, 0], [1, 1], [2, 0]],
+                                               [[0.5, 0], [1, 0.5], [1.5, 0]]])
+        Q = PersLandscapeExact(critical_pairs=[[[1, 0], [2, 1], [3, 0]]])
+        assert (P + Q).critical_pairs == [[[0, 0], [1, 1], [2, 1], [3, 0]],
+                                          [[0.5, 0], [1, 0.5], [1.5, 0]]]
+
+    def test_matches_pairwise_sums(self):
+        rng = np.random.default_rng(4)
+        landscapes = []
+        for n in [10, 3, 25, 0, 7]:
+            landscapes.append(PersLandscapeExact(
+                dgms=random_dgms(sizes=n, length=0.5, rng=rng)))
+        coeffs = rng.normal(size=len(landscapes))
+        L = lc_exact(landscapes, coeffs)
+        xs = np.linspace(-0.1, 1.6, 2001)
+        expected = np.zeros((L.max_depth, len(xs)))
+        for c, P in zip(coeffs, landscapes):
+            if P.max_depth:
+                expected[:P.max_depth] += c*evaluate(P.critical_pairs, xs)
+        assert L.max_depth == max(P.max_depth for P in landscapes)
+        assert evaluate(L.critical_pairs, xs) == pytest.approx(expected)
+        M = landscapes[0] + landscapes[2]
+        assert np.concatenate(union_crit_pairs(landscapes[0], landscapes[2])
+                              ) == pytest.approx(np.column_stack([M.xs, M.ys]))
+
+    def test_average(self):
+        P = PersLandscapeExact(critical_pairs=[[[0, 0], [1, 1], [2, 0]]])
+        Q = PersLandscapeExact(critical_pairs=[[[0, 0], [1, 3], [2, 0]]])
+        assert average_exact([P, Q]).critical_pairs == [[[0, 0], [1, 2], [2, 0]]]
+        assert linear_combination([P, Q], [1, -1]).critical_pairs == [
+            [[0, 0], [1, -2], [2, 0]]]
+
+    def test_empty(self):
+        P = PersLandscapeExact(dgms=[np.empty((0, 2))])
+        assert lc_exact([P, P], [1, 1]).max_depth == 0
@@ -0,0 +1,83 @@
+"""
+Unit tests for lazy linear combinations of landscapes
+"""
+
+import pytest
+import numpy as np
+
+import PersistenceLandscapeGrid
+from landscape_expr import LandscapeExpr, lazy, lazy_arithmetic
+from PersistenceLandscapeExact import PersLandscapeExact
+from PersistenceLandscapeGrid import PersLandscapeApprox
+from helpers import random_dgms
+
+
+def approx(dgms_list, num_steps=40):
+    return [PersLandscapeApprox(0, 2, num_steps, dgms=dgms, compute=True)
+            for dgms in dgms_list]
+
+
+class TestLandscapeExpr():
+
+    def test_matches_eager_approx(self, monkeypatch):
+        # blocks of a few columns
+        monkeypatch.setattr(PersistenceLandscapeGrid, '_CHUNK_SIZE', 50)
+        A, B, C = approx(random_dgms(3))
+        eager = (A/4. - B) + 3*C
+        expr = (lazy(A)/4. - B) + 3*C
+        assert isinstance(expr, LandscapeExpr) and len(expr.terms) == 3
+        result = expr.evaluate()
+        assert result.grid is A.grid
+        np.testing.assert_allclose(result.values, eager.values, atol=1e-12)
+        assert expr.sup_norm() == pytest.approx(eager.sup_norm())
+        for p in [1, 2, 3.5, np.inf]:
+            assert expr.p_norm(p) == pytest.approx(eager.p_norm(p))
+
+    def test_matches_eager_exact(self):
+        A, B = [PersLandscapeExact(dgms=dgms) for dgms in random_dgms(2, 1)]
+        expr = 2*lazy(A) - B/3
+        eager = 2*A - B/3
+        assert expr.sup_norm() == pytest.approx(eager.sup_norm())
+        assert expr.p_norm(2) == pytest.approx(eager.p_norm(2))
+
+    def test_lazy_arithmetic(self):
+        A, B = approx(random_dgms(2, 2))
+        with lazy_arithmetic():
+            expr = (A/100.) - (B/100.)
+            assert isinstance(-A, LandscapeExpr)
+        assert isinstance(expr, LandscapeExpr)
+        assert isinstance(A + B, PersLandscapeApprox)
+        # an expression on either side of a landscape keeps it lazy
+        assert isinstance(A + lazy(B), LandscapeExpr)
+        assert isinstance(A - lazy(B), LandscapeExpr)
+        np.testing.assert_allclose(expr.values, ((A - B)/100.).values,
+                                   atol=1e-12)
+
+    def test_same_landscape_merged(self):
+        A, = approx(random_dgms(1, 3))
+        expr = lazy(A) - A
+        assert len(expr.terms) == 1 and expr.sup_norm() == 0
+
+    def test_empty_landscape(self):
+        A, = approx(random_dgms(1, 4))
+        E = PersLandscapeApprox(0, 2, 40, dgms=[np.array([[0.5, 0.51]])],
+                                compute=True)
+        np.testing.assert_array_equal((lazy(A) + E).values, A.values)
+        assert (lazy(E)*2).evaluate().values.dtype.kind == 'U'
+
+    def test_errors(self):
+        A, = approx(random_dgms(1))
+        B = PersLandscapeApprox(0, 3, 40, dgms=random_dgms(1)[0], compute=True)
+        with pytest.raises(ValueError, match="Stop values"):
+            lazy(A) + B
+        H1 = PersLandscapeApprox(0, 2, 40, dgms=[np.empty((0, 2)),
+                                                 np.array([[0, 1.]])],
+                                 hom_deg=1, compute=True)
+        with pytest.raises(ValueError, match="homological degree"):
+            lazy(A) + H1
+        with pytest.raises(TypeError):
+            lazy(A) + PersLandscapeExact(dgms=random_dgms(1)[0])
+        with pytest.raises(TypeError):
+            lazy(A)*A
+        with pytest.raises(ValueError):
+            lazy(A)/0
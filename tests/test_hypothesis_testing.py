@@ -0,0 +1,38 @@
+"""
+Unit tests for the landscape permutation test
+"""
+
+import pytest
+import numpy as np
+
+from hypothesis_testing import permutation_test
+from PersistenceLandscapeGrid import PersLandscapeApprox, average_approx
+from helpers import random_dgms
+
+
+def random_landscapes(num, scale, seed):
+    return [PersLandscapeApprox(0, 2, 100, dgms=dgms, compute=True)
+            for dgms in random_dgms(num, seed, sizes=20, length=scale)]
+
+
+class TestPermutationTest():
+
+    def test_separated_groups(self):
+        A = random_landscapes(20, 0.3, seed=0)
+        B = random_landscapes(20, 0.9, seed=1)
+        p_value, null = permutation_test(A, B, n_perms=200, seed=0)
+        assert null.shape == (200,)
+        assert p_value == pytest.approx(1/201)
+        diff = average_approx(A) - average_approx(B)
+        assert null.max() < diff.sup_norm()
+
+    def test_seed_and_n_jobs(self):
+        A = random_landscapes(8, 0.5, seed=2)
+        B = random_landscapes(8, 0.5, seed=3)
+        p_value, null = permutation_test(A, B, p=2, n_perms=300, seed=5,
+                                         batch_size=64)
+        p_value2, null2 = permutation_test(A, B, p=2, n_perms=300, seed=5,
+                                           batch_size=64, n_jobs=2)
+        assert p_value == p_value2
+        np.testing.assert_array_equal(null, null2)
+        assert 0 < p_value <= 1
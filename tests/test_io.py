@@ -0,0 +1,74 @@
+"""
+Unit tests for saving and loading landscapes
+"""
+
+import pytest
+import numpy as np
+
+from landscape_io import save, load, save_collection, load_collection
+from PersistenceLandscapeExact import PersLandscapeExact
+from PersistenceLandscapeGrid import PersLandscapeApprox
+from helpers import random_dgms
+
+
+class TestSaveLoad():
+
+    def test_approx(self, tmp_path):
+        P = PersLandscapeApprox(0, 1.5, 40, compute=True,
+                                dgms=random_dgms(sizes=20, seed=0, length=0.5))
+        save(tmp_path / 'P.npz', P)
+        Q = load(tmp_path / 'P.npz')
+        assert isinstance(Q, PersLandscapeApprox)
+        assert (Q.start, Q.stop, Q.num_steps, Q.hom_deg) == (0, 1.5, 40, 0)
+        np.testing.assert_array_equal(Q.values, P.values)
+
+    def test_exact(self, tmp_path):
+        P = PersLandscapeExact(dgms=random_dgms(sizes=20, seed=1, length=0.5))
+        save(tmp_path / 'P.npz', P)
+        Q = load(tmp_path / 'P.npz')
+        assert Q.critical_pairs == P.critical_pairs
+        E = PersLandscapeExact(dgms=[np.empty((0, 2))])
+        save(tmp_path / 'E.npz', E)
+        assert load(tmp_path / 'E.npz').max_depth == 0
+
+    def test_newer_version(self, tmp_path):
+        np.savez(tmp_path / 'P.npz', format_version=99, kind='exact')
+        with pytest.raises(ValueError):
+            load(tmp_path / 'P.npz')
+
+
+class TestCollection():
+
+    def test_approx_memory_mapped(self, tmp_path):
+        landscapes = [PersLandscapeApprox(
+                          0, 1.5, 30 + i, compute=True,
+                          dgms=random_dgms(sizes=n, seed=i, length=0.5))
+                      for i, n in enumerate([5, 0, 12])]
+        save_collection(tmp_path / 'c', landscapes)
+        loaded = load_collection(tmp_path / 'c')
+        assert len(loaded) == 3
+        assert isinstance(loaded[0].values.base, np.memmap)
+        for P, Q in zip(landscapes, loaded):
+            assert (Q.start, Q.stop, Q.num_steps) == (P.start, P.stop,
+                                                      P.num_steps)
+            np.testing.assert_array_equal(Q.values, P.values)
+        assert (loaded[0] + loaded[0]).sup_norm() == 2*landscapes[0].sup_norm()
+
+    def test_exact(self, tmp_path):
+        landscapes = [PersLandscapeExact(
+                          dgms=random_dgms(sizes=n, seed=i, length=0.5), hom_deg=0)
+                      for i, n in enumerate([7, 0, 15])]
+        save_collection(tmp_path / 'c', landscapes)
+        for mmap_mode in ['r', None]:
+            loaded = load_collection(tmp_path / 'c', mmap_mode=mmap_mode)
+            assert [Q.critical_pairs for Q in loaded] == [
+                P.critical_pairs for P in landscapes]
+        assert (loaded[0] - loaded[2]).p_norm() == pytest.approx(
+            (landscapes[0] - landscapes[2]).p_norm())
+
+    def test_mixed_kinds(self, tmp_path):
+        P = PersLandscapeExact(dgms=random_dgms(sizes=3, seed=0, length=0.5))
+        with pytest.raises(ValueError):
+            save_collection(tmp_path / 'c', [P, PersLandscapeApprox(
+                0, 1, 5, dgms=random_dgms(sizes=3, seed=0, length=0.5),
+                compute=True)])
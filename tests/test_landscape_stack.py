@@ -0,0 +1,82 @@
+"""
+Unit tests for LandscapeStack
+"""
+
+import pytest
+import numpy as np
+
+from landscape_stack import LandscapeStack
+from PersistenceLandscapeExact import PersLandscapeExact
+from PersistenceLandscapeGrid import Grid, PersLandscapeApprox
+from helpers import random_dgms
+
+
+def random_ripser_dgms(seed=0):
+    rng = np.random.default_rng(seed)
+    dgms = [np.column_stack([np.zeros(20), rng.uniform(0, 1, 20)])]
+    dgms[0][-1, 1] = np.inf
+    for n in [15, 4]:
+        dgms += random_dgms(sizes=n, length=0.5, rng=rng)
+    return dgms
+
+
+class TestFromRipser():
+
+    def test_shared_grid(self):
+        dgms = random_ripser_dgms()
+        stack = LandscapeStack.from_ripser(dgms, degrees=[1, 2],
+                                           grid=(0, 1.5, 60))
+        assert stack.degrees == [1, 2]
+        for hom_deg in [1, 2]:
+            P = PersLandscapeApprox(0, 1.5, 60, dgms=dgms, hom_deg=hom_deg,
+                                    compute=True)
+            assert stack[hom_deg].hom_deg == hom_deg
+            np.testing.assert_array_equal(stack[hom_deg].values, P.values)
+
+    def test_grid_object(self):
+        dgms = random_ripser_dgms()
+        grid = Grid(0, 1.5, 60)
+        expected = LandscapeStack.from_ripser(dgms, grid=(0, 1.5, 60))
+        for n_jobs in [None, 2]:
+            stack = LandscapeStack.from_ripser(dgms, grid=grid, n_jobs=n_jobs)
+            for P, Q in zip(stack, expected):
+                assert P.grid is grid and Q.grid is grid
+                np.testing.assert_array_equal(P.values, Q.values)
+
+    def test_default_grid(self):
+        dgms = random_ripser_dgms()
+        stack = LandscapeStack.from_ripser(dgms)
+        finite = np.concatenate([dgms[0][:-1], dgms[1], dgms[2]])
+        for P in stack:
+            assert P.start == finite[:, 0].min()
+            assert P.stop == finite[:, 1].max()
+            assert P.num_steps == 500
+
+    def test_exact_and_n_jobs(self):
+        dgms = random_ripser_dgms()
+        stack = LandscapeStack.from_ripser(dgms, exact=True, n_jobs=2)
+        for hom_deg in range(3):
+            assert stack[hom_deg].critical_pairs == PersLandscapeExact(
+                dgms=dgms, hom_deg=hom_deg).critical_pairs
+
+    def test_bad_degree(self):
+        with pytest.raises(ValueError):
+            LandscapeStack.from_ripser(random_ripser_dgms(), degrees=[3])
+
+
+class TestArithmetic():
+
+    def test_per_degree(self):
+        S = LandscapeStack.from_ripser(random_ripser_dgms(0), grid=(0, 1.5, 60))
+        T = LandscapeStack.from_ripser(random_ripser_dgms(1), grid=(0, 1.5, 60))
+        U = (S - 2*T)/4
+        for hom_deg in S.degrees:
+            expected = (S[hom_deg] - 2*T[hom_deg])/4
+            assert U[hom_deg].sup_norm() == pytest.approx(expected.sup_norm())
+        assert (S + T).p_norm(2)[1] == pytest.approx((S[1] + T[1]).p_norm(2))
+
+    def test_degrees_must_match(self):
+        S = LandscapeStack.from_ripser(random_ripser_dgms(), degrees=[0, 1])
+        T = LandscapeStack.from_ripser(random_ripser_dgms(), degrees=[1, 2])
+        with pytest.raises(ValueError):
+            S + T
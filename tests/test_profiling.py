@@ -0,0 +1,64 @@
+"""
+Unit tests for the stage profiler
+"""
+
+import numpy as np
+
+import profiling
+from profiling import StageProfiler, stage, count
+from PersistenceLandscapeExact import PersLandscapeExact
+from PersistenceLandscapeGrid import PersLandscapeApprox, batch_approx
+from helpers import random_dgms
+
+
+class TestStageProfiler():
+
+    def test_disabled(self):
+        assert profiling._active is None
+        assert stage('sweep') is stage('sort')
+        count('sweep', bars=1)
+
+    def test_exact_stages(self):
+        dgms = random_dgms(sizes=100, length=0.5)
+        dgms[0][1] = dgms[0][0]
+        with StageProfiler() as prof:
+            P = PersLandscapeExact(dgms=dgms)
+        report = prof.report()
+        assert profiling._active is None
+        assert {'sort', 'sweep', 'duplicates'} <= set(report)
+        assert report['sweep']['calls'] == 1
+        assert report['sweep']['critical_points'] == len(P.xs)
+        assert report['sweep']['depth'] == P.max_depth
+        assert report['duplicates']['bars'] == 100
+        assert report['duplicates']['unique_bars'] == 99
+        assert report['sweep']['seconds'] >= report['duplicates']['seconds']
+        with StageProfiler() as prof:
+            PersLandscapeExact(dgms=[np.array([[0, 1], [0, 2]])])
+        assert 'nested' in prof.report() and 'sweep' not in prof.report()
+
+    def test_grid_stages_and_memory(self):
+        stages = []
+        with StageProfiler(memory=True,
+                           callback=lambda name, s: stages.append(name)) as prof:
+            P = PersLandscapeApprox(0, 1.5, 100, compute=True,
+                                    dgms=random_dgms(sizes=200, length=0.5))
+            batch_approx([random_dgms(sizes=50, seed=seed, length=0.5)
+                          for seed in range(3)],
+                         start=0, stop=1.5, num_steps=100)
+        report = prof.report()
+        assert {'snap', 'duplicates', 'fill', 'sort', 'matrix'} <= set(report)
+        assert report['fill']['calls'] == len([s for s in stages if s == 'fill'])
+        assert report['matrix']['diagrams'] == 3
+        # at least one column index per bar
+        assert report['fill']['peak_bytes'] >= 8*200
+        assert 'fill' in repr(prof)
+
+    def test_nested_profilers(self):
+        with StageProfiler() as outer:
+            with StageProfiler() as inner:
+                with stage('a'):
+                    pass
+            with stage('b'):
+                pass
+        assert set(inner.report()) == {'a'}
+        assert set(outer.report()) == {'b'}
@@ -0,0 +1,90 @@
+"""
+Unit tests for the scikit-learn transformers
+"""
+
+import numpy as np
+
+from pl_transformer import PLA, PLE
+from PersistenceLandscapeExact import PersLandscapeExact
+from PersistenceLandscapeGrid import PersLandscapeApprox
+from helpers import random_dgms
+
+
+def ripser_dgms(num_dgms, seed=0):
+    # the bars in degree 1, after a diagram in degree 0
+    return [[np.array([[0., 1.], [0., np.inf]]), dgms[0]]
+            for dgms in random_dgms(num_dgms, seed, sizes=(1, 30))]
+
+
+class TestPLA():
+
+    def test_transform(self):
+        X = ripser_dgms(6)
+        features = PLA(hom_deg=1, start=0, stop=2, num_steps=40).fit_transform(X)
+        assert features.shape[0] == 6
+        for row, dgms in zip(features, X):
+            P = PersLandscapeApprox(0, 2, 40, dgms=dgms, hom_deg=1,
+                                    compute=True)
+            np.testing.assert_array_equal(row[:P.values.size],
+                                          P.values.ravel())
+            assert not row[P.values.size:].any()
+
+    def test_max_depth(self):
+        X = ripser_dgms(6)
+        full = PLA(hom_deg=1, start=0, stop=2, num_steps=40).fit_transform(X)
+        features = PLA(hom_deg=1, start=0, stop=2, num_steps=40,
+                       max_depth=2).fit_transform(X)
+        assert features.shape == (6, 80)
+        np.testing.assert_array_equal(features, full[:, :80])
+
+    def test_fit_then_transform(self):
+        train, test = ripser_dgms(5, 1), ripser_dgms(3, 2)
+        test[0][1] = np.array([[0.2, 0.9], [0.3, 0.5]])
+        pla = PLA(hom_deg=1, start=0, stop=2, num_steps=40).fit(train)
+        full = pla.transform(train)
+        assert pla.depth_*40 == full.shape[1]
+        np.testing.assert_array_equal(pla.fit_transform(train), full)
+        # the features of other diagrams are padded or truncated to the
+        # depth of the training landscapes
+        features = pla.transform(test)
+        assert features.shape == (3, full.shape[1])
+        for row, dgms in zip(features, test):
+            P = PersLandscapeApprox(0, 2, 40, dgms=dgms, hom_deg=1,
+                                    compute=True)
+            values = P.values[:pla.depth_].ravel()
+            np.testing.assert_array_equal(row[:values.size], values)
+            assert not row[values.size:].any()
+        shallow = PLA(hom_deg=1, start=0, stop=2, num_steps=40).fit(test)
+        assert shallow.depth_ < pla.depth_
+        np.testing.assert_array_equal(shallow.transform(train),
+                                      full[:, :shallow.depth_*40])
+
+    def test_pipeline(self):
+        from sklearn.linear_model import Ridge
+        from sklearn.pipeline import make_pipeline
+        train, test = ripser_dgms(5, 3), ripser_dgms(3, 4)
+        model = make_pipeline(PLA(hom_deg=1, num_steps=50), Ridge())
+        model.fit(train, np.arange(5.))
+        assert model.predict(test).shape == (3,)
+
+    def test_n_jobs(self):
+        X = ripser_dgms(20)
+        serial = PLA(hom_deg=1, num_steps=40).fit_transform(X)
+        parallel = PLA(hom_deg=1, num_steps=40, n_jobs=2).fit_transform(X)
+        np.testing.assert_array_equal(serial, parallel)
+
+
+class TestPLE():
+
+    def test_transform(self):
+        X = ripser_dgms(10)
+        serial = PLE(hom_deg=1).fit_transform(X)
+        assert serial == [PersLandscapeExact(dgms=dgms, hom_deg=1).critical_pairs
+                          for dgms in X]
+        assert PLE(hom_deg=1, n_jobs=2).fit_transform(X) == serial
+
+    def test_max_depth(self):
+        X = ripser_dgms(5)
+        full = PLE(hom_deg=1).fit_transform(X)
+        assert PLE(hom_deg=1, max_depth=2).fit_transform(X) == [
+            pairs[:2] for pairs in full]
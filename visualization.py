@@ -171,8 +171,7 @@ def plot_landscape_grid(landscape: PersLandscapeApprox,
     for depth, l in enumerate(landscape):
         # sequential pairs in landscape
         # xs, zs = zip(*l)
-        image = np.interp(domain, np.linspace(start=landscape.start, stop=landscape.stop,
-                                              num=landscape.num_steps), l) 
+        image = np.interp(domain, landscape.grid.coords, l) 
         for x, z in zip(domain,image):
             if z == 0.:
                 # plot a single point here?